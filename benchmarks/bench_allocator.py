@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# Copyright 2017 Janos Czentye
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Measure the allocation and the release of SG hop ids with N live hops for the
+former dict-based hop cache and the IdAllocator.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from util.allocator import IdAllocator
+
+
+class DictHopCache(object):
+  """
+  Former SG hop cache: plain dict of hop id --> owner with linear scans.
+  """
+
+  def __init__ (self):
+    self.cache = {}
+
+  def reserve (self, id, owner):
+    if id in self.cache:
+      return False
+    self.cache[id] = owner
+    return True
+
+  def allocate (self, owner):
+    for i in xrange(1, 1000000):
+      if i not in self.cache:
+        self.cache[i] = owner
+        return i
+
+  def release_owner (self, owner):
+    ids = [id for id in self.cache if self.cache[id] == owner]
+    for id in ids:
+      del self.cache[id]
+    return ids
+
+
+def measure (cache, hops, hops_per_service, rounds):
+  """
+  Fill the cache with the given number of hops then terminate and recreate
+  one service instance in every round.
+
+  :return: avg. allocation and release time of one service instance in sec
+  :rtype: tuple
+  """
+  services = hops / hops_per_service
+  for i in xrange(hops):
+    cache.reserve(id=i + 1, owner=i % services)
+  alloc = release = 0.0
+  for i in xrange(rounds):
+    owner = (i * 7919) % services
+    start = time.time()
+    cache.release_owner(owner=owner)
+    release += time.time() - start
+    start = time.time()
+    for _ in xrange(hops_per_service):
+      cache.allocate(owner=owner)
+    alloc += time.time() - start
+  return alloc / rounds, release / rounds
+
+
+def report (name, result):
+  print "%-12s allocate: %9.3f ms  release: %9.3f ms" % (
+    name, result[0] * 1000, result[1] * 1000)
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument("-n", "--hops", type=int, default=100000,
+                      help="number of live SG hops")
+  parser.add_argument("-k", "--hops-per-service", type=int, default=10,
+                      help="number of SG hops of a service instance")
+  parser.add_argument("-r", "--rounds", type=int, default=50,
+                      help="number of recreated service instances")
+  args = parser.parse_args()
+  print "%s live SG hops, %s hops per service instance" % (
+    args.hops, args.hops_per_service)
+  for name, cache in (("dict", DictHopCache()),
+                      ("IdAllocator", IdAllocator(start=1, stop=1000000))):
+    report(name, measure(cache, hops=args.hops,
+                         hops_per_service=args.hops_per_service,
+                         rounds=args.rounds))
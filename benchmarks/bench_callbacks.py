@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# Copyright 2017 Janos Czentye
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Measure the resolution of N outstanding callbacks which are sent to the
+callback server by concurrent clients in random order.
+"""
+import argparse
+import httplib
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from service.callback import CallbackManager
+
+
+def send_callbacks (port, ids, sent):
+  """
+  Send the callbacks of the given ids and record the time of sending.
+  """
+  for cb_id in ids:
+    sent[cb_id] = time.time()
+    conn = httplib.HTTPConnection("127.0.0.1", port)
+    try:
+      conn.request("POST", "/callback?message-id=%s&response-code=202" % cb_id)
+      conn.getresponse().read()
+    finally:
+      conn.close()
+
+
+def measure (manager, callbacks, senders, timeout):
+  """
+  :return: wake-up latencies in sec and the number of timed out waiters
+  :rtype: tuple
+  """
+  ids = ["cb-%s" % i for i in xrange(callbacks)]
+  woken = {}
+  results = {}
+
+  def wait (cb_id):
+    cb = manager.subscribe_callback(hook=None, cb_id=cb_id, type="SERVICE",
+                                    timeout=timeout)
+    ready.release()
+    cb = manager.wait_for_callback(callback=cb)
+    woken[cb_id] = time.time()
+    results[cb_id] = cb.result_code
+
+  ready = threading.Semaphore(0)
+  waiters = [threading.Thread(target=wait, args=(cb_id,)) for cb_id in ids]
+  for t in waiters:
+    t.start()
+  for _ in ids:
+    ready.acquire()
+  random.shuffle(ids)
+  sent = {}
+  clients = [threading.Thread(target=send_callbacks,
+                              args=(manager.server_address[1],
+                                    ids[i::senders], sent))
+             for i in xrange(senders)]
+  for t in clients:
+    t.start()
+  for t in clients + waiters:
+    t.join()
+  latencies = [woken[cb_id] - sent[cb_id] for cb_id in ids
+               if results[cb_id] == 202]
+  return latencies, sum(1 for r in results.itervalues() if r != 202)
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument("-n", "--callbacks", type=int, default=500,
+                      help="number of outstanding callbacks")
+  parser.add_argument("-s", "--senders", type=int, default=8,
+                      help="number of concurrent clients sending callbacks")
+  parser.add_argument("-t", "--timeout", type=float, default=30,
+                      help="callback timeout in sec")
+  args = parser.parse_args()
+  manager = CallbackManager(domain_name="bench", address="127.0.0.1", port=0,
+                            timeout=args.timeout)
+  manager.start()
+  while manager.server_address[1] == 0:
+    time.sleep(0.01)
+  start = time.time()
+  latencies, timed_out = measure(manager, callbacks=args.callbacks,
+                                 senders=args.senders, timeout=args.timeout)
+  elapsed = time.time() - start
+  manager.shutdown()
+  manager.join()
+  latencies.sort()
+  print "%s callbacks from %s senders in random order" % (args.callbacks,
+                                                          args.senders)
+  print "resolved: %s  timed out: %s  total: %.3f s" % (len(latencies),
+                                                        timed_out, elapsed)
+  if latencies:
+    print "wake-up latency  median: %.3f ms  max: %.3f ms" % (
+      latencies[len(latencies) / 2] * 1000, latencies[-1] * 1000)
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# Copyright 2017 Janos Czentye
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Measure the /ns-instances responses with N managed service instances when the
+JSON descriptions are rebuilt and serialized on every poll and when the
+cached JSON fragments of the instances are joined.
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from service.registry import ServiceRegistry
+from service.service_mgr import ServiceInstance, ServiceManager
+
+# Restored INIT instances are set to ERROR
+STATUSES = (ServiceInstance.STATUS_START, ServiceInstance.STATUS_STOPPED,
+            ServiceInstance.STATUS_ERROR)
+
+
+def create_manager (instances, directory):
+  """
+  Restore a service manager from a registry of the given number of
+  instances.
+
+  :return: service manager
+  :rtype: :class:`ServiceManager`
+  """
+  registry = ServiceRegistry(path=os.path.join(directory, "bench.db"))
+  registry.open()
+  for i in xrange(instances):
+    si = ServiceInstance(service_id="ns-%s" % (i % 50), name="ns-%s" % i,
+                         status=STATUSES[i % len(STATUSES)])
+    si.vnf_addresses = {"vnf-%s" % i: {"management": "10.0.%s.%s" % (
+      i / 256 % 256, i % 256)}}
+    registry.save_instance(si=si)
+  registry.close()
+  service_mgr = ServiceManager(converter=None, cache_dir=directory,
+                               logger=logging.getLogger("bench"),
+                               registry=ServiceRegistry(path=registry.path))
+  service_mgr.initialize()
+  return service_mgr
+
+
+def rebuild (service_mgr, status):
+  """
+  Former response: filter every instance and serialize the whole list.
+  """
+  return json.dumps([si.get_json() for si in service_mgr.get_services()
+                     if status is None or si.status == status])
+
+
+def join_fragments (service_mgr, status):
+  """
+  Indexed lookup and the join of the cached fragments.
+  """
+  return "[%s]" % ", ".join(si.get_json_fragment() for si in
+                            service_mgr.get_services(status=status))
+
+
+def measure (service_mgr, func, status, polls, changes):
+  """
+  Change the status of `changes` instances before every poll.
+
+  :return: avg. time of a response in sec
+  :rtype: float
+  """
+  services = service_mgr.get_services()
+  elapsed = 0.0
+  for i in xrange(polls):
+    for j in xrange(changes):
+      si = services[(i * changes + j) % len(services)]
+      service_mgr.set_service_status(id=si.id, status=si.status)
+    start = time.time()
+    func(service_mgr, status)
+    elapsed += time.time() - start
+  return elapsed / polls
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument("-n", "--instances", type=int, default=10000,
+                      help="number of managed service instances")
+  parser.add_argument("-p", "--polls", type=int, default=20,
+                      help="number of /ns-instances polls")
+  parser.add_argument("-c", "--changes", type=int, default=100,
+                      help="number of status changes between two polls")
+  args = parser.parse_args()
+  logging.disable(logging.INFO)
+  directory = tempfile.mkdtemp()
+  try:
+    service_mgr = create_manager(instances=args.instances,
+                                 directory=directory)
+    # The responses must be the same
+    assert rebuild(service_mgr, None) == join_fragments(service_mgr, None)
+    print "%s service instances, %s status changes between two polls" % (
+      args.instances, args.changes)
+    for name, status in (("all", None),
+                         ("running", ServiceInstance.STATUS_START)):
+      for method, func in (("rebuild", rebuild),
+                           ("fragments", join_fragments)):
+        print "%-8s %-10s %9.3f ms" % (name, method, measure(
+          service_mgr, func=func, status=status, polls=args.polls,
+          changes=args.changes) * 1000)
+  finally:
+    shutil.rmtree(directory)
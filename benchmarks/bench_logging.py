@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# Copyright 2017 Janos Czentye
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Measure the CPU time of the debug and VERBOSE log calls of one /service
+request at INFO level with eager %-formatting (former method) and with lazy
+log arguments.
+
+The full /service path needs the RO and the nffg_lib submodule, so the log
+calls of the path are replayed with synthetic payloads of the same shape: the
+parsed request, the NF id binding, the dumped service graph and topology, the
+collected callback data and the response.
+"""
+import argparse
+import json
+import logging
+import os
+import pprint
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from util.colored_logger import VERBOSE, lazy
+
+
+def create_payloads (nfs):
+  """
+  :param nfs: number of NFs in the service
+  :type nfs: int
+  :return: payloads logged during one service request
+  :rtype: dict
+  """
+  binding = {"nf%s" % i: "nf%s_si-1" % i for i in xrange(nfs)}
+  sg = {"id": "si-1",
+        "nfs": [{"id": nf, "functional_type": "fwd",
+                 "ports": [{"id": 1}, {"id": 2}],
+                 "resources": {"cpu": 1, "mem": 1, "storage": 1}}
+                for nf in binding.itervalues()],
+        "sg_hops": [{"id": i, "src_node": "nf%s" % i,
+                     "dst_node": "nf%s" % (i + 1), "flowclass": None}
+                    for i in xrange(nfs)]}
+  topo = {"id": "topo",
+          "infras": [{"id": "infra%s" % i, "ports": range(16),
+                      "resources": {"cpu": 64, "mem": 256, "storage": 1024}}
+                     for i in xrange(nfs)]}
+  params = {"ns_id": "ns", "callbackUrl": "http://marketplace/cb",
+            "flavour": "gold", "vnfs": binding.keys()}
+  return {"params": params, "binding": binding, "sg": lambda: json.dumps(sg),
+          "topo": lambda: json.dumps(topo), "callback": params,
+          "response": {"id": "si-1", "vnf_addresses": binding}}
+
+
+def log_eager (logger, p):
+  logger.log(VERBOSE, "Parsed body:\n%s" % pprint.pformat(p["params"]))
+  logger.debug("Generated NF IDs:\n%s" % pprint.pformat(p["binding"]))
+  logger.log(VERBOSE, "Received topology:\n%s" % p["topo"]())
+  logger.log(VERBOSE, "Loaded Service Instance:\n%s" % p["sg"]())
+  logger.log(VERBOSE, "Collected callback data:\n%s"
+             % pprint.pformat(p["callback"]))
+  logger.log(VERBOSE, "Sent response:\n%s" % pprint.pformat(p["response"]))
+
+
+def log_lazy (logger, p):
+  logger.log(VERBOSE, "Parsed body:\n%s", lazy(pprint.pformat, p["params"]))
+  logger.debug("Generated NF IDs:\n%s", lazy(pprint.pformat, p["binding"]))
+  logger.log(VERBOSE, "Received topology:\n%s", lazy(p["topo"]))
+  logger.log(VERBOSE, "Loaded Service Instance:\n%s", lazy(p["sg"]))
+  logger.log(VERBOSE, "Collected callback data:\n%s",
+             lazy(pprint.pformat, p["callback"]))
+  logger.log(VERBOSE, "Sent response:\n%s",
+             lazy(pprint.pformat, p["response"]))
+
+
+def measure (func, logger, payloads, requests):
+  """
+  :return: CPU time of the log calls of one request in sec
+  :rtype: float
+  """
+  start = time.clock()
+  for _ in xrange(requests):
+    func(logger, payloads)
+  return (time.clock() - start) / requests
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument("-n", "--nfs", type=int, default=50,
+                      help="number of NFs in the service")
+  parser.add_argument("-r", "--requests", type=int, default=200,
+                      help="number of simulated requests")
+  args = parser.parse_args()
+  logger = logging.getLogger("bench")
+  logger.addHandler(logging.NullHandler())
+  logger.setLevel(logging.INFO)
+  payloads = create_payloads(nfs=args.nfs)
+  print "/service log calls at INFO level, %s NFs" % args.nfs
+  for name, func in (("eager", log_eager), ("lazy", log_lazy)):
+    print "%-6s CPU time per request: %9.3f ms" % (
+      name, measure(func, logger, payloads, args.requests) * 1000)
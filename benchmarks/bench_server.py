@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# Copyright 2017 Janos Czentye
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Measure the latency of /ns-instances polls while N /service requests are
+waiting for the RO, served by the single-threaded development server and by
+the pooled server.
+"""
+import argparse
+import httplib
+import logging
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from flask import Flask, Response
+from werkzeug.serving import BaseWSGIServer
+
+from util.server import PooledWSGIServer
+
+
+def create_app (ro_delay):
+  """
+  :param ro_delay: time in sec a /service request waits for the RO
+  :type ro_delay: float
+  :return: app which mimics the slow and the polled calls of the connector
+  :rtype: :class:`flask.Flask`
+  """
+  app = Flask("bench")
+
+  @app.route("/service", methods=['POST'])
+  def initiate_service ():
+    time.sleep(ro_delay)
+    return Response(status=httplib.OK)
+
+  @app.route("/ns-instances", methods=['GET'])
+  def list_service_instances ():
+    return Response(status=httplib.OK, content_type="application/json",
+                    response="[]")
+
+  return app
+
+
+def request (port, method, path):
+  conn = httplib.HTTPConnection("127.0.0.1", port)
+  try:
+    conn.request(method, path)
+    conn.getresponse().read()
+  finally:
+    conn.close()
+
+
+def measure (server, services, polls):
+  """
+  :return: latencies of the /ns-instances polls in sec
+  :rtype: list
+  """
+  port = server.server_address[1]
+  t = threading.Thread(target=server.serve_forever)
+  t.daemon = True
+  t.start()
+  pending = [threading.Thread(target=request, args=(port, "POST", "/service"))
+             for _ in xrange(services)]
+  for s in pending:
+    s.start()
+  # Let the /service requests reach the server first
+  time.sleep(0.1)
+  latencies = []
+  for _ in xrange(polls):
+    start = time.time()
+    request(port=port, method="GET", path="/ns-instances")
+    latencies.append(time.time() - start)
+  for s in pending:
+    s.join()
+  server.shutdown()
+  server.server_close()
+  return latencies
+
+
+def report (name, latencies):
+  latencies = sorted(latencies)
+  print "%-20s polls: %4d  median: %8.2f ms  max: %8.2f ms" % (
+    name, len(latencies), latencies[len(latencies) / 2] * 1000,
+    latencies[-1] * 1000)
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument("-n", "--services", type=int, default=8,
+                      help="number of /service requests waiting for the RO")
+  parser.add_argument("-d", "--delay", type=float, default=0.5,
+                      help="RO delay of a /service request in sec")
+  parser.add_argument("-p", "--polls", type=int, default=20,
+                      help="number of /ns-instances polls")
+  parser.add_argument("-w", "--workers", type=int, default=16,
+                      help="worker threads of the pooled server")
+  args = parser.parse_args()
+  logging.getLogger("werkzeug").setLevel(logging.ERROR)
+  app = create_app(ro_delay=args.delay)
+  print "%s /service requests waiting %ss for the RO" % (args.services,
+                                                         args.delay)
+  report("single-threaded",
+         measure(BaseWSGIServer("127.0.0.1", 0, app), services=args.services,
+                 polls=args.polls))
+  report("pooled (%s workers)" % args.workers,
+         measure(PooledWSGIServer("127.0.0.1", 0, app, workers=args.workers),
+                 services=args.services, polls=args.polls))
@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+# Copyright 2017 Janos Czentye
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Measure the tagging of the NF ids of a service instance with the former
+dump/replace/parse method and the in-place relabelling on the service NFFGs
+of the services folder and on synthetic service chains.
+
+Requires the nffg_lib submodule.
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from nffg_lib.nffg import NFFG
+
+from service.service_mgr import ServiceInstance
+
+
+def tag_by_replace (nffg, unique):
+  """
+  Former implementation: replace the NF ids in the dumped NFFG.
+  """
+  binding = {nf.id: "%s_%s" % (nf.id, unique) for nf in nffg.nfs}
+  raw = nffg.dump()
+  for old, new in binding.iteritems():
+    raw = raw.replace('"%s"' % old, '"%s"' % new)
+  return NFFG.parse(raw_data=raw)
+
+
+def tag_in_place (nffg, unique):
+  """
+  Current implementation of :class:`ServiceInstance`.
+  """
+  return ServiceInstance(service_id=nffg.id)._tag_NF_ids(nffg=nffg,
+                                                         unique=unique)
+
+
+def create_chain (nfs):
+  """
+  :param nfs: number of NFs
+  :type nfs: int
+  :return: SAP - NF chain - SAP service graph
+  :rtype: :class:`NFFG`
+  """
+  nffg = NFFG(id="chain-%s" % nfs)
+  prev = nffg.add_sap(id="sap1", name="sap1").add_port(id=1)
+  for i in xrange(nfs):
+    nf = nffg.add_nf(id="nf%s" % i, name="nf%s" % i, func_type="fwd",
+                     cpu=1, mem=1, storage=1)
+    nffg.add_sglink(src_port=prev, dst_port=nf.add_port(id=1),
+                    id="hop%s" % i)
+    prev = nf.add_port(id=2)
+  nffg.add_sglink(src_port=prev,
+                  dst_port=nffg.add_sap(id="sap2", name="sap2").add_port(id=1),
+                  id="hop%s" % nfs)
+  return nffg
+
+
+def measure (func, nffg, rounds):
+  """
+  :return: avg. time of tagging a private copy of the NFFG in sec
+  :rtype: float
+  """
+  elapsed = 0.0
+  for i in xrange(rounds):
+    sg = nffg.copy()
+    start = time.time()
+    func(sg, "si%s" % i)
+    elapsed += time.time() - start
+  return elapsed / rounds
+
+
+def summarize (nffg):
+  """
+  :return: NF ids and SG hops of the NFFG independently of the node order
+  :rtype: tuple
+  """
+  return (sorted(nf.id for nf in nffg.nfs),
+          sorted((hop.id, hop.src.node.id, hop.dst.node.id)
+                 for hop in nffg.sg_hops))
+
+
+def compare (name, nffg, rounds):
+  # Both methods must give the same graph
+  if summarize(tag_in_place(nffg.copy(), "si")) != \
+     summarize(tag_by_replace(nffg.copy(), "si")):
+    print "%-32s different result!" % name
+  before = measure(tag_by_replace, nffg, rounds)
+  after = measure(tag_in_place, nffg, rounds)
+  print "%-32s NFs: %4d  replace: %8.3f ms  in-place: %8.3f ms  (%.1fx)" % (
+    name, len(list(nffg.nfs)), before * 1000, after * 1000,
+    before / after if after else 0)
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument("-n", "--nfs", type=int, action="append",
+                      help="size of the synthetic chains, default: 100, 500")
+  parser.add_argument("-r", "--rounds", type=int, default=20,
+                      help="number of tagged copies per graph")
+  args = parser.parse_args()
+  services = os.path.join(os.path.dirname(__file__), "..", "services")
+  for path in sorted(glob.glob(os.path.join(services, "*.nffg"))):
+    compare(os.path.basename(path), NFFG.parse_from_file(path), args.rounds)
+  for nfs in args.nfs or (100, 500):
+    compare("chain-%s" % nfs, create_chain(nfs), args.rounds)
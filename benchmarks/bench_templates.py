@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# Copyright 2017 Janos Czentye
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Measure the private copy of a cached service template returned for every
+service instance: parsing the template again, the deep copy of NFFG.copy()
+and the partial clone of the template cache, on the service NFFGs of the
+services folder and on synthetic service chains.
+
+Requires the nffg_lib submodule.
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from nffg_lib.nffg import NFFG
+
+from bench_tag_nf_ids import create_chain, summarize
+from service.service_mgr import ServiceInstance, clone_service_template
+
+
+def measure (func, rounds):
+  """
+  :return: avg. time of one call in sec
+  :rtype: float
+  """
+  start = time.time()
+  for _ in xrange(rounds):
+    func()
+  return (time.time() - start) / rounds
+
+
+def bind (nffg):
+  """
+  :return: the given private copy bound to a service instance
+  :rtype: :class:`NFFG`
+  """
+  return ServiceInstance(service_id=nffg.id,
+                         instance_id="si").load_sg(nffg=nffg)
+
+
+def compare (name, template, rounds):
+  raw = template.dump()
+  before = template.dump()
+  # Every method must give the same service instance graph
+  results = [summarize(bind(nffg)) for nffg in (
+    NFFG.parse(raw_data=raw), template.copy(),
+    clone_service_template(template))]
+  if results.count(results[0]) != len(results) or template.dump() != before:
+    print "%-32s different result!" % name
+  parse = measure(lambda: NFFG.parse(raw_data=raw), rounds)
+  deep = measure(template.copy, rounds)
+  clone = measure(lambda: clone_service_template(template), rounds)
+  print "%-32s NFs: %4d  parse: %8.3f ms  copy: %8.3f ms  clone: %8.3f ms" % (
+    name, len(list(template.nfs)), parse * 1000, deep * 1000, clone * 1000)
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument("-n", "--nfs", type=int, action="append",
+                      help="size of the synthetic chains, default: 100, 500")
+  parser.add_argument("-r", "--rounds", type=int, default=20,
+                      help="number of copies per graph")
+  args = parser.parse_args()
+  services = os.path.join(os.path.dirname(__file__), "..", "services")
+  for path in sorted(glob.glob(os.path.join(services, "*.nffg"))):
+    compare(os.path.basename(path), NFFG.parse_from_file(path), args.rounds)
+  for nfs in args.nfs or (100, 500):
+    compare("chain-%s" % nfs, create_chain(nfs), args.rounds)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# Copyright 2017 Janos Czentye
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Compare the thread count and the memory usage of N pending callback timeouts
+handled by one threading.Timer per callback (former method) and by the common
+scheduler of the CallbackManager. Every method is measured in a new process.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from util.scheduler import Scheduler
+
+METHODS = ("timer", "scheduler")
+
+
+def get_memory ():
+  """
+  :return: resident and virtual memory size of the process in kB
+  :rtype: tuple
+  """
+  usage = {}
+  with open("/proc/self/status") as f:
+    for line in f:
+      if line.startswith(("VmRSS:", "VmSize:")):
+        name, value = line.split(":")
+        usage[name] = int(value.split()[0])
+  return usage["VmRSS"], usage["VmSize"]
+
+
+def timeout_hook (**kwargs):
+  pass
+
+
+def measure (method, callbacks, timeout):
+  """
+  Set up the timeouts of the pending callbacks then cancel them.
+
+  :return: thread count, resident and virtual memory growth in kB and the
+    time of the setup and the cancellation in sec
+  :rtype: tuple
+  """
+  rss, vms = get_memory()
+  start = time.time()
+  if method == "timer":
+    timers = []
+    for i in xrange(callbacks):
+      t = threading.Timer(timeout, timeout_hook, kwargs={"msg_id": i,
+                                                         "result": 0})
+      t.start()
+      timers.append(t)
+  else:
+    scheduler = Scheduler()
+    timers = [scheduler.schedule(timeout, timeout_hook, msg_id=i, result=0)
+              for i in xrange(callbacks)]
+  setup = time.time() - start
+  threads = threading.active_count()
+  pending_rss, pending_vms = get_memory()
+  start = time.time()
+  for t in timers:
+    if method == "timer":
+      t.cancel()
+    else:
+      scheduler.cancel(t)
+  cancel = time.time() - start
+  return threads, pending_rss - rss, pending_vms - vms, setup, cancel
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument("-n", "--callbacks", type=int, default=1000,
+                      help="number of pending callbacks")
+  parser.add_argument("-t", "--timeout", type=float, default=30,
+                      help="callback timeout in sec")
+  parser.add_argument("--method", choices=METHODS,
+                      help="measure only the given method in this process")
+  args = parser.parse_args()
+  if args.method:
+    print "%s %s %s %s %s" % measure(args.method, callbacks=args.callbacks,
+                                     timeout=args.timeout)
+    sys.exit()
+  print "%s pending callbacks" % args.callbacks
+  for method in METHODS:
+    out = subprocess.check_output([sys.executable, __file__,
+                                   "-n", str(args.callbacks),
+                                   "-t", str(args.timeout),
+                                   "--method", method])
+    threads, rss, vms, setup, cancel = out.split()
+    print ("%-10s threads: %5s  RSS: +%7.1f MB  virtual: +%8.1f MB  "
+           "setup: %7.2f ms  cancel: %7.2f ms"
+           % (method, threads, int(rss) / 1024.0, int(vms) / 1024.0,
+              float(setup) * 1000, float(cancel) * 1000))
@@ -20,10 +20,12 @@ import os
 import pprint
 import re
 import signal
+import threading
+import time
+from multiprocessing.pool import ThreadPool
 from urlparse import urlparse
 
-import requests
-from flask import Flask, Response, request
+from flask import Flask, Response, g, request
 from requests.exceptions import RequestException
 from urllib3.exceptions import TimeoutError
 
@@ -32,14 +34,21 @@ from conversion.converter import TNOVAConverter
 from conversion.vnf_catalogue import VNFCatalogue
 from nffg_lib.nffg import NFFG
 from service.callback import CallbackManager
-from service.service_mgr import ServiceManager, ServiceInstance
-from util.colored_logger import VERBOSE, setup_flask_logging
+from service.registry import ServiceRegistry
+from service.service_mgr import ServiceInstance, ServiceManager
+from service.service_mgr import parse_timestamp
+from util.colored_logger import VERBOSE, lazy, setup_flask_logging
+from util.cache import SingleFlight, TopologyCache
+from util.metrics import CONTENT_TYPE, MetricsRegistry, PhaseTimer
+from util.server import PooledWSGIServer
+from util.session import SessionManager
 from util.trail import MessageDumper
 from virtualizer.virtualizer import Virtualizer
 # Listening port
 from virtualizer.virtualizer_mappings import Mappings, Mapping
 
 LISTENING_PORT = 5000
+WORKER_THREADS = 0  # number of serving threads, 0 means Flask's dev server
 
 # Connector configuration parameters
 RO_URL = "http://localhost:8888/escape/orchestration"  # ESCAPE's top level
@@ -48,12 +57,14 @@ RO_URL = "http://localhost:8888/escape/orchestration"  # ESCAPE's top level
 USE_VNF_STORE = False  # enable dynamic VNFD acquiring from VNF Store
 VNF_STORE_URL = "http://localhost:8080/NFS/vnfds"
 CATALOGUE_DIR = "vnf_catalogue"  # read VNFD from dir if VNFStore is disabled
+CATALOGUE_WATCH_INTERVAL = 0  # sec, reload VNFDs in background if not 0
 
 USE_SERVICE_CATALOG = False  # enable dynamic NSD acquiring from service-catalog
 SERVICE_CATALOG_URL = "http://localhost:42050/service/catalog"
 NSD_DIR = "nsds"  # dir name used for storing received NSD files
 
 SERVICE_NFFG_DIR = "services"  # dir name used for storing converted services
+REGISTRY_PATH = "log/registry.db"  # file of persisted instances, "": off
 
 # Monitoring related parameters
 MONITORING_URL = None
@@ -62,9 +73,14 @@ MONITORING_TIMEOUT = 5  # sec
 # Communication related parameters
 USE_CALLBACK = False
 CALLBACK_URL = "http://localhost:9000/callback"
+NONBLOCKING_CALLBACK = False  # finish callback-based requests in hooks
 DYNAMIC_UPDATE_ENABLED = True  # Always request topology from RO for updates
 USE_VIRTUALIZER_FORMAT = False
 ENABLE_DIFF = True
+TOPOLOGY_CACHE_TTL = 5  # sec, 0 means the topology is requested every time
+ASYNC_SERVICE_INSTANTIATION = False  # respond before the RO orchestration
+ORCHESTRATION_WORKERS = 8  # number of threads for async orchestration
+ORCHESTRATION_SHUTDOWN_TIMEOUT = 30  # sec, wait for the tasks at shutdown
 
 # T-NOVA format constants
 NS_ID_NAME = "ns_id"
@@ -78,6 +94,25 @@ VIRTUALIZER_TOPO_RPC = "get-config"
 VIRTUALIZER_SERVICE_RPC = "edit-config"
 VIRTUALIZER_MAPPINGS_RPC = "mappings"
 
+# Outbound HTTP communication related parameters
+HTTP_POOL_SIZE = 10  # kept-alive connections per endpoint and remote host
+RO_ENDPOINT = "RO"
+VNF_STORE_ENDPOINT = "VNFStore"
+SERVICE_CATALOG_ENDPOINT = "ServiceCatalog"
+MONITORING_ENDPOINT = "Monitoring"
+MARKETPLACE_ENDPOINT = "Marketplace"
+RO_TIMEOUT = None  # sec, None means HTTP_GLOBAL_TIMEOUT
+MARKETPLACE_TIMEOUT = None  # sec, None means HTTP_GLOBAL_TIMEOUT
+
+# Trail related parameters
+TRAIL_DISABLED = []  # categories which are not dumped, e.g. "mapping-info"
+TRAIL_SAMPLING = {}  # category --> dump 1 in every N messages
+TRAIL_MAX_SIZE = 0  # truncate larger trail payloads in bytes, 0: no limit
+TRAIL_MAX_FILES = MessageDumper.MAX_FILES  # rotate the oldest ones, 0: no limit
+TRAIL_MAX_TOTAL = MessageDumper.MAX_SIZE  # bytes of all trails, 0: no limit
+TRAIL_MAX_AGE = MessageDumper.MAX_AGE  # sec, 0: no limit
+TRAIL_ARCHIVE = MessageDumper.ARCHIVE  # compress rotated trails, not delete
+
 # Other constants
 PWD = os.path.realpath(os.path.dirname(__file__))
 LOGGER_NAME = "TNOVAConnector"
@@ -95,12 +130,30 @@ catalogue = None
 # Create Service manager
 service_mgr = None
 """type: ServiceManager"""
+# Create durable registry of the service instances
+registry = None
+"""type: ServiceRegistry"""
 # Create converter
 converter = None
 """type: TNOVAConverter"""
 # Create Callback Manager
 callback_mgr = None
 """type: CallbackManager"""
+# Create pooled HTTP sessions for outbound communication
+http_sessions = None
+"""type: SessionManager"""
+# Create executor for asynchronous service orchestration
+orchestration_executor = None
+"""type: ThreadPool"""
+# Create cache for topology views requested from RO
+topology_cache = None
+"""type: TopologyCache"""
+# Create coalescer for concurrent RO requests
+ro_single_flight = None
+"""type: SingleFlight"""
+# Create registry of the exported metrics
+metrics = None
+"""type: MetricsRegistry"""
 
 
 #############################################################################
@@ -109,11 +162,26 @@ callback_mgr = None
 
 @app.before_request
 def request_logger ():
+  g.request_started = time.time()
   app.logger.info(">>> Got HTTP %s request: %s --> %s, body: %s"
                   % (request.method, request.remote_addr, request.url,
                      len(request.data)))
 
 
+@app.after_request
+def request_metrics (response):
+  if metrics is None or 'request_started' not in g:
+    return response
+  # Use the rule instead of the URL to avoid a label for every instance id
+  route = request.url_rule.rule if request.url_rule else "unknown"
+  metrics["tnova_http_requests_total"].inc(route=route,
+                                           method=request.method,
+                                           status=response.status_code)
+  metrics["tnova_http_request_duration_seconds"].observe(
+    time.time() - g.request_started, route=route, method=request.method)
+  return response
+
+
 @app.route("/nsd", methods=['POST'])
 def register_nsd ():
   """
@@ -167,7 +235,7 @@ def register_vnfd ():
     MessageDumper().dump_to_file(data=request.data, unique="vnfd")
     app.logger.debug("Parsing request body...")
     data = json.loads(request.data)
-    app.logger.log(VERBOSE, "Parsed body:\n%s" % pprint.pformat(data))
+    app.logger.log(VERBOSE, "Parsed body:\n%s", lazy(pprint.pformat, data))
     # Filename based on the VNF ID
     filename = data['id']
     path = os.path.join(catalogue.VNF_CATALOGUE_DIR, "%s.nffg" % filename)
@@ -208,12 +276,14 @@ def initiate_service ():
   :rtype: flask.Response
   """
   app.logger.debug("Called initiate_service() with path: POST /service")
+  timer = PhaseTimer()
   try:
     MessageDumper().dump_to_file(data=request.data, unique="service")
     app.logger.debug("Parsing request body...")
-    instantiate_params = json.loads(request.data)
-    app.logger.log(VERBOSE, "Parsed body:\n%s"
-                   % pprint.pformat(instantiate_params))
+    with timer.phase("parse"):
+      instantiate_params = json.loads(request.data)
+    app.logger.log(VERBOSE, "Parsed body:\n%s",
+                   lazy(pprint.pformat, instantiate_params))
     if NS_ID_NAME not in instantiate_params:
       app.logger.error(
         "Missing NSD id (%s) from service initiation request!" % NS_ID_NAME)
@@ -226,13 +296,108 @@ def initiate_service ():
     return Response(status=httplib.BAD_REQUEST)
   ns_path = os.path.join(PWD, SERVICE_NFFG_DIR, "%s.nffg" % ns_id)
   # Create the service instantiation request, status->instantiated
-  si = service_mgr.instantiate_ns(ns_id=ns_id,
-                                  path=ns_path)
+  with timer.phase("instantiate-ns"):
+    si = service_mgr.instantiate_ns(ns_id=ns_id,
+                                    path=ns_path,
+                                    timer=timer)
   if si is None or si.status == ServiceInstance.STATUS_ERROR:
     app.logger.error("Service instance creation has been failed!")
     return Response(status=httplib.INTERNAL_SERVER_ERROR)
+  if ASYNC_SERVICE_INSTANTIATION:
+    app.logger.info("Schedule orchestration of service instance: %s..." % si.id)
+    orchestration_executor.apply_async(_run_async_orchestration,
+                                       kwds={"si": si,
+                                             "instantiate_params":
+                                               instantiate_params,
+                                             "timer": timer})
+    # Return with the created instance, status can be polled later
+    resp_data = si.get_json_fragment()
+    MessageDumper().dump_to_file(data=resp_data, unique="service-response")
+    response = Response(status=httplib.ACCEPTED,
+                        content_type="application/json",
+                        headers={"Location": "/ns-instances/%s" % si.id},
+                        response=resp_data)
+    return _report_timing(timer=timer, response=response)
+  return _run_orchestration(si=si, instantiate_params=instantiate_params,
+                            timer=timer)
+
+
+def _run_orchestration (si, instantiate_params, timer):
+  """
+  Orchestrate the created service instance and report the duration of the
+  service initiation phases.
+
+  :param si: created service instance
+  :type si: ServiceInstance
+  :param instantiate_params: parsed parameters of the initiation request
+  :type instantiate_params: dict
+  :param timer: records the duration of the phases
+  :type timer: :class:`PhaseTimer`
+  :return: HTTP Response
+  :rtype: flask.Response
+  """
+  # A concurrent termination waits until the RO has got the request
+  with si.lock:
+    # The instance can be terminated while its orchestration is queued
+    if service_mgr.get_service(id=si.id) is not si or \
+       si.status != ServiceInstance.STATUS_INIT:
+      app.logger.warning("Service instance: %s has been terminated before "
+                         "the orchestration! Skip orchestration..." % si.id)
+      return Response(status=httplib.CONFLICT)
+    response = _orchestrate_service(si=si,
+                                    instantiate_params=instantiate_params,
+                                    timer=timer)
+  return _report_timing(timer=timer, response=response,
+                        unique="service-timing")
+
+
+def _run_async_orchestration (si, instantiate_params, timer):
+  """
+  Run the orchestration in a worker thread of the orchestration executor.
+
+  The executor drops the exceptions of the scheduled tasks, so every
+  unexpected error is logged here and the service instance is marked as
+  failed instead of keeping it in INIT status forever.
+
+  :param si: created service instance
+  :type si: ServiceInstance
+  :param instantiate_params: parsed parameters of the initiation request
+  :type instantiate_params: dict
+  :param timer: records the duration of the phases
+  :type timer: :class:`PhaseTimer`
+  :return: None
+  """
+  try:
+    _run_orchestration(si=si, instantiate_params=instantiate_params,
+                       timer=timer)
+  except Exception:
+    app.logger.exception("Got unexpected exception during the asynchronous "
+                         "orchestration of service instance: %s!" % si.id)
+    service_mgr.set_service_status(id=si.id,
+                                   status=ServiceInstance.STATUS_ERROR)
+
+
+def _orchestrate_service (si, instantiate_params, timer=None):
+  """
+  Orchestrate the created service instance: adapt the request parameters,
+  send the service request to the RO and notify the requester.
+
+  Called directly from the request handler in synchronous mode or from a
+  worker thread of the orchestration executor in asynchronous mode.
+
+  :param si: created service instance
+  :type si: ServiceInstance
+  :param instantiate_params: parsed parameters of the initiation request
+  :type instantiate_params: dict
+  :param timer: records the duration of the phases (optional)
+  :type timer: :class:`PhaseTimer`
+  :return: HTTP Response
+  :rtype: flask.Response
+  """
+  if timer is None:
+    timer = PhaseTimer()
   sg = si.sg
-  app.logger.debug("Generated NF IDs:\n%s" % pprint.pformat(si.binding))
+  app.logger.debug("Generated NF IDs:\n%s", lazy(pprint.pformat, si.binding))
   if sg is None:
     service_mgr.set_service_status(id=si.id,
                                    status=ServiceInstance.STATUS_ERROR)
@@ -244,32 +409,38 @@ def initiate_service ():
   app.logger.debug("Set mapping mode: %s" % sg.mode)
   params = {MESSAGE_ID_NAME: si.id}
   app.logger.debug("Adapt placement criteria...")
-  converter.setup_placement_criteria(nffg=sg, params=instantiate_params)
-  converter.setup_metadata(nffg=sg, params=instantiate_params)
+  with timer.phase("placement"):
+    converter.setup_placement_criteria(nffg=sg, params=instantiate_params)
+    converter.setup_metadata(nffg=sg, params=instantiate_params)
   app.logger.debug("Using explicit message-id: %s" % params[MESSAGE_ID_NAME])
   app.logger.debug("Request topology view from RO...")
-  topo = _get_topology_view()
+  with timer.phase("topology"):
+    topo = _get_topology_view()
   if topo is None:
     app.logger.error("Topology view is missing!")
+    service_mgr.set_service_status(id=si.id,
+                                   status=ServiceInstance.STATUS_ERROR)
     return Response(status=httplib.INTERNAL_SERVER_ERROR,
                     response=json.dumps({"error": "RO is not available!",
                                          "RO": RO_URL}))
-  service_mgr.update_sg_hops_from_ro(si=si, topo=topo,
-                                     virtualizer_enabled=USE_VIRTUALIZER_FORMAT)
-  sg = si.update_sg_hop_ids(log=log)
+  with timer.phase("sg-hops"):
+    service_mgr.update_sg_hops_from_ro(
+      si=si, topo=topo, virtualizer_enabled=USE_VIRTUALIZER_FORMAT)
+    sg = service_mgr.update_sg_hop_ids(si=si)
   # Setup callback if it's necessary
   if USE_CALLBACK:
     app.logger.debug("Set callback URL: %s" % callback_mgr.url)
     params[CALLBACK_NAME] = callback_mgr.url
   # Setup format-related parameters
-  app.logger.log(VERBOSE, "Loaded Service Instance:\n%s" % sg.dump())
+  app.logger.log(VERBOSE, "Loaded Service Instance:\n%s", lazy(sg.dump))
   if USE_VIRTUALIZER_FORMAT:
     app.logger.info("Virtualizer format enabled!")
     # Prepare REST call parameters
     service_request_url = os.path.join(RO_URL, VIRTUALIZER_SERVICE_RPC)
     headers = {"Content-Type": "application/xml"}
     virt_srv = _convert_service_request(service_graph=sg,
-                                        virt_topo=topo)
+                                        virt_topo=topo,
+                                        timer=timer)
     if virt_srv is None:
       service_mgr.set_service_status(id=si.id,
                                      status=ServiceInstance.STATUS_ERROR)
@@ -281,124 +452,83 @@ def initiate_service ():
     service_request_url = os.path.join(RO_URL, NFFG_SERVICE_RPC)
     headers = {"Content-Type": "application/json"}
     raw_data = sg.dump()
-  # Backup modified service graph
-  si.update_sg(sg=sg)
-  app.logger.debug("Request stat:\n%s" % sg.get_stat())
+  # Backup and persist the modified service graph
+  service_mgr.update_sg(si=si, sg=sg)
+  app.logger.debug("Request stat:\n%s", lazy(sg.get_stat))
   # Sending service request
   app.logger.debug("Send service request to RO on: %s" % service_request_url)
   # Try to orchestrate the service instance
   try:
-    if USE_CALLBACK:
+    if USE_CALLBACK and NONBLOCKING_CALLBACK:
+      # Finish the initiation in a hook and release the request thread
+      cb = callback_mgr.subscribe_callback(hook=_service_initiation_hook,
+                                           cb_id=si.id,
+                                           type="SERVICE",
+                                           data=instantiate_params)
+      try:
+        with timer.phase("ro-post"):
+          ret = http_sessions.get(RO_ENDPOINT).post(url=service_request_url,
+                                                    headers=headers,
+                                                    params=params,
+                                                    data=raw_data,
+                                                    allow_redirects=False)
+      except (RequestException, TimeoutError):
+        callback_mgr.unsubscribe_callback(cb_id=cb.callback_id)
+        raise
+      MessageDumper().dump_to_file(data=raw_data, unique="service-out-RO")
+      if ret.status_code == httplib.ACCEPTED:
+        app.logger.info("Service initiation has been accepted by RO! "
+                        "Waiting for callback: %s..." % cb.callback_id)
+        resp_data = si.get_json_fragment()
+        MessageDumper().dump_to_file(data=resp_data, unique="service-response")
+        return Response(status=httplib.ACCEPTED,
+                        content_type="application/json",
+                        headers={"Location": "/ns-instances/%s" % si.id},
+                        response=resp_data)
+      callback_mgr.unsubscribe_callback(cb_id=cb.callback_id)
+      _status = _finish_service_initiation(
+        si=si, instantiate_params=instantiate_params,
+        result_code=ret.status_code, timer=timer)
+    elif USE_CALLBACK:
       cb = callback_mgr.subscribe_callback(hook=None,
                                            cb_id=si.id,
                                            type="SERVICE")
-      requests.post(url=service_request_url,
-                    headers=headers,
-                    params=params,
-                    data=raw_data,
-                    allow_redirects=False,
-                    timeout=HTTP_GLOBAL_TIMEOUT)
+      with timer.phase("ro-post"):
+        http_sessions.get(RO_ENDPOINT).post(url=service_request_url,
+                                            headers=headers,
+                                            params=params,
+                                            data=raw_data,
+                                            allow_redirects=False)
       MessageDumper().dump_to_file(data=raw_data, unique="service-out-RO")
       # Waiting for callback
-      cb = callback_mgr.wait_for_callback(callback=cb)
-      if cb.result_code == 0:
-        app.logger.error("Callback for request: %s exceeded timeout(%s)!"
-                         % (cb.callback_id, callback_mgr.wait_timeout))
-        # Something went wrong, status->error_creating
-        service_mgr.set_service_status(id=si.id,
-                                       status=ServiceInstance.STATUS_ERROR)
-        app.logger.debug("Send back TIMEOUT result...")
-        _status = httplib.REQUEST_TIMEOUT
-      else:
-        if 200 <= cb.result_code < 300:
-          app.logger.info("Service initiation has been forwarded with result:"
-                          " %s" % cb.result_code)
-          service_mgr.set_service_status(id=si.id,
-                                         status=ServiceInstance.STATUS_START)
-        else:
-          app.logger.error("Service initiation has been failed! "
-                           "Got status code: %s" % cb.result_code)
-          # Something went wrong, status->error_creating
-          service_mgr.set_service_status(id=si.id,
-                                         status=ServiceInstance.STATUS_ERROR)
-          app.logger.debug(
-            "Send back callback result code: %s" % cb.result_code)
-        # Use status code that received from callback
-        _status = cb.result_code
+      with timer.phase("callback-wait"):
+        cb = callback_mgr.wait_for_callback(callback=cb)
+      # Use status code that received from callback
+      _status = _finish_service_initiation(
+        si=si, instantiate_params=instantiate_params,
+        result_code=cb.result_code, timer=timer, from_callback=True)
     else:
-      ret = requests.post(url=service_request_url,
-                          headers=headers,
-                          params=params,
-                          data=raw_data,
-                          allow_redirects=False,
-                          timeout=HTTP_GLOBAL_TIMEOUT)
+      with timer.phase("ro-post"):
+        ret = http_sessions.get(RO_ENDPOINT).post(url=service_request_url,
+                                                  headers=headers,
+                                                  params=params,
+                                                  data=raw_data,
+                                                  allow_redirects=False)
       MessageDumper().dump_to_file(data=raw_data, unique="service-out-RO")
       # Check result
       if ret.status_code == httplib.ACCEPTED:
-        app.logger.info("Service initiation has been forwarded with result: "
-                        "%s" % ret.status_code)
-        # Due to the limitation of the current ESCAPE version, we can assume
-        # that the service request was successful, status->running
-        service_mgr.set_service_status(id=si.id,
-                                       status=ServiceInstance.STATUS_START)
-      else:
-        app.logger.error("Service initiation has been failed! "
-                         "Got status code: %s" % ret.status_code)
-        # Something went wrong, status->error_creating
-        service_mgr.set_service_status(id=si.id,
-                                       status=ServiceInstance.STATUS_ERROR)
-        app.logger.debug("Send back RO result code: %s" % ret.status_code)
+        _invalidate_topology_cache()
+      # Due to the limitation of the current ESCAPE version, we can assume
+      # that the accepted service request was successful, status->running
       # Use status code that received from ESCAPE
-      _status = ret.status_code
-    if service_mgr.get_service_status(si.id) == si.STATUS_START:
-      if 'callbackUrl' in instantiate_params:
-        app.logger.debug("Collect callback info for service-selection...")
-        cb_url = instantiate_params['callbackUrl']
-        app.logger.debug("Detected callback URL: %s" % cb_url)
-        data = _collect_si_callback_data(si=si,
-                                         req_params=instantiate_params)
-        app.logger.log(VERBOSE, "Collected callback data:\n%s"
-                       % pprint.pformat(data))
-        raw_data = json.dumps(data)
-        try:
-          ret = requests.post(url=cb_url,
-                              headers={"Content-Type": "application/json"},
-                              data=raw_data,
-                              allow_redirects=False,
-                              timeout=HTTP_GLOBAL_TIMEOUT)
-          MessageDumper().dump_to_file(data=raw_data, unique="service-callback")
-          if ret.status_code == httplib.OK:
-            app.logger.debug("Callback result: %s" % ret.text)
-          else:
-            app.logger.warning("Received unexpected result for callback: "
-                               "%s - %s" % (ret.status_code,
-                                            ret.text if ret.text else ""))
-        except RequestException:
-          app.logger.error("Failed to send callback to %s" % cb_url)
-      else:
-        app.logger.warning("No callback URL was defined in the request!")
-      # Notify Monitoring element if configured
-      if MONITORING_URL:
-        app.logger.info(
-          "Monitoring notification is enabled! Send notification...")
-        params = {'serviceid': si.id}
-        try:
-          requests.put(url=MONITORING_URL,
-                       params=params,
-                       allow_redirects=False,
-                       timeout=MONITORING_TIMEOUT)
-        except RequestException:
-          app.logger.warning("Monitoring component(%s) is unreachable!" %
-                             MONITORING_URL)
-        except TimeoutError:
-          app.logger.warning("Monitoring component(%s) is not available within "
-                             "timeout: %s!!" % (MONITORING_URL,
-                                                MONITORING_TIMEOUT))
+      _status = _finish_service_initiation(
+        si=si, instantiate_params=instantiate_params,
+        result_code=ret.status_code, timer=timer)
     # Return the status code
-    resp_data = json.dumps(si.get_json())
+    resp_data = si.get_json_fragment()
     MessageDumper().dump_to_file(data=resp_data, unique="service-response")
     return Response(status=_status,
-                    response=json.dumps(si.get_json()))
+                    response=resp_data)
   except RequestException:
     app.logger.error("RO is not available!")
     # Something went wrong, status->error_creating
@@ -409,8 +539,8 @@ def initiate_service ():
                       {"error": "RO is not available!",
                        "RO": RO_URL}))
   except TimeoutError:
-    app.logger.error("RO is not available within timeout: %s!"
-                     % HTTP_GLOBAL_TIMEOUT)
+    ro_timeout = http_sessions.get(RO_ENDPOINT).timeout
+    app.logger.error("RO is not available within timeout: %s!" % ro_timeout)
     # Something went wrong, status->error_creating
     service_mgr.set_service_status(id=si.id,
                                    status=ServiceInstance.STATUS_ERROR)
@@ -418,7 +548,7 @@ def initiate_service ():
                     response=json.dumps(
                       {"error": "RO exceeded timeout!",
                        "RO": RO_URL,
-                       "timeout": HTTP_GLOBAL_TIMEOUT}))
+                       "timeout": ro_timeout}))
   except:
     app.logger.exception(
       "Got unexpected exception during service initiation!")
@@ -428,6 +558,135 @@ def initiate_service ():
     return Response(status=httplib.BAD_REQUEST)
 
 
+def _service_initiation_hook (callback):
+  """
+  Callback hook of the non-blocking service initiation.
+
+  :param callback: received callback
+  :type callback: :class:`Callback`
+  :return: None
+  """
+  si = service_mgr.get_service(id=callback.callback_id)
+  if si is None:
+    app.logger.error("Service instance: %s of the received callback is not "
+                     "found!" % callback.callback_id)
+    return
+  # Release the callback thread, notifications can be slow
+  orchestration_executor.apply_async(_call_locked,
+                                     args=(_finish_service_initiation,),
+                                     kwds={"si": si,
+                                           "instantiate_params": callback.data,
+                                           "result_code":
+                                             callback.result_code,
+                                           "from_callback": True})
+
+
+def _is_accepted (result_code, from_callback=False):
+  """
+  The RO accepts a service request directly with 202 Accepted, while a
+  received callback reports the success with any 2xx result code.
+
+  :param result_code: result code of the RO
+  :type result_code: int
+  :param from_callback: the result code is received in a callback
+  :type from_callback: bool
+  :return: the service request was successful
+  :rtype: bool
+  """
+  if from_callback:
+    return 200 <= result_code < 300
+  return result_code == httplib.ACCEPTED
+
+
+def _finish_service_initiation (si, instantiate_params, result_code,
+                                timer=None, from_callback=False):
+  """
+  Set the status of the service instance based on the result of the RO and
+  notify the Marketplace and the Monitoring component about the started
+  service.
+
+  :param si: service instance
+  :type si: ServiceInstance
+  :param instantiate_params: parsed parameters of the initiation request
+  :type instantiate_params: dict
+  :param result_code: result code of the RO, 0 means timeout
+  :type result_code: int
+  :param timer: records the duration of the phases (optional)
+  :type timer: :class:`PhaseTimer`
+  :param from_callback: the result code is received in a callback
+  :type from_callback: bool
+  :return: HTTP status code for the requester
+  :rtype: int
+  """
+  if timer is None:
+    timer = PhaseTimer()
+  if result_code == 0:
+    app.logger.error("Callback for request: %s exceeded timeout(%s)!"
+                     % (si.id, callback_mgr.wait_timeout))
+    # Something went wrong, status->error_creating
+    service_mgr.set_service_status(id=si.id,
+                                   status=ServiceInstance.STATUS_ERROR)
+    app.logger.debug("Send back TIMEOUT result...")
+    return httplib.REQUEST_TIMEOUT
+  elif _is_accepted(result_code=result_code, from_callback=from_callback):
+    app.logger.info("Service initiation has been forwarded with result: %s"
+                    % result_code)
+    service_mgr.set_service_status(id=si.id,
+                                   status=ServiceInstance.STATUS_START)
+  else:
+    app.logger.error("Service initiation has been failed! "
+                     "Got status code: %s" % result_code)
+    # Something went wrong, status->error_creating
+    service_mgr.set_service_status(id=si.id,
+                                   status=ServiceInstance.STATUS_ERROR)
+    app.logger.debug("Send back RO result code: %s" % result_code)
+    return result_code
+  with timer.phase("notification"):
+    if 'callbackUrl' in instantiate_params:
+      app.logger.debug("Collect callback info for service-selection...")
+      cb_url = instantiate_params['callbackUrl']
+      app.logger.debug("Detected callback URL: %s" % cb_url)
+      data = _collect_si_callback_data(si=si,
+                                       req_params=instantiate_params)
+      app.logger.log(VERBOSE, "Collected callback data:\n%s",
+                     lazy(pprint.pformat, data))
+      raw_data = json.dumps(data)
+      try:
+        marketplace = http_sessions.get(MARKETPLACE_ENDPOINT)
+        ret = marketplace.post(url=cb_url,
+                               headers={"Content-Type": "application/json"},
+                               data=raw_data,
+                               allow_redirects=False)
+        MessageDumper().dump_to_file(data=raw_data, unique="service-callback")
+        if ret.status_code == httplib.OK:
+          app.logger.debug("Callback result: %s" % ret.text)
+        else:
+          app.logger.warning("Received unexpected result for callback: "
+                             "%s - %s" % (ret.status_code,
+                                          ret.text if ret.text else ""))
+      except RequestException:
+        app.logger.error("Failed to send callback to %s" % cb_url)
+    else:
+      app.logger.warning("No callback URL was defined in the request!")
+    # Notify Monitoring element if configured
+    if MONITORING_URL:
+      app.logger.info(
+        "Monitoring notification is enabled! Send notification...")
+      params = {'serviceid': si.id}
+      try:
+        http_sessions.get(MONITORING_ENDPOINT).put(url=MONITORING_URL,
+                                                   params=params,
+                                                   allow_redirects=False)
+      except RequestException:
+        app.logger.warning("Monitoring component(%s) is unreachable!" %
+                           MONITORING_URL)
+      except TimeoutError:
+        app.logger.warning("Monitoring component(%s) is not available within "
+                           "timeout: %s!!" % (MONITORING_URL,
+                                              MONITORING_TIMEOUT))
+  return result_code
+
+
 @app.route("/ns-instances", methods=['GET'])
 def list_service_instances ():
   """
@@ -436,6 +695,10 @@ def list_service_instances ():
   Rule: /ns-instances
   Method: GET
   Body: None
+  Query params (optional): status, ns-id, updated-since, limit, cursor
+
+  The cursor of the next page is returned in the X-Next-Cursor header if
+  more instances are available.
 
   Sample response:
   [
@@ -452,18 +715,109 @@ def list_service_instances ():
   """
   app.logger.debug(
     "Called list_service_instances() with path: GET /ns-instances")
+  try:
+    limit = int(request.args['limit']) if 'limit' in request.args else None
+    cursor = int(request.args['cursor']) if 'cursor' in request.args else None
+    updated_since = parse_timestamp(request.args['updated-since']) \
+      if 'updated-since' in request.args else None
+  except ValueError:
+    app.logger.error("Malformed query parameters: %s"
+                     % request.args.to_dict())
+    return Response(status=httplib.BAD_REQUEST)
+  if limit is not None and limit <= 0:
+    app.logger.error("Invalid paging parameters: %s"
+                     % request.args.to_dict())
+    return Response(status=httplib.BAD_REQUEST)
   if DYNAMIC_UPDATE_ENABLED:
+    # The addresses are up to date if the topology is cached
+    topo_version = _get_topology_version()
+    if topo_version is not None and _is_not_modified(
+       etag="ns-%s-%s" % (service_mgr.version, topo_version)):
+      return Response(status=httplib.NOT_MODIFIED)
     topo = _get_topology_view()
     if topo:
       service_mgr.update_si_addresses_from_ro(topo=topo)
-  resp = service_mgr.get_services_status()
-  app.logger.log(VERBOSE, "Sent response:\n%s" % pprint.pformat(resp))
-  response_data = json.dumps(resp)
-  MessageDumper().dump_to_file(data=response_data,
-                               unique="ns-instances-response")
+    topo_version = _get_topology_version(topo=topo)
+  else:
+    topo_version = 0
+  # Capture the version before collecting the instances
+  etag = "ns-%s-%s" % (service_mgr.version, topo_version)
+  if topo_version is not None and _is_not_modified(etag=etag):
+    return Response(status=httplib.NOT_MODIFIED)
+  services, next_cursor = service_mgr.find_services(
+    status=request.args.get('status'),
+    ns_id=request.args.get('ns-id'),
+    updated_since=updated_since,
+    cursor=cursor,
+    limit=limit)
+  headers = {}
+  if next_cursor is not None:
+    headers["X-Next-Cursor"] = str(next_cursor)
+  response = Response(status=httplib.OK,
+                      content_type="application/json",
+                      headers=headers,
+                      response=_stream_services(services=services))
+  if topo_version is not None:
+    response.set_etag(etag)
+  return response
+
+
+def _stream_services (services, chunk_size=100):
+  """
+  Generate the JSON list of the given service instances in chunks joined from
+  the cached JSON descriptions of the instances.
+
+  :param services: service instances
+  :type services: list
+  :param chunk_size: number of instances in one chunk
+  :type chunk_size: int
+  :return: generator of the response chunks
+  :rtype: collections.Iterator
+  """
+  # The whole response is only assembled if it is logged or dumped
+  dump = MessageDumper().will_dump(unique="ns-instances-response")
+  keep = dump or app.logger.isEnabledFor(VERBOSE)
+  sent = []
+  yield "["
+  for i in xrange(0, len(services), chunk_size):
+    fragments = [si.get_json_fragment() for si in services[i:i + chunk_size]]
+    yield (", " if i else "") + ", ".join(fragments)
+    if keep:
+      sent.extend(fragments)
+  yield "]"
+  if keep:
+    response_data = "[%s]" % ", ".join(sent)
+    app.logger.log(VERBOSE, "Sent response:\n%s", response_data)
+    if dump:
+      MessageDumper().dump_to_file(data=response_data,
+                                   unique="ns-instances-response",
+                                   sampled=True)
+
+
+@app.route("/ns-instances/<instance_id>", methods=['GET'])
+def get_service_instance (instance_id):
+  """
+  REST-API function for polling a service instance, e.g. after an
+  asynchronous service initiation.
+
+  Rule: /ns-instances/{id}
+  Method: GET
+  Body: None
+
+  :param instance_id: service instance ID
+  :type instance_id: str
+  :return: HTTP Response 200 OK
+  :rtype: flask.Response
+  """
+  app.logger.debug(
+    "Called get_service_instance() with path: GET /ns-instances/<id>")
+  si = service_mgr.get_service(id=instance_id)
+  if si is None:
+    app.logger.error("Service instance: %s is not found!" % instance_id)
+    return Response(status=httplib.NOT_FOUND)
   return Response(status=httplib.OK,
                   content_type="application/json",
-                  response=response_data)
+                  response=si.get_json_fragment())
 
 
 @app.route("/ns-instances/<instance_id>/terminate", methods=['PUT'])
@@ -494,22 +848,58 @@ def terminate_service (instance_id):
   """
   app.logger.debug(
     "Called terminate_service() with path: PUT /ns-instances/<id>/terminate")
+  timer = PhaseTimer()
+  response = _terminate_service(instance_id=instance_id, timer=timer)
+  return _report_timing(timer=timer, response=response,
+                        unique="terminate-timing")
+
+
+def _terminate_service (instance_id, timer):
+  """
+  Send the deletion of the given service instance to the RO.
+
+  :param instance_id: service instance ID
+  :type instance_id: str
+  :param timer: records the duration of the phases
+  :type timer: :class:`PhaseTimer`
+  :return: HTTP Response
+  :rtype: flask.Response
+  """
   app.logger.info("Received service termination with id: %s" % instance_id)
   # Get managed service instance
   si = service_mgr.get_service(id=instance_id)
   if si is None:
     app.logger.error("Service instance: %s is not found!" % instance_id)
     return Response(status=httplib.NOT_FOUND)
+  # Wait for the running orchestration or termination of the instance
+  with si.lock:
+    return _delete_service(si=si, timer=timer)
+
+
+def _delete_service (si, timer):
+  """
+  Remove the given service instance or send its deletion to the RO.
+
+  :param si: service instance
+  :type si: ServiceInstance
+  :param timer: records the duration of the phases
+  :type timer: :class:`PhaseTimer`
+  :return: HTTP Response
+  :rtype: flask.Response
+  """
   # If service instance is just created, stopped or error_created -> simply
   # delete
   app.logger.debug("Service status: %s" % si.status)
   if si.status != ServiceInstance.STATUS_START:
     app.logger.warning("Service instance: %s is not running! "
                        "Remove instance without service deletion from RO"
-                       % instance_id)
-    si = service_mgr.remove_service_instance(id=instance_id)
+                       % si.id)
+    si = service_mgr.remove_service_instance(id=si.id)
+    if si is None:
+      # Removed by a concurrent termination
+      return Response(status=httplib.NOT_FOUND)
     resp = si.get_json()
-    app.logger.log(VERBOSE, "Sent response:\n%s" % pprint.pformat(resp))
+    app.logger.log(VERBOSE, "Sent response:\n%s", lazy(pprint.pformat, resp))
     MessageDumper().dump_to_file(data=json.dumps(resp),
                                  unique="terminate-response")
     return Response(status=httplib.OK,
@@ -519,7 +909,7 @@ def terminate_service (instance_id):
   sg = si.sg
   # Load NFFG from file
   if sg is None:
-    app.logger.error("Service with id: %s is not found!" % instance_id)
+    app.logger.error("Service with id: %s is not found!" % si.id)
     return Response(status=httplib.NOT_FOUND)
   # Set DELETE mode
   sg.mode = NFFG.MODE_DEL
@@ -532,7 +922,8 @@ def terminate_service (instance_id):
   if USE_VIRTUALIZER_FORMAT:
     app.logger.info("Virtualizer format enabled!")
     app.logger.debug("Request topology view from RO...")
-    virt_topo = _get_topology_view()
+    with timer.phase("topology"):
+      virt_topo = _get_topology_view()
     if virt_topo is None:
       app.logger.error("Topology view is missing!")
       return Response(status=httplib.INTERNAL_SERVER_ERROR,
@@ -543,7 +934,8 @@ def terminate_service (instance_id):
     headers = {"Content-Type": "application/xml"}
     virt_srv = _convert_service_request(service_graph=sg,
                                         virt_topo=virt_topo,
-                                        delete=True)
+                                        delete=True,
+                                        timer=timer)
     if virt_srv is None:
       return Response(status=httplib.INTERNAL_SERVER_ERROR,
                       response=json.dumps({"error": "RO is not available!",
@@ -555,82 +947,80 @@ def terminate_service (instance_id):
     raw_data = sg.dump()
   app.logger.debug("Send request to RO on: %s" % service_request_url)
   try:
-    if USE_CALLBACK:
+    if USE_CALLBACK and NONBLOCKING_CALLBACK:
+      # Finish the termination in a hook and release the request thread
+      cb = callback_mgr.subscribe_callback(hook=_service_termination_hook,
+                                           cb_id=params[MESSAGE_ID_NAME],
+                                           type="SERVICE",
+                                           data=si.id)
+      try:
+        with timer.phase("ro-post"):
+          ret = http_sessions.get(RO_ENDPOINT).post(url=service_request_url,
+                                                    headers=headers,
+                                                    params=params,
+                                                    data=raw_data,
+                                                    allow_redirects=False)
+      except (RequestException, TimeoutError):
+        callback_mgr.unsubscribe_callback(cb_id=cb.callback_id)
+        raise
+      MessageDumper().dump_to_file(data=raw_data, unique="terminate-out-RO")
+      if ret.status_code == httplib.ACCEPTED:
+        app.logger.info("Service termination has been accepted by RO! "
+                        "Waiting for callback: %s..." % cb.callback_id)
+        resp = si.get_json()
+        MessageDumper().dump_to_file(data=json.dumps(resp),
+                                     unique="terminate-response")
+        return Response(status=httplib.ACCEPTED,
+                        content_type="application/json",
+                        headers={"Location": "/ns-instances/%s" % si.id},
+                        response=json.dumps(resp))
+      callback_mgr.unsubscribe_callback(cb_id=cb.callback_id)
+      _status = _finish_service_termination(si=si,
+                                            result_code=ret.status_code)
+    elif USE_CALLBACK:
       cb = callback_mgr.subscribe_callback(hook=None,
                                            cb_id=params[MESSAGE_ID_NAME],
                                            type="SERVICE")
-      requests.post(url=service_request_url,
-                    headers=headers,
-                    params=params,
-                    data=raw_data,
-                    allow_redirects=False,
-                    timeout=HTTP_GLOBAL_TIMEOUT)
+      with timer.phase("ro-post"):
+        http_sessions.get(RO_ENDPOINT).post(url=service_request_url,
+                                            headers=headers,
+                                            params=params,
+                                            data=raw_data,
+                                            allow_redirects=False)
       MessageDumper().dump_to_file(data=raw_data, unique="terminate-out-RO")
       # Waiting for callback
-      cb = callback_mgr.wait_for_callback(callback=cb)
-      if cb.result_code == 0:
-        app.logger.warning("Callback for request: %s exceeded timeout(%s)"
-                           % (cb.callback_id, callback_mgr.wait_timeout))
-        # Something went wrong, status->error_creating
-        service_mgr.set_service_status(id=si.id,
-                                       status=ServiceInstance.STATUS_ERROR)
-        log.debug("Send back TIMEOUT result...")
-        return Response(status=httplib.REQUEST_TIMEOUT)
-      else:
-        if 200 <= cb.result_code < 300:
-          app.logger.info("Service deletion has been forwarded with result: "
-                          "%s" % cb.result_code)
-          service_mgr.set_service_status(id=instance_id,
-                                         status=ServiceInstance.STATUS_STOPPED)
-          # Get and send Response
-          resp = si.get_json()
-          app.logger.log(VERBOSE, "Sent response:\n%s" % pprint.pformat(resp))
-          MessageDumper().dump_to_file(data=json.dumps(resp),
-                                       unique="terminate-response")
-          return Response(status=httplib.OK,
-                          content_type="application/json",
-                          response=json.dumps(resp))
-        else:
-          app.logger.error("Got error from RO during service deletion! "
-                           "Got status code: %s" % cb.result_code)
-          # Something went wrong, status->error_creating
-          service_mgr.set_service_status(id=si.id,
-                                         status=ServiceInstance.STATUS_ERROR)
-          app.logger.debug(
-            "Send back callback result code: %s" % cb.result_code)
-          return Response(status=cb.result_code)
+      with timer.phase("callback-wait"):
+        cb = callback_mgr.wait_for_callback(callback=cb)
+      # Use status code that received from callback
+      _status = _finish_service_termination(si=si, result_code=cb.result_code,
+                                            from_callback=True)
     else:
-      ret = requests.post(url=service_request_url,
-                          headers=headers,
-                          params=params,
-                          data=raw_data,
-                          allow_redirects=False,
-                          timeout=HTTP_GLOBAL_TIMEOUT)
+      with timer.phase("ro-post"):
+        ret = http_sessions.get(RO_ENDPOINT).post(url=service_request_url,
+                                                  headers=headers,
+                                                  params=params,
+                                                  data=raw_data,
+                                                  allow_redirects=False)
       MessageDumper().dump_to_file(data=raw_data, unique="terminate-out-RO")
       # Check result
       if ret.status_code == httplib.ACCEPTED:
-        app.logger.info("Service termination has been forwarded with result: "
-                        "%s" % ret.status_code)
-        # Due to the limitation of the current ESCAPE version, we can assume
-        # that the service request was successful, status->stopped
-        si = service_mgr.remove_service_instance(id=instance_id)
-        # Get and send Response
-        resp = si.get_json()
-        app.logger.log(VERBOSE, "Sent response:\n%s" % pprint.pformat(resp))
-        MessageDumper().dump_to_file(data=json.dumps(resp),
-                                     unique="terminate-response")
-        return Response(status=httplib.OK,
-                        content_type="application/json",
-                        response=json.dumps(resp))
-      else:
-        app.logger.error("Got error from RO during service deletion! "
-                         "Got status code: %s" % ret.status_code)
-        # Something went wrong, status->error_creating
-        service_mgr.set_service_status(id=si.id,
-                                       status=ServiceInstance.STATUS_ERROR)
-        app.logger.debug("Send back RO result code: %s" % ret.status_code)
-        # Use status code that received from ESCAPE
-        return Response(status=ret.status_code)
+        _invalidate_topology_cache()
+      # Due to the limitation of the current ESCAPE version, we can assume
+      # that the accepted service request was successful, status->stopped
+      # Use status code that received from ESCAPE
+      _status = _finish_service_termination(si=si,
+                                            result_code=ret.status_code,
+                                            remove=True)
+    if _status != httplib.OK:
+      return Response(status=_status)
+    # Get and send Response
+    resp = si.get_json()
+    app.logger.log(VERBOSE, "Sent response:\n%s", lazy(pprint.pformat, resp))
+    MessageDumper().dump_to_file(data=json.dumps(resp),
+                                 unique="terminate-response")
+    return Response(status=httplib.OK,
+                    content_type="application/json",
+                    response=json.dumps(resp))
   except RequestException:
     app.logger.error("RO(%s) is not available!" % RO_URL)
     return Response(status=httplib.INTERNAL_SERVER_ERROR,
@@ -643,6 +1033,84 @@ def terminate_service (instance_id):
     return Response(status=httplib.INTERNAL_SERVER_ERROR)
 
 
+def _service_termination_hook (callback):
+  """
+  Callback hook of the non-blocking service termination.
+
+  :param callback: received callback
+  :type callback: :class:`Callback`
+  :return: None
+  """
+  si = service_mgr.get_service(id=callback.data)
+  if si is None:
+    app.logger.error("Service instance: %s of the received callback is not "
+                     "found!" % callback.data)
+    return
+  orchestration_executor.apply_async(_call_locked,
+                                     args=(_finish_service_termination,),
+                                     kwds={"si": si,
+                                           "result_code":
+                                             callback.result_code,
+                                           "from_callback": True})
+
+
+def _call_locked (func, si, **kwargs):
+  """
+  Call the given function holding the lock of the service instance.
+
+  :param func: called function
+  :type func: callable
+  :param si: service instance passed to the function
+  :type si: ServiceInstance
+  :return: result of the function
+  """
+  with si.lock:
+    return func(si=si, **kwargs)
+
+
+def _finish_service_termination (si, result_code, remove=False,
+                                 from_callback=False):
+  """
+  Set the status of the service instance based on the result of the RO.
+
+  :param si: service instance
+  :type si: ServiceInstance
+  :param result_code: result code of the RO, 0 means timeout
+  :type result_code: int
+  :param remove: remove the terminated instance instead of stopping it
+  :type remove: bool
+  :param from_callback: the result code is received in a callback
+  :type from_callback: bool
+  :return: HTTP status code for the requester
+  :rtype: int
+  """
+  if result_code == 0:
+    app.logger.warning("Callback for request: %s-DELETE exceeded timeout(%s)"
+                       % (si.id, callback_mgr.wait_timeout))
+    # Something went wrong, status->error_creating
+    service_mgr.set_service_status(id=si.id,
+                                   status=ServiceInstance.STATUS_ERROR)
+    app.logger.debug("Send back TIMEOUT result...")
+    return httplib.REQUEST_TIMEOUT
+  elif _is_accepted(result_code=result_code, from_callback=from_callback):
+    app.logger.info("Service deletion has been forwarded with result: %s"
+                    % result_code)
+    if remove:
+      service_mgr.remove_service_instance(id=si.id)
+    else:
+      service_mgr.set_service_status(id=si.id,
+                                     status=ServiceInstance.STATUS_STOPPED)
+    return httplib.OK
+  else:
+    app.logger.error("Got error from RO during service deletion! "
+                     "Got status code: %s" % result_code)
+    # Something went wrong, status->error_creating
+    service_mgr.set_service_status(id=si.id,
+                                   status=ServiceInstance.STATUS_ERROR)
+    app.logger.debug("Send back RO result code: %s" % result_code)
+    return result_code
+
+
 #############################################################################
 # Proxy calls
 #############################################################################
@@ -650,15 +1118,23 @@ def terminate_service (instance_id):
 @app.route("/get-config", methods=['GET', 'POST'])
 def get_config ():
   app.logger.debug("Called get_config() with path: GET,POST /get-config")
+  topo_version = _get_topology_version(force_virtualizer=True)
+  if topo_version is not None and _is_not_modified(
+     etag="config-%s" % topo_version):
+    return Response(status=httplib.NOT_MODIFIED)
   topo = _get_topology_view(force_virtualizer=True)
   if topo is not None:
+    topo_version = _get_topology_version(topo=topo, force_virtualizer=True)
     # topo = topo.json()
     # app.logger.debug("Converted response:\n%s" % topo)
     topo = topo.xml()
     MessageDumper().dump_to_file(data=topo, unique="get-config-response")
-    return Response(status=httplib.OK,
-                    content_type="application/xml",
-                    response=topo)
+    response = Response(status=httplib.OK,
+                        content_type="application/xml",
+                        response=topo)
+    if topo_version is not None:
+      response.set_etag("config-%s" % topo_version)
+    return response
   else:
     return Response(status=httplib.INTERNAL_SERVER_ERROR)
 
@@ -751,26 +1227,149 @@ def mapping_info (service_id):
 @app.route("/placement-info/", methods=['GET'], strict_slashes=False)
 def placement_info ():
   app.logger.debug("Called placement_info() with path: GET /placement-info")
+  topo_version = _get_topology_version(force_virtualizer=True)
+  if topo_version is not None and _is_not_modified(
+     etag="placement-%s" % topo_version):
+    return Response(status=httplib.NOT_MODIFIED)
   topo = _get_topology_view(force_virtualizer=True)
   if topo is not None:
+    topo_version = _get_topology_version(topo=topo, force_virtualizer=True)
     data = _get_internet_saps(virtualizer=topo)
     if data is not None:
       resp_data = json.dumps(data)
       MessageDumper().dump_to_file(data=resp_data,
                                    unique="placement-info-response")
-      return Response(status=httplib.OK,
-                      content_type="application/json",
-                      response=resp_data)
+      response = Response(status=httplib.OK,
+                          content_type="application/json",
+                          response=resp_data)
+      if topo_version is not None:
+        response.set_etag("placement-%s" % topo_version)
+      return response
     else:
       return Response(status=httplib.INTERNAL_SERVER_ERROR)
   else:
     return Response(status=httplib.INTERNAL_SERVER_ERROR)
 
 
+@app.route("/metrics", methods=['GET'])
+def get_metrics ():
+  """
+  REST-API function for exporting the metrics in Prometheus text format.
+
+  Rule: /metrics
+  Method: GET
+  Body: None
+
+  :return: HTTP Response
+  :rtype: flask.Response
+  """
+  return Response(status=httplib.OK,
+                  content_type=CONTENT_TYPE,
+                  response=metrics.expose())
+
+
 #############################################################################
 # Helper functions
 #############################################################################
 
+def _setup_metrics ():
+  """
+  Create the exported metrics.
+
+  :return: metrics registry
+  :rtype: MetricsRegistry
+  """
+  registry = MetricsRegistry()
+  registry.counter(name="tnova_http_requests_total",
+                   help="Number of served REST-API requests",
+                   labels=("route", "method", "status"))
+  registry.histogram(name="tnova_http_request_duration_seconds",
+                     help="Latency of the served REST-API requests",
+                     labels=("route", "method"))
+  registry.counter(name="tnova_upstream_requests_total",
+                   help="Number of requests sent to the remote components",
+                   labels=("endpoint", "operation", "status"))
+  registry.histogram(name="tnova_upstream_request_duration_seconds",
+                     help="Latency of the requests sent to the remote "
+                          "components",
+                     labels=("endpoint", "operation"))
+  registry.gauge(name="tnova_service_instances",
+                 help="Number of managed service instances per status",
+                 labels=("status",),
+                 collect=lambda: service_mgr.count_services_by_status())
+  registry.gauge(name="tnova_pending_callbacks",
+                 help="Number of callbacks waiting for the RO",
+                 collect=lambda: callback_mgr.pending)
+  registry.gauge(name="tnova_cache_hit_ratio",
+                 help="Hit ratio of the caches",
+                 labels=("cache",),
+                 collect=lambda: {
+                   "topology": topology_cache.stats()["hit_ratio"],
+                   "template": service_mgr.get_template_stats()["hit_ratio"]})
+  registry.counter(name="tnova_ro_coalesced_requests_total",
+                   help="Number of RO requests served by an in-flight request",
+                   collect=lambda: ro_single_flight.deduplicated)
+  registry.gauge(name="tnova_trail_queue_depth",
+                 help="Number of trails waiting for writing",
+                 collect=lambda: MessageDumper().queue_depth)
+  registry.counter(name="tnova_trail_dropped_total",
+                   help="Number of trails dropped due to full queue",
+                   collect=lambda: MessageDumper().dropped)
+  return registry
+
+
+def _observe_upstream (endpoint, method, url, status, elapsed):
+  """
+  Record the metrics of a request sent to a remote component.
+
+  :param endpoint: endpoint name
+  :type endpoint: str
+  :param method: HTTP method
+  :type method: str
+  :param url: requested URL
+  :type url: str
+  :param status: HTTP status code or "error"
+  :param elapsed: latency in sec
+  :type elapsed: float
+  :return: None
+  """
+  if endpoint == RO_ENDPOINT:
+    # The RO calls are distinguished by the RPC name
+    operation = urlparse(url).path.rstrip('/').rsplit('/', 1)[-1]
+    if operation not in (NFFG_SERVICE_RPC, NFFG_TOPO_RPC, VIRTUALIZER_TOPO_RPC,
+                         VIRTUALIZER_SERVICE_RPC, VIRTUALIZER_MAPPINGS_RPC):
+      operation = "other"
+  else:
+    operation = method.lower()
+  metrics["tnova_upstream_requests_total"].inc(endpoint=endpoint,
+                                               operation=operation,
+                                               status=status)
+  metrics["tnova_upstream_request_duration_seconds"].observe(
+    elapsed, endpoint=endpoint, operation=operation)
+
+
+def _report_timing (timer, response, unique=None):
+  """
+  Add the recorded phases to the response as a Server-Timing header and dump
+  them into a trail if `unique` is given.
+
+  :param timer: recorded phases
+  :type timer: :class:`PhaseTimer`
+  :param response: HTTP Response
+  :type response: flask.Response
+  :param unique: trail category (optional)
+  :type unique: str
+  :return: the given HTTP Response
+  :rtype: flask.Response
+  """
+  if response is not None:
+    response.headers["Server-Timing"] = timer.server_timing()
+  if unique is not None:
+    MessageDumper().dump_to_file(data=json.dumps(timer.get_json()),
+                                 unique=unique)
+  return response
+
+
 def _collect_si_callback_data (si, req_params):
   """
   
@@ -843,47 +1442,130 @@ def _replace_port (url, port):
                                                       str(port))).geturl()
 
 
+def _get_topology_rpc (force_virtualizer=False):
+  """
+  :return: name of the RPC used for requesting the topology from the RO
+  :rtype: str
+  """
+  if force_virtualizer or USE_VIRTUALIZER_FORMAT:
+    return VIRTUALIZER_TOPO_RPC
+  else:
+    return NFFG_TOPO_RPC
+
+
+def _get_topology_version (topo=None, force_virtualizer=False):
+  """
+  Return with the version of the cached topology view without requesting it
+  from the RO.
+
+  :param topo: return the version only if the given topology is the cached
+    one, e.g. the result of :func:`_get_topology_view` (optional)
+  :type topo: :class:`Virtualizer` or :class:`NFFG`
+  :return: version of the cached topology or None if it is not cached
+  :rtype: int
+  """
+  entry = topology_cache.peek(
+    rpc=_get_topology_rpc(force_virtualizer=force_virtualizer))
+  if entry is not None and (topo is None or entry.parsed is topo):
+    return entry.version
+
+
+def _is_not_modified (etag):
+  """
+  :param etag: current entity tag of the requested resource
+  :type etag: str
+  :return: the requester has the current version of the resource
+  :rtype: bool
+  """
+  if request.if_none_match.contains_weak(etag):
+    app.logger.debug("Requested resource is not modified (ETag: %s)" % etag)
+    return True
+  return False
+
+
 def _get_topology_view (force_virtualizer=False):
   """
   Request and return with the topology provided by the RO.
+  The parsed topology is cached for TOPOLOGY_CACHE_TTL seconds and shared
+  between the callers, so it must not be modified in place.
 
   :return: requested and parser topology
   :rtype: :class:`Virtualizer` or :class:`NFFG`
   """
-  if force_virtualizer or USE_VIRTUALIZER_FORMAT:
-    topo_request_url = os.path.join(RO_URL, VIRTUALIZER_TOPO_RPC)
-  else:
-    topo_request_url = os.path.join(RO_URL, NFFG_TOPO_RPC)
+  topo_rpc = _get_topology_rpc(force_virtualizer=force_virtualizer)
+  cached = topology_cache.get(rpc=topo_rpc)
+  if cached is not None:
+    app.logger.debug("Using cached topology (version: %s, age: %.3fs)"
+                     % (cached.version, cached.age()))
+    return cached.parsed
+  # Concurrent requests share the same RO call and parsed topology. A call
+  # started before an invalidation is not joined as its result can be stale.
+  generation = topology_cache.generation
+  return ro_single_flight.do((topo_rpc, generation), _request_topology_view,
+                             topo_rpc, generation)
+
+
+def _request_topology_view (topo_rpc, generation):
+  """
+  Request, parse and cache the topology given by the RPC name from the RO.
+
+  :param topo_rpc: topology RPC name
+  :type topo_rpc: str
+  :param generation: generation of the topology cache before the request
+  :type generation: int
+  :return: requested and parser topology
+  :rtype: :class:`Virtualizer` or :class:`NFFG`
+  """
+  topo_request_url = os.path.join(RO_URL, topo_rpc)
   app.logger.debug("Send topo request to RO on: %s" % topo_request_url)
   try:
-    ret = requests.get(url=topo_request_url,
-                       allow_redirects=False,
-                       timeout=HTTP_GLOBAL_TIMEOUT)
+    ret = http_sessions.get(RO_ENDPOINT).get(url=topo_request_url,
+                                             allow_redirects=False)
     if ret.status_code != 200:
       app.logger.error(
         "Something went wrong during requesting topo! Got %s" % ret.status_code)
       return
     MessageDumper().dump_to_file(data=ret.text, unique="RO-get-config")
-    if force_virtualizer or USE_VIRTUALIZER_FORMAT:
+    if topo_rpc == VIRTUALIZER_TOPO_RPC:
       try:
         topo = Virtualizer.parse_from_text(text=ret.text)
-        app.logger.log(VERBOSE, "Received topology:\n%s" % topo.xml())
-        return topo
+        app.logger.log(VERBOSE, "Received topology:\n%s", lazy(topo.xml))
       except Exception as e:
         app.logger.error("Something went wrong during topo parsing "
                          "into Virtualizer:\n%s" % e)
+        return
     else:
       try:
         topo = NFFG.parse(raw_data=ret.text)
-        app.logger.log(VERBOSE, "Received topology:\n%s" % topo.dump())
-        return topo
+        app.logger.log(VERBOSE, "Received topology:\n%s", lazy(topo.dump))
       except Exception as e:
         app.logger.error("Something went wrong during topo parsing "
                          "into NFFG:\n%s" % e)
+        return
+    topology_cache.update(rpc=topo_rpc, raw=ret.text, parsed=topo,
+                          generation=generation)
+    app.logger.debug("Topology cache: %s, coalesced RO calls: %s"
+                     % (topology_cache.stats(), ro_single_flight.stats()))
+    return topo
   except RequestException:
     app.logger.error("RO is not available!")
 
 
+def _invalidate_topology_cache (callback=None):
+  """
+  Drop the cached topology views after the topology of the RO has been
+  changed.
+
+  :param callback: received callback (optional)
+  :type callback: :class:`Callback`
+  :return: None
+  """
+  if callback is not None:
+    app.logger.debug("Invalidate topology cache due to callback: %s"
+                     % callback.short())
+  topology_cache.invalidate()
+
+
 def _get_internet_saps (virtualizer):
   """
   
@@ -903,23 +1585,38 @@ def _get_internet_saps (virtualizer):
 
 
 def _get_mappings (data):
+  """
+  Request the mappings given by the request body from the RO. Concurrent calls
+  with identical body share the same RO call and parsed response.
+
+  :param data: mappings request body
+  :type data: str
+  :return: parsed mappings
+  :rtype: :class:`Mappings`
+  """
+  return ro_single_flight.do((VIRTUALIZER_MAPPINGS_RPC, data),
+                             _request_mappings, data)
+
+
+def _request_mappings (data):
   mappings_request_url = os.path.join(RO_URL, VIRTUALIZER_MAPPINGS_RPC)
   app.logger.debug("Send mappings request to RO on: %s" % mappings_request_url)
   try:
-    ret = requests.post(url=mappings_request_url,
-                        headers={"Content-Type": "application/xml"},
-                        data=data,
-                        allow_redirects=False,
-                        timeout=HTTP_GLOBAL_TIMEOUT)
+    ret = http_sessions.get(RO_ENDPOINT).post(
+      url=mappings_request_url,
+      headers={"Content-Type": "application/xml"},
+      data=data,
+      allow_redirects=False)
     MessageDumper().dump_to_file(data=ret.text, unique="RO-mappings")
     mappings = Mappings.parse_from_text(text=ret.text)
-    app.logger.log(VERBOSE, "Received mapping:\n%s" % mappings.xml())
+    app.logger.log(VERBOSE, "Received mapping:\n%s", lazy(mappings.xml))
     return mappings
   except RequestException:
     app.logger.error("RO is not available!")
 
 
-def _convert_service_request (service_graph, virt_topo, delete=False):
+def _convert_service_request (service_graph, virt_topo, delete=False,
+                              timer=None):
   """
   Convert given service request into Virtualizer format.
   Base Virtualizer is requested from RO.
@@ -928,26 +1625,36 @@ def _convert_service_request (service_graph, virt_topo, delete=False):
   :type service_graph: :class:`NFFG`
   :param delete: delete service request instead of adding to base virtualizer
   :type delete: bool
+  :param timer: records the duration of the phases (optional)
+  :type timer: :class:`PhaseTimer`
   :return: converted service request
   :rtype: :class:`Virtualizer`
   """
   if virt_topo is None:
     app.logger.error("Topology view is missing!")
     return
+  if timer is None:
+    timer = PhaseTimer()
   if not delete:
     app.logger.debug("Start service request (INITIATE) conversion...")
     nc = NFFGConverter(logger=app.logger)
-    srv_virtualizer = nc.convert_service_request_init(request=service_graph,
-                                                      base=virt_topo,
-                                                      reinstall=False)
+    with timer.phase("request-convert"):
+      srv_virtualizer = nc.convert_service_request_init(request=service_graph,
+                                                        base=virt_topo,
+                                                        reinstall=False)
   else:
     app.logger.debug("Start service request (DELETE) conversion...")
     nc = NFFGConverter(logger=app.logger)
-    srv_virtualizer = nc.convert_service_request_del(request=service_graph,
-                                                     base=virt_topo)
-  app.logger.log(VERBOSE, "Converted request:\n%s" % srv_virtualizer.xml())
+    with timer.phase("request-convert"):
+      srv_virtualizer = nc.convert_service_request_del(request=service_graph,
+                                                       base=virt_topo)
+  app.logger.log(VERBOSE, "Converted request:\n%s",
+                 lazy(srv_virtualizer.xml))
   if ENABLE_DIFF:
     app.logger.debug("Diff format enabled! Calculate diff...")
+    # Topology view is shared through the topology cache, use a private copy
+    with timer.phase("request-copy"):
+      virt_topo = virt_topo.full_copy()
     # Avoid undesired replace from different relative/absolute leafrefs
     virt_topo.convert_leafrefs_to_relative_path()
     srv_virtualizer.convert_leafrefs_to_relative_path()
@@ -955,8 +1662,9 @@ def _convert_service_request (service_graph, virt_topo, delete=False):
     virt_topo.id.set_value(srv_virtualizer.id.get_value())
     virt_topo.name.set_value(srv_virtualizer.name.get_value())
     # srv_virtualizer = Virtualizer.parse_from_text(srv_virtualizer.xml())
-    srv_virtualizer = virt_topo.diff(srv_virtualizer)
-    app.logger.log(VERBOSE, "Calculated diff:\n%s" % srv_virtualizer.xml())
+    with timer.phase("request-diff"):
+      srv_virtualizer = virt_topo.diff(srv_virtualizer)
+    app.logger.log(VERBOSE, "Calculated diff:\n%s", lazy(srv_virtualizer.xml))
   return srv_virtualizer
 
 
@@ -968,6 +1676,27 @@ def _shutdown ():
   """
   # Shutdown Callback Manager
   callback_mgr.shutdown()
+  # Let the running orchestrations and hooks finish their status changes
+  if orchestration_executor is not None:
+    orchestration_executor.close()
+    waiter = threading.Thread(target=orchestration_executor.join)
+    waiter.daemon = True
+    waiter.start()
+    waiter.join(ORCHESTRATION_SHUTDOWN_TIMEOUT)
+    if waiter.is_alive():
+      app.logger.warning("Orchestration tasks have not finished in %ss! Their "
+                         "status changes are lost..."
+                         % ORCHESTRATION_SHUTDOWN_TIMEOUT)
+  # Close kept-alive connections
+  app.logger.debug("HTTP connection usage: %s" % http_sessions.stats())
+  http_sessions.close()
+  app.logger.debug("Service template cache usage: %s"
+                   % service_mgr.get_template_stats())
+  # Commit the pending changes of the service instances
+  if registry is not None:
+    registry.close()
+  # Write the pending trails
+  MessageDumper().shutdown()
   # No correct way to shutdown Flask - WTF??
 
 
@@ -995,21 +1724,49 @@ def main ():
   # Entry point of main, start components
   app.logger.info("Initialize components...")
   try:
+    global http_sessions
     global catalogue
     global service_mgr
+    global registry
     global converter
     global callback_mgr
+    global orchestration_executor
+    global topology_cache
+    global ro_single_flight
+    global metrics
+    metrics = _setup_metrics()
+    # Create pooled HTTP sessions with endpoint specific timeouts
+    http_sessions = SessionManager(pool_size=HTTP_POOL_SIZE,
+                                   observer=_observe_upstream)
+    http_sessions.register(name=RO_ENDPOINT,
+                           timeout=RO_TIMEOUT or HTTP_GLOBAL_TIMEOUT)
+    http_sessions.register(name=MONITORING_ENDPOINT, timeout=MONITORING_TIMEOUT)
+    http_sessions.register(name=MARKETPLACE_ENDPOINT,
+                           timeout=MARKETPLACE_TIMEOUT or HTTP_GLOBAL_TIMEOUT)
     # Create Catalogue for VNFDs
     catalogue = VNFCatalogue(use_remote=USE_VNF_STORE,
                              vnf_store_url=VNF_STORE_URL,
                              cache_dir=os.path.realpath(
                                PWD + "/" + CATALOGUE_DIR),
-                             logger=app.logger)
+                             logger=app.logger,
+                             session=http_sessions.register(
+                               name=VNF_STORE_ENDPOINT,
+                               timeout=VNFCatalogue.REQUEST_TIMEOUT))
     catalogue.initialize()
+    if not USE_VNF_STORE and CATALOGUE_WATCH_INTERVAL > 0:
+      catalogue.start_watcher(interval=CATALOGUE_WATCH_INTERVAL)
     # Create converter
     converter = TNOVAConverter(vnf_catalogue=catalogue,
                                logger=app.logger)
     converter.initialize()
+    # Create registry for the service instances
+    if REGISTRY_PATH:
+      registry = ServiceRegistry(path=os.path.realpath(
+        os.path.join(PWD, REGISTRY_PATH)), logger=app.logger)
+      registry.open()
+    else:
+      app.logger.warning("Service registry is disabled! Service instances "
+                         "will be lost at restart!")
     # Create Service manager
     service_mgr = ServiceManager(converter=converter,
                                  use_remote=USE_SERVICE_CATALOG,
@@ -1018,17 +1775,39 @@ def main ():
                                    PWD + "/" + SERVICE_NFFG_DIR),
                                  nsd_dir=os.path.realpath(
                                    PWD + "/" + NSD_DIR),
-                                 logger=app.logger)
+                                 logger=app.logger,
+                                 session=http_sessions.register(
+                                   name=SERVICE_CATALOG_ENDPOINT,
+                                   timeout=ServiceManager.REQUEST_TIMEOUT),
+                                 registry=registry)
     service_mgr.initialize()
+    # Create topology cache
+    topology_cache = TopologyCache(ttl=TOPOLOGY_CACHE_TTL)
+    ro_single_flight = SingleFlight()
     # Create Callback Manager
     callback_mgr = CallbackManager(domain_name="RO",
                                    callback_url=CALLBACK_URL,
                                    logger=app.logger.getChild("callback"),
                                    timeout=HTTP_GLOBAL_TIMEOUT)
+    # Every callback signals a changed topology in the RO
+    callback_mgr.register_listener(_invalidate_topology_cache)
     if USE_CALLBACK:
       callback_mgr.start()
-    # Start Flask
-    app.run(host='0.0.0.0', port=LISTENING_PORT, use_reloader=False)
+    # Create executor for service orchestration and callback hooks
+    if ASYNC_SERVICE_INSTANTIATION or (USE_CALLBACK and NONBLOCKING_CALLBACK):
+      app.logger.debug("Create orchestration executor with %s threads..."
+                       % ORCHESTRATION_WORKERS)
+      orchestration_executor = ThreadPool(processes=ORCHESTRATION_WORKERS)
+    # Start REST-API
+    if WORKER_THREADS > 0:
+      app.logger.info("Start REST-API with %s worker threads..."
+                      % WORKER_THREADS)
+      server = PooledWSGIServer(host='0.0.0.0', port=LISTENING_PORT, app=app,
+                                workers=WORKER_THREADS)
+      server.serve_forever()
+    else:
+      # Start Flask
+      app.run(host='0.0.0.0', port=LISTENING_PORT, use_reloader=False)
   except KeyboardInterrupt:
     _shutdown()
 
@@ -1043,6 +1822,11 @@ if __name__ == "__main__":
   parser.add_argument("-d", "--debug", action="count", default=0,
                       help="run in debug mode (can use multiple times for more "
                            "verbose logging, default logging level: INFO)")
+  parser.add_argument("-a", "--async", action="store_true", default=False,
+                      dest="async_service",
+                      help="respond to service initiation before the RO "
+                           "orchestration, default: %s"
+                           % ASYNC_SERVICE_INSTANTIATION)
   parser.add_argument("-c", "--callback", action="store", type=str,
                       metavar="URL", default="", nargs="?",
                       help="enable callbacks from the RO with given URL, "
@@ -1052,17 +1836,82 @@ if __name__ == "__main__":
                       help="URL of the monitoring component, default: None")
   parser.add_argument("-r", "--ro", action="store", type=str, default=False,
                       metavar="URL", help="RO's full URL, default: %s" % RO_URL)
+  parser.add_argument("--pool-size", action="store", type=int, metavar="N",
+                      help="max number of kept-alive connections per remote "
+                           "endpoint, default: %s" % HTTP_POOL_SIZE)
+  parser.add_argument("-n", "--nonblocking", action="store_true",
+                      default=False, dest="nonblocking_callback",
+                      help="respond right after the RO accepted the request "
+                           "and finish it when the callback is received, "
+                           "default: %s" % NONBLOCKING_CALLBACK)
   parser.add_argument("-p", "--port", action="store", type=int,
                       help="REST-API port, default: %s" % LISTENING_PORT)
+  parser.add_argument("-w", "--workers", action="store", type=int,
+                      metavar="N",
+                      help="serve the REST-API with a pool of N worker "
+                           "threads, default: %s (single-threaded)"
+                           % WORKER_THREADS)
   parser.add_argument("-s", "--vnfstore", action="store", type=str,
                       help="enable remote VNFStore with given full URL, "
                            "default: %s" % VNF_STORE_URL)
+  parser.add_argument("--catalogue-watch", action="store", type=float,
+                      metavar="SEC",
+                      help="reload the local VNFD folder in the background "
+                           "in every SEC seconds instead of on every "
+                           "conversion, default: %s" % CATALOGUE_WATCH_INTERVAL)
+  parser.add_argument("--registry", action="store", type=str, metavar="PATH",
+                      help="persist the service instances into the given "
+                           "SQLite file, empty string disables it, "
+                           "default: %s" % REGISTRY_PATH)
   parser.add_argument("-S", "--servicecatalog", action="store", type=str,
                       help="enable remote Service Catalog with given full URL, "
                            "default: %s" % SERVICE_CATALOG_URL)
+  parser.add_argument("--topology-ttl", action="store", type=float,
+                      metavar="SEC",
+                      help="cache topology views requested from the RO for "
+                           "SEC seconds, default: %ss" % TOPOLOGY_CACHE_TTL)
   parser.add_argument("-t", "--timeout", action="store", type=int, metavar="t",
                       help="timeout in sec for HTTP communication, default: %ss"
                            % HTTP_GLOBAL_TIMEOUT)
+  parser.add_argument("--ro-timeout", action="store", type=float,
+                      metavar="SEC",
+                      help="timeout in sec for the requests sent to the RO, "
+                           "default: global timeout")
+  parser.add_argument("--marketplace-timeout", action="store", type=float,
+                      metavar="SEC",
+                      help="timeout in sec for the callbacks sent to the "
+                           "Marketplace, default: global timeout")
+  parser.add_argument("--monitoring-timeout", action="store", type=float,
+                      metavar="SEC",
+                      help="timeout in sec for the notifications sent to the "
+                           "monitoring component, default: %ss"
+                           % MONITORING_TIMEOUT)
+  parser.add_argument("--trail-disable", action="append", metavar="CAT",
+                      help="do not dump trails of the given category, can be "
+                           "used multiple times, default: %s" % TRAIL_DISABLED)
+  parser.add_argument("--trail-sample", action="append", metavar="CAT=N",
+                      help="dump only 1 in every N trails of the given "
+                           "category, can be used multiple times, default: %s"
+                           % TRAIL_SAMPLING)
+  parser.add_argument("--trail-max-size", action="store", type=int,
+                      metavar="BYTES",
+                      help="truncate trail payloads larger than BYTES, "
+                           "default: %s (no limit)" % TRAIL_MAX_SIZE)
+  parser.add_argument("--trail-max-files", action="store", type=int,
+                      metavar="N",
+                      help="rotate out the oldest trails above N files, "
+                           "0 means no limit, default: %s" % TRAIL_MAX_FILES)
+  parser.add_argument("--trail-max-total", action="store", type=int,
+                      metavar="BYTES",
+                      help="rotate out the oldest trails above BYTES in total, "
+                           "0 means no limit, default: %s" % TRAIL_MAX_TOTAL)
+  parser.add_argument("--trail-max-age", action="store", type=float,
+                      metavar="SEC",
+                      help="rotate out the trails older than SEC seconds, "
+                           "0 means no limit, default: %s" % TRAIL_MAX_AGE)
+  parser.add_argument("--trail-archive", action="store_true", default=False,
+                      help="compress the rotated trails instead of deleting "
+                           "them, default: %s" % TRAIL_ARCHIVE)
   parser.add_argument("-v", "--virtualizer", action="store_true", default=False,
                       help="enable Virtualizer format, default: %s"
                            % USE_VIRTUALIZER_FORMAT)
@@ -1088,11 +1937,139 @@ if __name__ == "__main__":
     log.info("Using explicit timeout value: %ss" % args.timeout)
     HTTP_GLOBAL_TIMEOUT = args.timeout
 
+  # Set endpoint specific timeouts
+  if args.ro_timeout:
+    RO_TIMEOUT = args.ro_timeout
+    log.info("Using explicit RO timeout: %ss" % RO_TIMEOUT)
+  elif 'RO_TIMEOUT' in os.environ:
+    RO_TIMEOUT = float(os.environ.get('RO_TIMEOUT'))
+    log.info("Set RO timeout from environment variable (RO_TIMEOUT): %ss"
+             % RO_TIMEOUT)
+  if args.marketplace_timeout:
+    MARKETPLACE_TIMEOUT = args.marketplace_timeout
+    log.info("Using explicit Marketplace timeout: %ss" % MARKETPLACE_TIMEOUT)
+  elif 'MARKETPLACE_TIMEOUT' in os.environ:
+    MARKETPLACE_TIMEOUT = float(os.environ.get('MARKETPLACE_TIMEOUT'))
+    log.info("Set Marketplace timeout from environment variable "
+             "(MARKETPLACE_TIMEOUT): %ss" % MARKETPLACE_TIMEOUT)
+  if args.monitoring_timeout:
+    MONITORING_TIMEOUT = args.monitoring_timeout
+    log.info("Using explicit monitoring timeout: %ss" % MONITORING_TIMEOUT)
+  elif 'MONITORING_TIMEOUT' in os.environ:
+    MONITORING_TIMEOUT = float(os.environ.get('MONITORING_TIMEOUT'))
+    log.info("Set monitoring timeout from environment variable "
+             "(MONITORING_TIMEOUT): %ss" % MONITORING_TIMEOUT)
+
+  # Set trail filtering
+  if args.trail_disable:
+    TRAIL_DISABLED = args.trail_disable
+    log.info("Disable trails from command line: %s" % TRAIL_DISABLED)
+  elif 'TRAIL_DISABLED' in os.environ:
+    TRAIL_DISABLED = [c.strip() for c in
+                      os.environ.get('TRAIL_DISABLED').split(',') if c.strip()]
+    log.info("Disable trails from environment variable (TRAIL_DISABLED): %s"
+             % TRAIL_DISABLED)
+  if args.trail_sample:
+    _sampling = args.trail_sample
+  elif 'TRAIL_SAMPLING' in os.environ:
+    _sampling = [c for c in os.environ.get('TRAIL_SAMPLING').split(',') if c]
+  else:
+    _sampling = []
+  for _rate in _sampling:
+    try:
+      _category, _n = _rate.rsplit('=', 1)
+      TRAIL_SAMPLING[_category.strip()] = int(_n)
+    except ValueError:
+      parser.error("Wrong trail sampling format: %s (CAT=N)" % _rate)
+  if _sampling:
+    log.info("Set trail sampling: %s" % TRAIL_SAMPLING)
+  if args.trail_max_size is not None:
+    TRAIL_MAX_SIZE = args.trail_max_size
+    log.info("Using explicit trail max size: %s" % TRAIL_MAX_SIZE)
+  elif 'TRAIL_MAX_SIZE' in os.environ:
+    TRAIL_MAX_SIZE = int(os.environ.get('TRAIL_MAX_SIZE'))
+    log.info("Set trail max size from environment variable "
+             "(TRAIL_MAX_SIZE): %s" % TRAIL_MAX_SIZE)
+  # Set trail retention
+  if args.trail_max_files is not None:
+    TRAIL_MAX_FILES = args.trail_max_files
+    log.info("Using explicit trail max files: %s" % TRAIL_MAX_FILES)
+  elif 'TRAIL_MAX_FILES' in os.environ:
+    TRAIL_MAX_FILES = int(os.environ.get('TRAIL_MAX_FILES'))
+    log.info("Set trail max files from environment variable "
+             "(TRAIL_MAX_FILES): %s" % TRAIL_MAX_FILES)
+  if args.trail_max_total is not None:
+    TRAIL_MAX_TOTAL = args.trail_max_total
+    log.info("Using explicit trail max total size: %s" % TRAIL_MAX_TOTAL)
+  elif 'TRAIL_MAX_TOTAL' in os.environ:
+    TRAIL_MAX_TOTAL = int(os.environ.get('TRAIL_MAX_TOTAL'))
+    log.info("Set trail max total size from environment variable "
+             "(TRAIL_MAX_TOTAL): %s" % TRAIL_MAX_TOTAL)
+  if args.trail_max_age is not None:
+    TRAIL_MAX_AGE = args.trail_max_age
+    log.info("Using explicit trail max age: %ss" % TRAIL_MAX_AGE)
+  elif 'TRAIL_MAX_AGE' in os.environ:
+    TRAIL_MAX_AGE = float(os.environ.get('TRAIL_MAX_AGE'))
+    log.info("Set trail max age from environment variable "
+             "(TRAIL_MAX_AGE): %ss" % TRAIL_MAX_AGE)
+  if args.trail_archive:
+    TRAIL_ARCHIVE = True
+    log.info("Archive rotated trails from command line")
+  elif 'TRAIL_ARCHIVE' in os.environ:
+    TRAIL_ARCHIVE = os.environ.get(
+      'TRAIL_ARCHIVE').lower() in ("1", "true", "yes")
+    log.info("Set trail archiving from environment variable "
+             "(TRAIL_ARCHIVE): %s" % TRAIL_ARCHIVE)
+  MessageDumper.configure(disabled=TRAIL_DISABLED,
+                          sampling=TRAIL_SAMPLING,
+                          max_payload=TRAIL_MAX_SIZE,
+                          max_files=TRAIL_MAX_FILES,
+                          max_size=TRAIL_MAX_TOTAL,
+                          max_age=TRAIL_MAX_AGE,
+                          archive=TRAIL_ARCHIVE)
+
+  # Set service registry
+  if args.registry is not None:
+    REGISTRY_PATH = args.registry
+    log.info("Using explicit service registry: %s" % REGISTRY_PATH)
+  elif 'REGISTRY_PATH' in os.environ:
+    REGISTRY_PATH = os.environ.get('REGISTRY_PATH')
+    log.info("Set service registry from environment variable "
+             "(REGISTRY_PATH): %s" % REGISTRY_PATH)
+
+  # Set topology cache
+  if args.topology_ttl is not None:
+    TOPOLOGY_CACHE_TTL = args.topology_ttl
+    log.info("Using explicit topology cache TTL: %ss" % TOPOLOGY_CACHE_TTL)
+  elif 'TOPOLOGY_CACHE_TTL' in os.environ:
+    TOPOLOGY_CACHE_TTL = float(os.environ.get('TOPOLOGY_CACHE_TTL'))
+    log.info("Set topology cache TTL from environment variable "
+             "(TOPOLOGY_CACHE_TTL): %ss" % TOPOLOGY_CACHE_TTL)
+
+  # Set HTTP connection pool size
+  if args.pool_size:
+    HTTP_POOL_SIZE = args.pool_size
+    log.info("Using explicit HTTP connection pool size: %s" % HTTP_POOL_SIZE)
+  elif 'HTTP_POOL_SIZE' in os.environ:
+    HTTP_POOL_SIZE = int(os.environ.get('HTTP_POOL_SIZE'))
+    log.info("Set HTTP connection pool size from environment variable "
+             "(HTTP_POOL_SIZE): %s" % HTTP_POOL_SIZE)
+
   if args.port:
     LISTENING_PORT = args.port
     log.info("Using explicit listening port: %s" % LISTENING_PORT)
   else:
     log.debug("Using default listening port: %s" % LISTENING_PORT)
+  # Set serving threads
+  if args.workers is not None:
+    WORKER_THREADS = args.workers
+    log.info("Using explicit number of worker threads: %s" % WORKER_THREADS)
+  elif 'WORKER_THREADS' in os.environ:
+    WORKER_THREADS = int(os.environ.get('WORKER_THREADS'))
+    log.info("Set number of worker threads from environment variable "
+             "(WORKER_THREADS): %s" % WORKER_THREADS)
+  else:
+    log.debug("Using single-threaded REST-API server")
   # Set RO_URL
   if args.ro:
     RO_URL = args.ro
@@ -1115,6 +2092,15 @@ if __name__ == "__main__":
              "(VNF_STORE_URL): %s" % VNF_STORE_URL)
   else:
     log.info("Disable using remote VNF Store")
+  # Set VNFD folder watching
+  if args.catalogue_watch is not None:
+    CATALOGUE_WATCH_INTERVAL = args.catalogue_watch
+    log.info("Using explicit catalogue watch interval: %ss"
+             % CATALOGUE_WATCH_INTERVAL)
+  elif 'CATALOGUE_WATCH_INTERVAL' in os.environ:
+    CATALOGUE_WATCH_INTERVAL = float(os.environ.get('CATALOGUE_WATCH_INTERVAL'))
+    log.info("Set catalogue watch interval from environment variable "
+             "(CATALOGUE_WATCH_INTERVAL): %ss" % CATALOGUE_WATCH_INTERVAL)
   # Set VNF_STORE_URL
   if args.servicecatalog:
     SERVICE_CATALOG_URL = args.servicecatalog
@@ -1145,6 +2131,17 @@ if __name__ == "__main__":
     log.info("Enable callbacks with default URL")
   else:
     log.debug("Disable callback-based communication")
+  # Non-blocking callbacks
+  if args.nonblocking_callback:
+    NONBLOCKING_CALLBACK = True
+    log.info("Enable non-blocking callbacks from command line")
+  elif 'NONBLOCKING_CALLBACK' in os.environ:
+    NONBLOCKING_CALLBACK = os.environ.get(
+      'NONBLOCKING_CALLBACK').lower() in ("1", "true", "yes")
+    log.info("Set non-blocking callbacks from environment variable "
+             "(NONBLOCKING_CALLBACK): %s" % NONBLOCKING_CALLBACK)
+  else:
+    log.debug("Using blocking callbacks")
   # Store monitoring URL
   if args.monitoring:
     MONITORING_URL = args.monitoring
@@ -1156,6 +2153,17 @@ if __name__ == "__main__":
              "(MONITORING_URL): %s" % MONITORING_URL)
   else:
     log.info("Disable monitoring notifications")
+  # Asynchronous service initiation
+  if args.async_service:
+    ASYNC_SERVICE_INSTANTIATION = True
+    log.info("Enable asynchronous service initiation from command line")
+  elif 'ASYNC_SERVICE_INSTANTIATION' in os.environ:
+    ASYNC_SERVICE_INSTANTIATION = os.environ.get(
+      'ASYNC_SERVICE_INSTANTIATION').lower() in ("1", "true", "yes")
+    log.info("Set asynchronous service initiation from environment variable "
+             "(ASYNC_SERVICE_INSTANTIATION): %s" % ASYNC_SERVICE_INSTANTIATION)
+  else:
+    log.debug("Using synchronous service initiation")
   # Virtualizer format
   if args.virtualizer:
     USE_VIRTUALIZER_FORMAT = args.virtualizer
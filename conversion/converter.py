@@ -22,7 +22,8 @@ import sys
 
 from nffg_lib.nffg import NFFG
 from nsd_wrapper import NSWrapper
-from util.colored_logger import ColoredLogger
+from util.allocator import IdAllocator
+from util.colored_logger import ColoredLogger, lazy
 from vnf_catalogue import VNFCatalogue, MissingVNFDException
 
 
@@ -34,6 +35,9 @@ class TNOVAConverter(object):
   # DEFAULT_SAP_PORT_ID = None  # None = generated an UUID by defaults
   DEFAULT_SAP_PORT_ID = 1
   DEFAULT_PLACEMENT_SUBNET = "Automatic"
+  # Valid VLAN ids (0 and 4095 are reserved)
+  MIN_VLAN_ID = 1
+  MAX_VLAN_ID = 4094
   ANTIAFFINITY_CONSTRAINT = "antiaffinity"
 
   def __init__ (self, logger=None, vnf_catalogue=None):
@@ -51,7 +55,13 @@ class TNOVAConverter(object):
       self.__catalogue = vnf_catalogue
     else:
       self.__catalogue = VNFCatalogue(logger=logger)
+    # Registered tags: tag id --> VLAN id
     self.vlan_register = {}
+    # Allocated VLAN ids owned by the NS id
+    self.__vlans = IdAllocator(start=self.MIN_VLAN_ID,
+                               stop=self.MAX_VLAN_ID + 1)
+    # Reverse map: VLAN id --> tag id
+    self.__vlan_tags = {}
 
   def __str__ (self):
     return "%s()" % self.__class__.__name__
@@ -262,6 +272,8 @@ class TNOVAConverter(object):
 
     :param abstract_id: raw link id
     :type abstract_id: str or int
+    :param ns_id: NS id the tag is allocated for
+    :type ns_id: str
     :return: valid VLAN id
     :rtype: int
     """
@@ -275,8 +287,9 @@ class TNOVAConverter(object):
     try:
       vlan_id = int(tag_id)
       # Check if the raw_id is free
-      if 0 < vlan_id < 4095 and vlan_id not in self.vlan_register.itervalues():
-        self.vlan_register[tag_id] = vlan_id
+      if self.MIN_VLAN_ID <= vlan_id <= self.MAX_VLAN_ID and \
+         self.__vlans.reserve(id=vlan_id, owner=ns_id):
+        self.__register_tag(tag_id=tag_id, vlan_id=vlan_id)
         self.log.debug(
           "Abstract ID a valid not-taken VLAN ID! Register %s ==> %s" % (
             tag_id, vlan_id))
@@ -291,9 +304,9 @@ class TNOVAConverter(object):
       # reserved)
       trailer_num = int(trailer_num.group())  # Get matched data from Match obj
       # Check if the VLAN candidate is free
-      if 0 < trailer_num < 4095 and \
-         trailer_num not in self.vlan_register.itervalues():
-        self.vlan_register[tag_id] = trailer_num
+      if self.MIN_VLAN_ID <= trailer_num <= self.MAX_VLAN_ID and \
+         self.__vlans.reserve(id=trailer_num, owner=ns_id):
+        self.__register_tag(tag_id=tag_id, vlan_id=trailer_num)
         self.log.debug(
           "Trailing number is a valid non-taken VLAN ID! Register %s ==> "
           "%s..." % (tag_id, trailer_num))
@@ -304,16 +317,74 @@ class TNOVAConverter(object):
           "Detected trailing number: %s is not a valid VLAN or already "
           "taken!" % trailer_num)
     # No valid VLAN number has found from tag_id, try to find a free VLAN
-    for vlan in xrange(1, 4094):
-      if vlan not in self.vlan_register.itervalues():
-        self.vlan_register[tag_id] = vlan
-        self.log.debug(
-          "Generated and registered VLAN id %s ==> %s" % (tag_id, vlan))
-        return vlan
-    # For loop is exhausted
-    else:
+    vlan = self.__vlans.allocate(owner=ns_id)
+    if vlan is None:
       self.log.error("No available VLAN id found!")
       return None
+    self.__register_tag(tag_id=tag_id, vlan_id=vlan)
+    self.log.debug(
+      "Generated and registered VLAN id %s ==> %s" % (tag_id, vlan))
+    return vlan
+
+  def __register_tag (self, tag_id, vlan_id):
+    """
+    Bind the reserved VLAN id to the given tag.
+
+    :param tag_id: tag id
+    :type tag_id: str
+    :param vlan_id: reserved VLAN id
+    :type vlan_id: int
+    :return: None
+    """
+    self.vlan_register[tag_id] = vlan_id
+    self.__vlan_tags[vlan_id] = tag_id
+
+  def release_tags (self, ns_id):
+    """
+    Release the VLAN ids allocated for the SG hops of the given NS.
+
+    :param ns_id: NS id
+    :type ns_id: str
+    :return: released VLAN ids
+    :rtype: set
+    """
+    released = self.__vlans.release_owner(owner=ns_id)
+    for vlan_id in released:
+      self.vlan_register.pop(self.__vlan_tags.pop(vlan_id, None), None)
+    if released:
+      self.log.debug("Released VLAN ids of NS: %s ==> %s"
+                     % (ns_id, sorted(released)))
+    return released
+
+  def get_tags (self, ns_id):
+    """
+    Return the VLAN ids allocated for the SG hops of the given NS.
+
+    :param ns_id: NS id
+    :type ns_id: str
+    :return: tag id --> VLAN id
+    :rtype: dict
+    """
+    return {self.__vlan_tags[vlan_id]: vlan_id
+            for vlan_id in self.__vlans.ids_of(owner=ns_id)
+            if vlan_id in self.__vlan_tags}
+
+  def restore_tags (self, ns_id, tags):
+    """
+    Reserve the VLAN ids of the given NS persisted before a restart.
+
+    :param ns_id: NS id
+    :type ns_id: str
+    :param tags: tag id --> VLAN id
+    :type tags: dict
+    :return: None
+    """
+    for tag_id, vlan_id in tags.iteritems():
+      if self.__vlans.reserve(id=vlan_id, owner=ns_id):
+        self.__register_tag(tag_id=tag_id, vlan_id=vlan_id)
+      else:
+        self.log.warning("VLAN id: %s of NS: %s is already reserved!"
+                         % (vlan_id, ns_id))
 
   def __convert_sg_hops (self, nffg, ns, vnfs):
     """
@@ -363,8 +434,8 @@ class TNOVAConverter(object):
                                 delay=vlink['delay'],
                                 bandwidth=vlink['bandwidth'])
       self.log.info("Added SG hop: %s" % link_sg)
-    self.log.debug("Managed Service hop IDs:\n%s"
-                   % pprint.pformat(self.vlan_register))
+    self.log.debug("Managed Service hop IDs:\n%s",
+                   lazy(pprint.pformat, self.vlan_register))
 
   def __convert_e2e_reqs (self, nffg, ns, vnfs):
     """
@@ -462,7 +533,7 @@ class TNOVAConverter(object):
     # Parse required descriptors
     self.log.info("Parsing Network Service (NS) from NSD file: %s" % nsd_file)
     ns = self.parse_nsd_from_file(nsd_file)
-    if not self.__catalogue.VNF_STORE_ENABLED:
+    if not (self.__catalogue.VNF_STORE_ENABLED or self.__catalogue.watching):
       self.log.info("Parsing new VNFs from VNFD files under: %s" %
                     self.__catalogue.VNF_CATALOGUE_DIR)
       vnfs = self.__catalogue.parse_vnf_catalogue_from_folder()
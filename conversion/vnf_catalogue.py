@@ -17,11 +17,12 @@ import json
 import logging
 import os
 import pprint
+import threading
 
 import requests
 from requests.exceptions import Timeout, RequestException
 
-from util.colored_logger import VERBOSE
+from util.colored_logger import VERBOSE, lazy
 
 
 class MissingVNFDException(Exception):
@@ -99,6 +100,7 @@ class VNFWrapper(AbstractDescriptorWrapper):
     self.created_at = self.data['created_at']
     self.modified_at = self.data['modified_at']
     self.vnfd_file = None
+    self.indexed_type = None
 
   def get_resources (self):
     """
@@ -284,11 +286,13 @@ class VNFCatalogue(object):
   REQUEST_TIMEOUT = 5
 
   def __init__ (self, use_remote=False, vnf_store_url=None, cache_dir=None,
-                logger=None):
+                logger=None, session=None):
     """
     Constructor.
 
     :param logger: optional logger
+    :param session: optional HTTP session used for the VNF Store
+    :type session: :class:`requests.Session`
     """
     if logger is not None:
       self.log = logger.getChild(self.LOGGER_NAME)
@@ -296,10 +300,21 @@ class VNFCatalogue(object):
     else:
       logging.getLogger(self.__class__.__name__)
     self.__catalogue = {}
+    # Secondary indexes: VNFD id / VNF type --> tuple of catalogue keys
+    self.__id_index = {}
+    self.__type_index = {}
+    # Parsed VNFD files: path --> ((mtime, size), VNFD id)
+    self.__file_stats = {}
+    # Serialize the reloads and the changes of the catalogue and its indexes
+    self.__reload_lock = threading.RLock()
+    self.__watcher = None
+    self.__stop_watcher = threading.Event()
     if cache_dir:
       self.VNF_CATALOGUE_DIR = cache_dir
     self.log.debug("Use directory for VNF cache: %s" % self.VNF_CATALOGUE_DIR)
     self.vnf_store_url = vnf_store_url
+    # Fall back to the module-level functions of requests
+    self.__http = session if session is not None else requests
     if use_remote:
       self.VNF_STORE_ENABLED = True
       self.log.debug("Set VNF Store with URL: %s" % self.vnf_store_url)
@@ -314,8 +329,8 @@ class VNFCatalogue(object):
     """
     self.log.info("Initialize %s..." % self.__class__.__name__)
     self.parse_vnf_catalogue_from_folder()
-    self.log.log(VERBOSE, "VNFCatalogue:\n%s"
-                 % pprint.pformat(self.__catalogue))
+    self.log.log(VERBOSE, "VNFCatalogue:\n%s",
+                 lazy(pprint.pformat, self.__catalogue))
 
   def __str__ (self):
     """
@@ -340,16 +355,18 @@ class VNFCatalogue(object):
     :return: result of registering
     :rtype: bool
     """
-    if isinstance(vnfd, VNFWrapper):
+    if not isinstance(vnfd, VNFWrapper):
+      return False
+    with self.__reload_lock:
       if id not in self.__catalogue:
         self.log.debug("Register VNFD with id: %s, name: %s" % (vnfd.id,
                                                                 vnfd.name))
       else:
         self.log.warning("Override already registered VNFS: %s!" % id)
+        self.__remove_from_indexes(id=id, vnfd=self.__catalogue[id])
       self.__catalogue[id] = vnfd
-      return True
-    else:
-      return False
+      self.__add_to_indexes(id=id, vnfd=vnfd)
+    return True
 
   def unregister (self, id):
     """
@@ -359,10 +376,50 @@ class VNFCatalogue(object):
     :type id: str
     :return: None
     """
-    del self.__catalogue[id]
+    with self.__reload_lock:
+      vnfd = self.__catalogue.pop(id)
+      self.__remove_from_indexes(id=id, vnfd=vnfd)
     self.log.debug(
       "VNFD with id: %s is removed from %s" % (id, self.__class__.__name__))
 
+  def __add_to_indexes (self, id, vnfd):
+    """
+    Add the catalogue key of the VNFD to the secondary indexes.
+
+    Index values are immutable tuples which are replaced as a whole, so the
+    lookups do not need locking. The caller must hold the reload lock.
+
+    :param id: catalogue key
+    :type id: str
+    :param vnfd: registered VNFD
+    :type vnfd: VNFWrapper
+    :return: None
+    """
+    vnf_type = vnfd.get_vnf_type()
+    # Cache the validated type to avoid recalculation during removal
+    vnfd.indexed_type = vnf_type
+    self.__id_index[vnfd.id] = self.__id_index.get(vnfd.id, ()) + (id,)
+    self.__type_index[vnf_type] = self.__type_index.get(vnf_type, ()) + (id,)
+
+  def __remove_from_indexes (self, id, vnfd):
+    """
+    Remove the catalogue key of the VNFD from the secondary indexes.
+    The caller must hold the reload lock.
+
+    :param id: catalogue key
+    :type id: str
+    :param vnfd: registered VNFD
+    :type vnfd: VNFWrapper
+    :return: None
+    """
+    for index, value in ((self.__id_index, vnfd.id),
+                         (self.__type_index, vnfd.indexed_type)):
+      keys = tuple(k for k in index.get(value, ()) if k != id)
+      if keys:
+        index[value] = keys
+      else:
+        index.pop(value, None)
+
   def registered (self, id):
     return id in self.__catalogue
 
@@ -386,9 +443,8 @@ class VNFCatalogue(object):
     """
     if self.VNF_STORE_ENABLED:
       return self.request_vnf_from_remote_store(id)
-    for vnf in self.__catalogue.itervalues():
-      if vnf.id == id:
-        return vnf
+    for key in self.__id_index.get(id, ()):
+      return self.__catalogue.get(key)
 
   def get_by_type (self, type):
     """
@@ -399,10 +455,9 @@ class VNFCatalogue(object):
     :return: registered VNF or None
     :rtype: VNFWrapper
     """
-    for vnf in self.__catalogue.itervalues():
-      if vnf.get_vnf_type() == type:
-        self.log.debug("Found VNFD with type: %s in local catalogue" % type)
-        return vnf
+    for key in self.__type_index.get(type, ()):
+      self.log.debug("Found VNFD with type: %s in local catalogue" % type)
+      return self.__catalogue.get(key)
 
   def get_by_name (self, name):
     """
@@ -421,6 +476,10 @@ class VNFCatalogue(object):
     directory given by 'catalogue_dir' into a :any:`VNFCatalogue` instance.
     catalogue_dir can be relative to $PWD.
 
+    The reload is incremental: only the files which are new or have changed
+    since the last parsing (based on mtime and size) are parsed and the VNFDs
+    of the deleted files are removed.
+
     :param catalogue_dir: VNF folder
     :type catalogue_dir: str
     :return: created VNFCatalogue instance
@@ -428,20 +487,83 @@ class VNFCatalogue(object):
     """
     self.log.debug(
       "Parse VNFDs from local folder: %s ..." % self.VNF_CATALOGUE_DIR)
-    # Iterate over catalogue dir
-    for vnf in os.listdir(self.VNF_CATALOGUE_DIR):
-      if vnf.startswith('.'):
-        continue
-      vnfd_file = os.path.join(self.VNF_CATALOGUE_DIR, vnf)
-      with open(vnfd_file) as f:
-        # Parse VNFD from JSOn files as VNFWrapper class
-        vnfd = json.load(f, object_hook=self.__vnfd_object_hook)
-      vnfd.vnfd_file = vnfd_file
-      vnfd_id = os.path.splitext(vnf)[0]
-      # Register VNF into catalogue
-      self.register(id=vnfd_id, vnfd=vnfd)
+    with self.__reload_lock:
+      detected = set()
+      # Iterate over catalogue dir
+      for vnf in os.listdir(self.VNF_CATALOGUE_DIR):
+        if vnf.startswith('.'):
+          continue
+        vnfd_file = os.path.join(self.VNF_CATALOGUE_DIR, vnf)
+        try:
+          stat = os.stat(vnfd_file)
+        except OSError:
+          # File has been removed meanwhile
+          continue
+        detected.add(vnfd_file)
+        fingerprint = (stat.st_mtime, stat.st_size)
+        if vnfd_file in self.__file_stats and \
+           self.__file_stats[vnfd_file][0] == fingerprint:
+          continue
+        with open(vnfd_file) as f:
+          # Parse VNFD from JSOn files as VNFWrapper class
+          vnfd = json.load(f, object_hook=self.__vnfd_object_hook)
+        vnfd.vnfd_file = vnfd_file
+        vnfd_id = os.path.splitext(vnf)[0]
+        # Register VNF into catalogue
+        self.register(id=vnfd_id, vnfd=vnfd)
+        self.__file_stats[vnfd_file] = (fingerprint, vnfd_id)
+      # Remove VNFDs of deleted files
+      for vnfd_file in set(self.__file_stats) - detected:
+        fingerprint, vnfd_id = self.__file_stats.pop(vnfd_file)
+        vnfd = self.get(id=vnfd_id)
+        if vnfd is not None and vnfd.vnfd_file == vnfd_file:
+          self.log.debug("VNFD file: %s has been deleted" % vnfd_file)
+          self.unregister(id=vnfd_id)
     return self
 
+  @property
+  def watching (self):
+    """
+    :return: the catalogue folder is watched in the background
+    :rtype: bool
+    """
+    return self.__watcher is not None and self.__watcher.is_alive()
+
+  def start_watcher (self, interval):
+    """
+    Reload the catalogue folder periodically in a background thread, so the
+    folder does not need to be rescanned on the request path.
+
+    :param interval: reload period in sec
+    :type interval: float
+    :return: None
+    """
+    if self.watching:
+      return
+    self.log.debug("Start watching catalogue folder: %s with interval: %ss"
+                   % (self.VNF_CATALOGUE_DIR, interval))
+    self.__stop_watcher.clear()
+    self.__watcher = threading.Thread(target=self.__watch,
+                                      args=(interval,),
+                                      name="%s-watcher" % self.LOGGER_NAME)
+    self.__watcher.daemon = True
+    self.__watcher.start()
+
+  def stop_watcher (self):
+    """
+    Stop the background reload of the catalogue folder.
+
+    :return: None
+    """
+    self.__stop_watcher.set()
+
+  def __watch (self, interval):
+    while not self.__stop_watcher.wait(interval):
+      try:
+        self.parse_vnf_catalogue_from_folder()
+      except Exception:
+        self.log.exception("Got unexpected exception during catalogue reload!")
+
   def request_vnf_from_remote_store (self, vnf_id):
     """
     Request a VNFD given by vnf_id from remote VNFStore.
@@ -462,8 +584,8 @@ class VNFCatalogue(object):
     url = os.path.join(self.vnf_store_url, str(vnf_id))
     self.log.debug("Used URL for VNFD request: %s" % url)
     try:
-      response = requests.get(url=url,
-                              timeout=self.REQUEST_TIMEOUT)
+      response = self.__http.get(url=url,
+                                 timeout=self.REQUEST_TIMEOUT)
     except Timeout:
       self.log.error(
         "Request timeout: %ss exceeded! VNF Store: %s is unreachable!" % (
@@ -479,13 +601,13 @@ class VNFCatalogue(object):
       else:
         self.log.error("Got error during requesting VNFD with id: %s!" % vnf_id)
       return
-    self.log.log(VERBOSE,
-                 "Received body:\n%s" % pprint.pformat(response.json()))
+    self.log.log(VERBOSE, "Received body:\n%s",
+                 lazy(lambda: pprint.pformat(response.json())))
     vnfd = json.loads(response.text, object_hook=self.__vnfd_object_hook)
     if self.STORE_VNFD_LOCALLY:
       self.register(id=vnfd.get_vnf_name(), vnfd=vnfd)
-    self.log.log(VERBOSE,
-                 "VNFCatalogue:\n%s" % pprint.pformat(self.__catalogue))
+    self.log.log(VERBOSE, "VNFCatalogue:\n%s",
+                 lazy(pprint.pformat, self.__catalogue))
     return vnfd
 
   @staticmethod
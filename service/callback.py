@@ -15,7 +15,10 @@ import logging
 import threading
 import urlparse
 from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
-from threading import Thread, Timer
+from SocketServer import ThreadingMixIn
+from threading import Thread
+
+from util.scheduler import Scheduler
 
 
 class CallbackHandler(BaseHTTPRequestHandler):
@@ -118,21 +121,60 @@ class Callback(object):
     self.callback_id = callback_id
     self.type = type
     self.request_id = request_id
+    self.__scheduler = None
     self.__timer = None
     self.data = data
     self.result_code = None
     self.body = None
+    # Set when the callback is received or exceeded its timeout
+    self.__completed = threading.Event()
+    # Make the check and the storing of the result atomic
+    self.__lock = threading.Lock()
+
+  @property
+  def completed (self):
+    return self.__completed.is_set()
+
+  def complete (self, result, body=None):
+    """
+    Store the result of the callback and wake up the waiting thread.
+
+    :param result: received response code or 0 in case of timeout
+    :type result: int
+    :param body: received callback body
+    :type body: str
+    :return: the callback has not been completed before
+    :rtype: bool
+    """
+    with self.__lock:
+      if self.__completed.is_set():
+        return False
+      self.result_code = result
+      self.body = body
+      self.__completed.set()
+      return True
+
+  def wait (self, timeout=None):
+    """
+    Block until the callback is completed or the timeout is exceeded.
 
-  def setup_timer (self, timeout, hook, **kwargs):
+    :param timeout: timeout in sec
+    :type timeout: float
+    :return: the callback has been completed
+    :rtype: bool
+    """
+    return self.__completed.wait(timeout=timeout)
+
+  def setup_timer (self, scheduler, timeout, hook, **kwargs):
     if not timeout:
       return
     if not self.__timer:
-      self.__timer = Timer(timeout, hook, kwargs=kwargs)
-      self.__timer.start()
+      self.__scheduler = scheduler
+      self.__timer = scheduler.schedule(timeout, hook, **kwargs)
 
   def stop_timer (self):
     if self.__timer:
-      self.__timer.cancel()
+      self.__scheduler.cancel(self.__timer)
       self.__timer = None
 
   def get_timer_timeout (self):
@@ -143,11 +185,13 @@ class Callback(object):
            % (self.callback_id, self.request_id, self.result_code)
 
 
-class CallbackManager(HTTPServer, Thread):
+class CallbackManager(ThreadingMixIn, HTTPServer, Thread):
   DEFAULT_SERVER_ADDRESS = "0.0.0.0"
   DEFAULT_PREFIX = "callbacks"
   DEFAULT_PORT = 9000
   DEFAULT_WAIT_TIMEOUT = 30.0
+  # Listen backlog for bursts of concurrently received callbacks
+  request_queue_size = 128
 
   def __init__ (self, domain_name, address=DEFAULT_SERVER_ADDRESS,
                 port=DEFAULT_PORT, timeout=DEFAULT_WAIT_TIMEOUT,
@@ -158,9 +202,14 @@ class CallbackManager(HTTPServer, Thread):
     self.domain_name = domain_name
     self.wait_timeout = float(timeout)
     self.__register = {}
+    self.__register_lock = threading.RLock()
     self.daemon = True
+    # Do not wait for the callback request handler threads at shutdown
+    self.daemon_threads = True
     self.__callback = callback_url
-    self.__blocking_mutex = threading.Event()
+    # Common thread for the timeouts of the subscribed callbacks
+    self.__scheduler = Scheduler(name="%sTimer" % self.__class__.__name__)
+    self.__listeners = []
     self.log = logger if logger is not None else logging.getLogger('callback')
 
   @property
@@ -190,17 +239,50 @@ class CallbackManager(HTTPServer, Thread):
     finally:
       self.server_close()
 
+  def server_close (self):
+    """
+    Stop the timeout scheduler beside closing the listening socket.
+
+    :return: None
+    """
+    HTTPServer.server_close(self)
+    self.__scheduler.stop()
+
+  @property
+  def pending (self):
+    """
+    :return: number of the subscribed callbacks waiting for result
+    :rtype: int
+    """
+    return len(self.__register)
+
+  def register_listener (self, listener):
+    """
+    Register a function which is called with every received callback
+    regardless of the subscribed hooks, e.g. for invalidating cached data.
+
+    :param listener: callable with the signature: listener(callback)
+    :type listener: callable
+    :return: None
+    """
+    self.__listeners.append(listener)
+
   def subscribe_callback (self, hook, cb_id, type, req_id=None, data=None,
                           timeout=None):
     self.log.debug("Register callback for response: %s on domain: %s" %
                    (cb_id, self.domain_name))
-    if cb_id not in self.__register:
-      cb = Callback(hook=hook, callback_id=cb_id, type=type,
-                    request_id=req_id, data=data)
+    with self.__register_lock:
+      if cb_id not in self.__register:
+        cb = Callback(hook=hook, callback_id=cb_id, type=type,
+                      request_id=req_id, data=data)
+        self.__register[cb_id] = cb
+      else:
+        cb = None
+    if cb is not None:
       _timeout = timeout if timeout is not None else self.wait_timeout
       # result=0 means the callback has exceeded timeout
-      cb.setup_timer(_timeout, self.invoke_hook, msg_id=cb_id, result=0)
-      self.__register[cb_id] = cb
+      cb.setup_timer(self.__scheduler, _timeout, self.invoke_hook,
+                     msg_id=cb_id, result=0)
       return cb
     else:
       self.log.warning("Hook is already registered for id: %s on domain: %s"
@@ -215,7 +297,8 @@ class CallbackManager(HTTPServer, Thread):
     """
     self.log.debug("Unregister callback for response: %s from domain: %s"
                    % (cb_id, self.domain_name))
-    cb = self.__register.pop(cb_id, None)
+    with self.__register_lock:
+      cb = self.__register.pop(cb_id, None)
     if cb:
       cb.stop_timer()
     return cb
@@ -227,7 +310,9 @@ class CallbackManager(HTTPServer, Thread):
       self.log.error("Received response code is not valid: %s! "
                      "Abort callback..." % result)
       return
-    if msg_id not in self.__register:
+    with self.__register_lock:
+      cb = self.__register.get(msg_id)
+    if cb is None:
       self.log.warning("Received unregistered callback with id: %s from domain:"
                        " %s" % (msg_id, self.domain_name))
       return
@@ -235,19 +320,29 @@ class CallbackManager(HTTPServer, Thread):
                    "from domain: %s" % (msg_id,
                                         "TIMEOUT" if not result else result,
                                         self.domain_name))
-    cb = self.__register.get(msg_id)
-    if cb is None:
-      self.log.error("Missing callback: %s from register!" % msg_id)
+    # The first outcome wins, e.g. a timeout does not overwrite a received
+    # result which has not been processed yet
+    if not cb.complete(result=result, body=body):
+      self.log.debug("Callback: %s has already been completed!" % msg_id)
       return
-    cb.result_code = result
-    cb.body = body
+    if result:
+      for listener in self.__listeners:
+        try:
+          listener(callback=cb)
+        except Exception:
+          self.log.exception("Got exception in callback listener: %s"
+                             % listener)
     if cb.hook is None:
       self.log.debug("No hook was defined!")
-      self.__blocking_mutex.set()
       return
     elif callable(cb.hook):
+      # Nobody waits for the callback, the hook finishes the processing
+      self.unsubscribe_callback(cb_id=msg_id)
       self.log.debug("Schedule callback hook: %s" % cb.short())
-      cb.hook(callback=cb)
+      try:
+        cb.hook(callback=cb)
+      except Exception:
+        self.log.exception("Got exception in callback hook: %s" % cb.short())
     else:
       self.log.warning("No callable hook was defined for the received callback:"
                        " %s!" % msg_id)
@@ -259,13 +354,11 @@ class CallbackManager(HTTPServer, Thread):
                                  data=data, timeout=timeout)
     _timeout = timeout if timeout is not None else self.wait_timeout + 1
     self.log.debug("Waiting for callback result...")
-    self.__blocking_mutex.wait(timeout=_timeout)
-    self.__blocking_mutex.clear()
+    cb.wait(timeout=_timeout)
     return self.unsubscribe_callback(cb_id=cb.callback_id)
 
   def wait_for_callback (self, callback):
     _timeout = callback.get_timer_timeout() + 1.0
     self.log.debug("Waiting for callback result...")
-    self.__blocking_mutex.wait(timeout=_timeout)
-    self.__blocking_mutex.clear()
+    callback.wait(timeout=_timeout)
     return self.unsubscribe_callback(cb_id=callback.callback_id)
@@ -0,0 +1,337 @@
+# Copyright 2017 Janos Czentye
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Contains the durable registry of the managed service instances.
+"""
+import Queue
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS instances (
+  id TEXT PRIMARY KEY,
+  service_id TEXT,
+  name TEXT,
+  path TEXT,
+  status TEXT,
+  created_at TEXT,
+  updated_at TEXT,
+  vnf_addresses TEXT,
+  binding TEXT,
+  sg TEXT
+);
+CREATE TABLE IF NOT EXISTS sg_hops (
+  id TEXT PRIMARY KEY,
+  owner TEXT
+);
+CREATE INDEX IF NOT EXISTS sg_hops_owner ON sg_hops (owner);
+CREATE TABLE IF NOT EXISTS vlans (
+  vlan_id INTEGER PRIMARY KEY,
+  tag_id TEXT,
+  ns_id TEXT
+);
+CREATE INDEX IF NOT EXISTS vlans_ns_id ON vlans (ns_id);
+"""
+
+
+class ServiceRegistry(object):
+  """
+  Persist the managed service instances with their allocated SG hop and VLAN
+  ids into an SQLite database, so the connector can recover its state after a
+  restart.
+
+  The changes are only enqueued by the caller. A background thread writes
+  them in batches and commits every batch in one transaction (group commit),
+  so the request path never waits for the disk. Every enqueued change is a
+  list of statements which are always committed together.
+  """
+  LOGGER_NAME = "ServiceRegistry"
+  BATCH_SIZE = 500  # max number of changes committed in one transaction
+  COMMIT_DELAY = 0.01  # sec, wait for more changes before committing
+
+  def __init__ (self, path, logger=None):
+    """
+    Init.
+
+    :param path: path of the database file
+    :type path: str
+    :param logger: optional logger object
+    :type logger: :class:`logging.Logger`
+    """
+    if logger is not None:
+      self.log = logger.getChild(self.LOGGER_NAME)
+    else:
+      self.log = logging.getLogger(self.__class__.__name__)
+    self.path = path
+    self.written = 0
+    self.commits = 0
+    self.failed = 0
+    self.dropped = 0
+    self.__queue = Queue.Queue()
+    self.__writer = None
+    # Guard the enqueued changes against the stop of the writer
+    self.__lock = threading.Lock()
+    self.__closed = False
+
+  def __connect (self):
+    """
+    :return: new connection to the database
+    :rtype: :class:`sqlite3.Connection`
+    """
+    conn = sqlite3.connect(self.path)
+    # Readers and the writer do not block each other in WAL mode and a commit
+    # does not wait for the fsync of the database file
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+  def open (self):
+    """
+    Create the missing tables and start the writer thread.
+
+    :return: None
+    """
+    self.log.debug("Open service registry: %s" % self.path)
+    conn = self.__connect()
+    try:
+      conn.executescript(SCHEMA)
+    finally:
+      conn.close()
+    self.__writer = threading.Thread(target=self.__write_changes,
+                                     name=self.LOGGER_NAME)
+    self.__writer.daemon = True
+    self.__writer.start()
+
+  def load (self):
+    """
+    Read the persisted state.
+
+    The instances are returned as dicts with the parsed JSON fields, the
+    service graphs are kept as raw text.
+
+    :return: instances, SG hop id --> owner, NS id --> {tag id: VLAN id}
+    :rtype: tuple
+    """
+    start = time.time()
+    conn = self.__connect()
+    try:
+      instances = []
+      for row in conn.execute("SELECT id, service_id, name, path, status, "
+                              "created_at, updated_at, vnf_addresses, "
+                              "binding, sg FROM instances"):
+        instances.append({"id": row[0],
+                          "service_id": row[1],
+                          "name": row[2],
+                          "path": row[3],
+                          "status": row[4],
+                          "created_at": row[5],
+                          "updated_at": row[6],
+                          "vnf_addresses": json.loads(row[7] or "{}"),
+                          "binding": json.loads(row[8] or "{}"),
+                          "sg": row[9]})
+      hops = {json.loads(id): owner for id, owner in
+              conn.execute("SELECT id, owner FROM sg_hops")}
+      vlans = {}
+      for vlan_id, tag_id, ns_id in conn.execute(
+         "SELECT vlan_id, tag_id, ns_id FROM vlans"):
+        vlans.setdefault(ns_id, {})[tag_id] = vlan_id
+    finally:
+      conn.close()
+    self.log.debug("Service registry has been loaded in %.3f ms! Instances: "
+                   "%s, SG hops: %s" % ((time.time() - start) * 1000,
+                                        len(instances), len(hops)))
+    return instances, hops, vlans
+
+  def __enqueue (self, *statements):
+    """
+    Enqueue the given (sql, params) statements as one change. The changes
+    enqueued after :meth:`close` are dropped with a warning.
+
+    :return: None
+    """
+    with self.__lock:
+      if not self.__closed:
+        self.__queue.put(statements)
+        return
+      self.dropped += 1
+    self.log.warning("Service registry is closed! Drop change: %s"
+                     % statements[0][0])
+
+  def save_instance (self, si):
+    """
+    Persist the attributes of the given new service instance.
+
+    The service graph is not saved here as it is modified until the
+    orchestration, see :meth:`save_sg`.
+
+    :param si: service instance
+    :type si: :class:`ServiceInstance`
+    :return: None
+    """
+    self.__enqueue(("INSERT OR REPLACE INTO instances VALUES "
+                    "(?, ?, ?, ?, ?, ?, ?, ?, ?, NULL)",
+                    (si.id, si.service_id, si.name, si.path, si.status,
+                     si.created_at, si.updated_at,
+                     json.dumps(si.vnf_addresses), json.dumps(si.binding))))
+
+  def save_sg (self, si):
+    """
+    Persist the finalized service graph of the given service instance.
+
+    The service graph is serialized in the caller's thread.
+
+    :param si: service instance
+    :type si: :class:`ServiceInstance`
+    :return: None
+    """
+    self.__enqueue(("UPDATE instances SET sg = ? WHERE id = ?",
+                    (si.get_sg_text(), si.id)))
+
+  def save_hops (self, si_id, hops):
+    """
+    Replace the SG hop ids reserved by the given service instance.
+
+    :param si_id: service instance id
+    :type si_id: str
+    :param hops: SG hop ids reserved by the service instance
+    :type hops: collections.Iterable
+    :return: None
+    """
+    statements = [("DELETE FROM sg_hops WHERE owner = ?", (si_id,))]
+    # Keep the type of the hop ids, e.g. int ids allocated by the connector
+    statements.extend(("INSERT OR REPLACE INTO sg_hops VALUES (?, ?)",
+                       (json.dumps(id), si_id)) for id in hops)
+    self.__enqueue(*statements)
+
+  def save_status (self, si):
+    """
+    Persist the status of the given service instance.
+
+    :param si: service instance
+    :type si: :class:`ServiceInstance`
+    :return: None
+    """
+    self.__enqueue(("UPDATE instances SET status = ?, updated_at = ? "
+                    "WHERE id = ?", (si.status, si.updated_at, si.id)))
+
+  def save_addresses (self, si):
+    """
+    Persist the collected VNF addresses of the given service instance.
+
+    :param si: service instance
+    :type si: :class:`ServiceInstance`
+    :return: None
+    """
+    self.__enqueue(("UPDATE instances SET vnf_addresses = ? WHERE id = ?",
+                    (json.dumps(si.vnf_addresses), si.id)))
+
+  def remove_instance (self, id):
+    """
+    Remove the given service instance with its SG hop ids.
+
+    :param id: service instance id
+    :type id: str
+    :return: None
+    """
+    self.__enqueue(("DELETE FROM instances WHERE id = ?", (id,)),
+                   ("DELETE FROM sg_hops WHERE owner = ?", (id,)))
+
+  def save_vlans (self, ns_id, tags):
+    """
+    Replace the VLAN ids allocated for the given NS.
+
+    :param ns_id: NS id
+    :type ns_id: str
+    :param tags: tag id --> VLAN id
+    :type tags: dict
+    :return: None
+    """
+    statements = [("DELETE FROM vlans WHERE ns_id = ?", (ns_id,))]
+    statements.extend(("INSERT OR REPLACE INTO vlans VALUES (?, ?, ?)",
+                       (vlan_id, tag_id, ns_id))
+                      for tag_id, vlan_id in tags.iteritems())
+    self.__enqueue(*statements)
+
+  def __write_changes (self):
+    """
+    Commit the enqueued changes in batches. A None item stops the writer.
+
+    :return: None
+    """
+    conn = self.__connect()
+    try:
+      while True:
+        batch = [self.__queue.get()]
+        # Let the concurrent requests join the transaction
+        time.sleep(self.COMMIT_DELAY)
+        try:
+          while len(batch) < self.BATCH_SIZE:
+            batch.append(self.__queue.get_nowait())
+        except Queue.Empty:
+          pass
+        stop = None in batch
+        changes = [c for c in batch if c is not None]
+        try:
+          with conn:
+            for change in changes:
+              for sql, params in change:
+                conn.execute(sql, params)
+          self.written += len(changes)
+          self.commits += 1
+        except sqlite3.Error:
+          self.failed += len(changes)
+          self.log.exception("Failed to write %s changes into the service "
+                             "registry!" % len(changes))
+        finally:
+          for _ in batch:
+            self.__queue.task_done()
+        if stop:
+          return
+    finally:
+      conn.close()
+
+  def stats (self):
+    """
+    :return: counters of the registry writer
+    :rtype: dict
+    """
+    return {"pending": self.__queue.qsize(),
+            "written": self.written,
+            "commits": self.commits,
+            "failed": self.failed,
+            "dropped": self.dropped}
+
+  def flush (self):
+    """
+    Block until every enqueued change is committed.
+
+    :return: None
+    """
+    self.__queue.join()
+
+  def close (self):
+    """
+    Commit the remaining changes and stop the writer thread.
+
+    :return: None
+    """
+    with self.__lock:
+      self.__closed = True
+    if self.__writer is not None and self.__writer.is_alive():
+      self.__queue.put(None)
+      self.__writer.join()
+    self.log.debug("Service registry has been closed: %s" % self.stats())
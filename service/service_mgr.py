@@ -13,12 +13,19 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 import ast
+import bisect
+import calendar
+import copy
 import datetime
 import httplib
+import itertools
 import json
 import logging
 import os
 import pprint
+import re
+import threading
+import time
 import uuid
 
 import requests
@@ -26,9 +33,95 @@ from requests import Timeout, RequestException
 
 from conversion.vnf_catalogue import MissingVNFDException
 from nffg_lib.nffg import NFFG
-from util.colored_logger import VERBOSE
+from util.allocator import IdAllocator
+from util.cache import TemplateCache
+from util.colored_logger import VERBOSE, lazy
+from util.metrics import PhaseTimer
 from virtualizer.virtualizer import Virtualizer
 
+# Unique versions of the service instance descriptions
+_versions = itertools.count()
+
+# Date with optional time of day and UTC offset, e.g. 2017-05-04T12:00:00Z
+ISO_8601 = re.compile(r"^(\d{4})-(\d{2})-(\d{2})"
+                      r"(?:T(\d{2}):(\d{2})(?::(\d{2})(?:[.,](\d+))?)?"
+                      r"(Z|[+-]\d{2}(?::?\d{2})?)?)?$")
+
+
+def _local_timestamp (dt):
+  """
+  :param dt: naive local time
+  :type dt: :class:`datetime.datetime`
+  :return: seconds since the epoch
+  :rtype: float
+  """
+  return time.mktime(dt.timetuple()) + dt.microsecond / 1e6
+
+
+def parse_timestamp (value):
+  """
+  Parse an ISO 8601 timestamp. A timestamp without UTC offset is in local
+  time like the timestamps of the service instances.
+
+  :param value: timestamp, e.g. 2017-05-04T12:00:00.5+02:00
+  :type value: str
+  :return: seconds since the epoch
+  :rtype: float
+  :raise ValueError: the timestamp is malformed
+  """
+  match = ISO_8601.match(value)
+  if match is None:
+    raise ValueError("Malformed ISO 8601 timestamp: %s" % value)
+  year, month, day, hour, minute, second, fraction, offset = match.groups()
+  dt = datetime.datetime(int(year), int(month), int(day), int(hour or 0),
+                         int(minute or 0), int(second or 0),
+                         int((fraction or "").ljust(6, "0")[:6]))
+  if offset is None:
+    return _local_timestamp(dt)
+  ts = calendar.timegm(dt.timetuple()) + dt.microsecond / 1e6
+  if offset != "Z":
+    offset = offset.replace(":", "")
+    shift = int(offset[1:3]) * 3600 + int(offset[3:] or 0) * 60
+    ts -= shift if offset[0] == "+" else -shift
+  return ts
+
+
+def clone_service_template (template):
+  """
+  Clone the given service NFFG for a new service instance.
+
+  Only the parts which are modified by the binding, the placement and the SG
+  hop id allocation of a service instance are copied: the NFFG object, the
+  NF nodes with their ports and the edges connected to these ports. The SAPs
+  and the other nodes are shared with the template, so the clone is cheaper
+  than the deep copy of the whole NFFG.
+
+  :param template: parsed service NFFG, it is not modified
+  :type template: :class:`NFFG`
+  :return: clone of the service NFFG
+  :rtype: :class:`NFFG`
+  """
+  clone = copy.copy(template)
+  clone.network = template.network.__class__()
+  nf_ids = {nf.id for nf in template.nfs}
+  # Template port --> cloned port, keyed by the object id of the template port
+  ports = {}
+  for node_id, node in template.network.nodes_iter(data=True):
+    if node_id in nf_ids:
+      nf = copy.deepcopy(node)
+      cloned = {port.id: port for port in nf.ports}
+      ports.update((id(port), cloned[port.id]) for port in node.ports)
+      node = nf
+    clone.add_node(node)
+  for src, dst, link in template.network.edges_iter(data=True):
+    if id(link.src) in ports or id(link.dst) in ports:
+      link = copy.copy(link)
+      link.src = ports.get(id(link.src), link.src)
+      link.dst = ports.get(id(link.dst), link.dst)
+    # Node ids are resolved from the back-references of the ports
+    clone.add_edge(src=link.src, dst=link.dst, link=link)
+  return clone
+
 
 class ServiceInstance(object):
   """
@@ -61,24 +154,76 @@ class ServiceInstance(object):
     self.id = instance_id if instance_id else str(uuid.uuid1())
     self.service_id = service_id  # Converted NFFG the service created from
     # The id of the service instance
-    self.sg = None
+    self.__sg = None
+    # Raw service graph restored from the registry, parsed on first access
+    self.__sg_text = None
     self.name = name
     self.path = path
     self.__status = status
     self.vnf_addresses = {}
-    self.created_at = self.__touch()
-    self.updated_at = self.__touch()
+    self.__touch()
+    self.created_at = self.updated_at
     self.__nf_id_binding = {}
+    # Position of the instance in the creation order, set by the manager
+    self.seq = None
+    # Changed when the status or the addresses change
+    self.version = next(_versions)
+    # (version, serialized JSON description)
+    self.__json = (None, None)
+    # Serialize the orchestration and the termination of the instance
+    self.lock = threading.RLock()
 
-  @staticmethod
-  def __touch ():
+  def __touch (self):
+    """
+    Update the updated_at attribute and its value in seconds since the epoch.
+
+    :return: None
+    """
+    now = datetime.datetime.now()
+    self.updated_at = now.isoformat()
+    self.updated_ts = _local_timestamp(now)
+
+  @classmethod
+  def restore (cls, data):
     """
-    Update the updated_at attribute.
+    Recreate a service instance from its persisted attributes. The service
+    graph is parsed only when it is first used.
 
-    :return: new value
+    :param data: persisted attributes
+    :type data: dict
+    :return: restored service instance
+    :rtype: ServiceInstance
+    """
+    si = cls(service_id=data['service_id'], instance_id=data['id'],
+             name=data['name'], path=data['path'], status=data['status'])
+    si.created_at = data['created_at']
+    si.updated_at = data['updated_at']
+    si.updated_ts = parse_timestamp(data['updated_at'])
+    si.vnf_addresses = data['vnf_addresses']
+    si.binding.update(data['binding'])
+    si.__sg_text = data['sg']
+    return si
+
+  @property
+  def sg (self):
+    if self.__sg is None and self.__sg_text is not None:
+      self.__sg = NFFG.parse(raw_data=self.__sg_text)
+      self.__sg_text = None
+    return self.__sg
+
+  @sg.setter
+  def sg (self, value):
+    self.__sg = value
+    self.__sg_text = None
+
+  def get_sg_text (self):
+    """
+    :return: service graph in raw format without parsing a restored one
     :rtype: str
     """
-    return datetime.datetime.now().isoformat()
+    if self.__sg is not None:
+      return self.__sg.dump()
+    return self.__sg_text
 
   @property
   def status (self):
@@ -88,6 +233,28 @@ class ServiceInstance(object):
   def status (self, value):
     self.__status = value
     self.__touch()
+    self.version = next(_versions)
+
+  def update_vnf_addresses (self, addresses):
+    """
+    Update the collected addresses of the VNFs.
+
+    The dict of the addresses is replaced to not disturb the concurrent
+    readers.
+
+    :param addresses: VNF id --> addresses
+    :type addresses: dict
+    :return: the addresses have been changed
+    :rtype: bool
+    """
+    if all(self.vnf_addresses.get(k) == v for k, v in addresses.iteritems()):
+      return False
+    updated = self.vnf_addresses.copy()
+    updated.update(addresses)
+    self.vnf_addresses = updated
+    self.__touch()
+    self.version = next(_versions)
+    return True
 
   def get_sg (self):
     return self.sg
@@ -114,6 +281,22 @@ class ServiceInstance(object):
             "updated_at": self.updated_at,
             "vnf_addresses": self.vnf_addresses}
 
+  def get_json_fragment (self):
+    """
+    Return the service instance as serialized JSON. The result is cached
+    until the status or the addresses of the instance change.
+
+    :return: service instance description in JSON
+    :rtype: str
+    """
+    version, fragment = self.__json
+    if version != self.version:
+      # A concurrent change bumps the version so a stale result is never used
+      version = self.version
+      fragment = json.dumps(self.get_json())
+      self.__json = (version, fragment)
+    return fragment
+
   def load_sg_from_file (self, path=None, mode=None):
     """
     Read and return the service description this service instance originated
@@ -131,36 +314,66 @@ class ServiceInstance(object):
     # Load NFFG from file
     try:
       nffg = NFFG.parse_from_file(path=path)
-      # Rewrite the default SG id to the instance id to be unique for ESCAPE
-      if nffg.service_id is None:
-        nffg.service_id = nffg.id
-      nffg.id = self.id
-      if mode is not None:
-        nffg.mode = mode
-      self.sg = self._tag_NF_ids(nffg=nffg, unique=self.id)
-      # self.sg = self._update_sg_hop_ids(nffg=nffg)
-      return self.sg
+      return self.load_sg(nffg=nffg, mode=mode)
     except IOError:
       # return None
       raise
 
+  def load_sg (self, nffg, mode=None):
+    """
+    Bind the given service description to this service instance. The NFFG is
+    modified in place so it must be a private copy of the service template.
+
+    :param nffg: service description
+    :type nffg: NFFG
+    :param mode: optional mapping mode
+    :type mode: str
+    :return: bound NFFG
+    :rtype: NFFG
+    """
+    # Rewrite the default SG id to the instance id to be unique for ESCAPE
+    if nffg.service_id is None:
+      nffg.service_id = nffg.id
+    nffg.id = self.id
+    if mode is not None:
+      nffg.mode = mode
+    self.sg = self._tag_NF_ids(nffg=nffg, unique=self.id)
+    # self.sg = self._update_sg_hop_ids(nffg=nffg)
+    return self.sg
+
   def _tag_NF_ids (self, nffg, unique):
     """
     Modify NF ids with given `unique` tag and handle SG hops as well.
-     
+
+    The NF nodes are relabelled in place. The edges refer to the ports of the
+    nodes, so the edges connected to the NFs are only re-added under the new
+    node ids. NF names equal to the old id are renamed as well to give the
+    same result as the textual replace of the former implementation.
+
     :param nffg: NFFG object
-    :type nffg: :class:``
-    :param unique: 
-    :return: 
+    :type nffg: :class:`NFFG`
+    :param unique: unique tag, e.g. the service instance id
+    :type unique: str
+    :return: the modified NFFG
+    :rtype: :class:`NFFG`
     """
-    self.__nf_id_binding.update({nf.id: "%s_%s" % (nf.id, unique)
-                                 for nf in nffg.nfs})
-    raw = nffg.dump()
-    for old, new in self.__nf_id_binding.iteritems():
-      # decompressor_0 id contains the compressor_0 id --> use trick to consider
-      # the string apostrophe as well
-      raw = raw.replace('"%s"' % old, '"%s"' % new)
-    return NFFG.parse(raw_data=raw)
+    nfs = [nf for nf in nffg.nfs]
+    binding = {nf.id: "%s_%s" % (nf.id, unique) for nf in nfs}
+    self.__nf_id_binding.update(binding)
+    # Collect the edges which refer to the relabelled nodes
+    edges = [link for src, dst, link in nffg.network.edges_iter(data=True)
+             if src in binding or dst in binding]
+    for nf in nfs:
+      # Removing the node removes the connected edges as well
+      nffg.network.remove_node(nf.id)
+      if nf.name == nf.id:
+        nf.name = binding[nf.id]
+      nf.id = binding[nf.id]
+      nffg.add_node(nf)
+    for link in edges:
+      # Node ids are resolved from the back-references of the ports
+      nffg.add_edge(src=link.src, dst=link.dst, link=link)
+    return nffg
 
   def update_sg_hop_ids (self, log):
     """
@@ -170,16 +383,13 @@ class ServiceInstance(object):
     """
     log.debug("Allocate SG hop ID for request...")
     for hop in [sg for sg in self.sg.sg_hops]:
-      if hop.id not in ServiceManager.sg_hop_cache:
+      if ServiceManager.sg_hop_cache.reserve(id=hop.id, owner=self.id):
         new_id = hop.id
       else:
-        for i in xrange(1, 1000000):
-          if i not in ServiceManager.sg_hop_cache:
-            new_id = i
-            break
-        else:
+        new_id = ServiceManager.sg_hop_cache.allocate(owner=self.id)
+        if new_id is None:
+          log.error("No available SG hop ID found!")
           return
-      ServiceManager.sg_hop_cache[new_id] = self.id
       self.sg.del_edge(src=hop.src, dst=hop.dst, id=hop.id)
       self.sg.add_sglink(src_port=hop.src,
                          dst_port=hop.dst,
@@ -196,6 +406,15 @@ class ServiceManager(object):
   """
   Manager class for NSD instances.
   Very primitive.
+
+  The managed instances are stored in a copy-on-write dict: the writers
+  replace the whole dict holding the lock of the manager, so readers can
+  iterate the current dict without locking. The ids of the instances are
+  indexed by status and by NS id and kept in creation order the same way, so
+  the instances can be filtered and paged without a full scan. The status of
+  a managed instance must be changed by :meth:`set_service_status` to keep
+  the index up to date. The orchestration and the termination of one
+  instance are serialized by the lock of the instance.
   """
   LOGGER_NAME = "ServiceManager"
   # Default ESCAPE URL
@@ -206,11 +425,12 @@ class ServiceManager(object):
   SERVICE_DIR = "services"
   SERVICE_CATALOG_ENABLED = False
   REQUEST_TIMEOUT = 3
-  # Global service graph id cache
-  sg_hop_cache = dict()
+  # Global service graph id cache: SG hop id --> ServiceInstance id
+  sg_hop_cache = IdAllocator(start=1, stop=1000000)
 
   def __init__ (self, converter, use_remote=False, service_catalog_url=None,
-                cache_dir=None, nsd_dir=None, logger=None):
+                cache_dir=None, nsd_dir=None, logger=None, session=None,
+                registry=None):
     """
     Init Service Manager.
     
@@ -226,6 +446,10 @@ class ServiceManager(object):
     :type nsd_dir: str
     :param logger: optional logger object
     :type logger: :class:`logging.Logger`
+    :param session: optional HTTP session used for the Service Catalog
+    :type session: :class:`requests.Session`
+    :param registry: optional durable registry of the service instances
+    :type registry: :class:`ServiceRegistry`
     """
     if logger is not None:
       self.log = logger.getChild(self.LOGGER_NAME)
@@ -234,9 +458,31 @@ class ServiceManager(object):
     # service-id: ServiceInstance object
     self.converter = converter
     self.log.debug("Using converter: %s" % self.converter)
+    # Replaced, never modified in place
     self.__instances = {}
-    # Store NF id --> ServiceInstance id
+    # (seq, instance id) in creation order, replaced as well
+    self.__order = []
+    # Status --> (seq, instance id) in creation order, replaced as well
+    self.__status_index = {}
+    # NS id --> (seq, instance id) in creation order, replaced as well
+    self.__service_index = {}
+    # (updated_ts, seq, instance id) in update order, replaced as well
+    self.__updated_index = []
+    self.__seq = itertools.count(1)
+    # Changed when an instance is added or removed or its status or
+    # addresses change
+    self.version = 0
+    self.__versions = itertools.count(1)
+    # Store NF id --> ServiceInstance id, modified holding the lock
     self.__vnf_cache = {}
+    # Guard the changes of the managed instances and the VNF cache
+    self.__lock = threading.RLock()
+    # Persisted state of the service instances
+    self.registry = registry
+    # Parsed service NFFGs: ns_id --> NFFG
+    self.__templates = TemplateCache(
+      loader=lambda path: NFFG.parse_from_file(path=path),
+      cloner=clone_service_template)
     if nsd_dir:
       self.NSD_DIR = nsd_dir
     self.log.debug("Use directory for NSD cache: %s" % self.NSD_DIR)
@@ -244,6 +490,8 @@ class ServiceManager(object):
       self.SERVICE_DIR = cache_dir
     self.log.debug("Use directory for service cache: %s" % self.SERVICE_DIR)
     self.service_catalog_url = service_catalog_url
+    # Fall back to the module-level functions of requests
+    self.__http = session if session is not None else requests
     if use_remote:
       self.SERVICE_CATALOG_ENABLED = True
       self.log.debug(
@@ -263,6 +511,51 @@ class ServiceManager(object):
       if not filename.startswith('.') and filename.endswith('.nffg'):
         service_id = os.path.splitext(filename)[0]
         self.log.debug("Detected cached service NFFG: %s" % service_id)
+    if self.registry is not None:
+      self.__restore_instances()
+
+  def __restore_instances (self):
+    """
+    Restore the service instances with their SG hop and VLAN ids from the
+    registry.
+
+    :return: None
+    """
+    instances, hops, vlans = self.registry.load()
+    restored = {}
+    status_index, service_index = {}, {}
+    # Keep the creation order of the instances
+    for data in sorted(instances, key=lambda d: d['created_at']):
+      si = ServiceInstance.restore(data=data)
+      if si.status == ServiceInstance.STATUS_INIT:
+        # The orchestration was interrupted, the RO may have got the request
+        self.log.warning("Orchestration of service instance: %s has been "
+                         "interrupted! The RO may have allocated resources "
+                         "for it. Set status: %s" %
+                         (si.id, ServiceInstance.STATUS_ERROR))
+        si.status = ServiceInstance.STATUS_ERROR
+        self.registry.save_status(si=si)
+      si.seq = next(self.__seq)
+      restored[si.id] = si
+      self.__order.append((si.seq, si.id))
+      status_index.setdefault(si.status, []).append((si.seq, si.id))
+      service_index.setdefault(si.service_id, []).append((si.seq, si.id))
+      self.__updated_index.append((si.updated_ts, si.seq, si.id))
+      # The binding contains the tagged NF ids so the SG is not parsed here
+      self.__vnf_cache.update((nf_id, si.id)
+                              for nf_id in si.binding.itervalues())
+    self.__instances = restored
+    self.__status_index = status_index
+    self.__service_index = service_index
+    self.__updated_index.sort()
+    for hop_id, owner in hops.iteritems():
+      if not self.sg_hop_cache.reserve(id=hop_id, owner=owner):
+        self.log.warning("SG hop id: %s of service instance: %s is already "
+                         "reserved!" % (hop_id, owner))
+    for ns_id, tags in vlans.iteritems():
+      self.converter.restore_tags(ns_id=ns_id, tags=tags)
+    self.log.info("Restored %s service instances from registry: %s"
+                  % (len(instances), self.registry.path))
 
   def store_nsd (self, raw):
     """
@@ -278,7 +571,7 @@ class ServiceManager(object):
       # Parse data as JSON
       self.log.debug("Parsing NSD body...")
       data = json.loads(raw)
-      self.log.log(VERBOSE, "Parsed body:\n%s" % pprint.pformat(data))
+      self.log.log(VERBOSE, "Parsed body:\n%s", lazy(pprint.pformat, data))
       # Filename based on the service ID
       filename = data['nsd']['id']
       path = os.path.realpath(os.path.join(self.NSD_DIR, "%s.json" % filename))
@@ -303,7 +596,7 @@ class ServiceManager(object):
         "Got unexpected exception during NSD -> NFFG conversion!")
       raise
 
-  def instantiate_ns (self, ns_id, path=None, name=None):
+  def instantiate_ns (self, ns_id, path=None, name=None, timer=None):
     """
     Create a service (NS) instance with optional status.
 
@@ -313,9 +606,13 @@ class ServiceManager(object):
     :type name: str
     :param path: path of the service NFFG
     :type path: str
+    :param timer: records the duration of the phases (optional)
+    :type timer: :class:`PhaseTimer`
     :return: service instance
     :rtype: ServiceInstance
     """
+    if timer is None:
+      timer = PhaseTimer()
     # If path is missing then assembly if from ns_id
     if not path:
       path = os.path.join(self.SERVICE_DIR, "%s.nffg" % ns_id)
@@ -333,7 +630,8 @@ class ServiceManager(object):
                          % (ns_id, self.NSD_DIR))
         if self.SERVICE_CATALOG_ENABLED:
           # Try to acquire the NSD from remote service catalog and convert it
-          nsd_path = self.request_nsd_from_remote_store(ns_id=ns_id)
+          with timer.phase("nsd-fetch"):
+            nsd_path = self.request_nsd_from_remote_store(ns_id=ns_id)
           if not nsd_path:
             self.log.error("Failed to acquire NSD: %s" % ns_id)
             si.status = si.STATUS_ERROR
@@ -342,7 +640,8 @@ class ServiceManager(object):
           self.log.warning("Using service-catalog is disabled!")
           return
       # Convert the NSD given by file name
-      sg = self.convert_service(nsd_file=nsd_path)
+      with timer.phase("conversion"):
+        sg = self.convert_service(nsd_file=nsd_path)
       self.log.info("NSD conversion has been ended!")
       if sg is None:
         self.log.error("Service conversion was failed! Service is not saved!")
@@ -350,11 +649,15 @@ class ServiceManager(object):
         return si
     try:
       self.log.debug("Loading Service Descriptor from file...")
-      # Load the requested service descriptor
-      sg = si.load_sg_from_file()
-      self.log.debug("Service has been loaded!")
-      self.log.log(VERBOSE, "SG hop cache:\n%s"
-                   % pprint.pformat(self.sg_hop_cache))
+      # Load the requested service descriptor from the template cache
+      with timer.phase("template-load") as load:
+        template = self.__templates.get(key=ns_id, path=path)
+      with timer.phase("nf-tagging"):
+        sg = si.load_sg(nffg=template)
+      self.log.debug("Service has been loaded in %.3f ms! Template cache: %s"
+                     % (load.elapsed * 1000, self.__templates.stats()))
+      self.log.log(VERBOSE, "SG hop cache:\n%s",
+                   lazy(lambda: pprint.pformat(self.sg_hop_cache.snapshot())))
     except IOError:
       self.log.warning("NFFG file for service instance creation is not found "
                        "in %s! Skip service processing..." % self.SERVICE_DIR)
@@ -365,16 +668,125 @@ class ServiceManager(object):
     si.path = path
     si.status = ServiceInstance.STATUS_INIT
     # Store Service Instance
-    self.__instances[si.id] = si
-    self.__update_vnf_cache(data=sg, si_id=si.id)
+    with self.__lock:
+      si.seq = next(self.__seq)
+      instances = self.__instances.copy()
+      instances[si.id] = si
+      self.__instances = instances
+      self.__order = self.__order + [(si.seq, si.id)]
+      self.__status_index = self.__reindex(index=self.__status_index,
+                                           item=(si.seq, si.id),
+                                           new=si.status)
+      self.__service_index = self.__reindex(index=self.__service_index,
+                                            item=(si.seq, si.id),
+                                            new=si.service_id)
+      self.__updated_index = self.__resort(
+        items=self.__updated_index, new=(si.updated_ts, si.seq, si.id))
+      self.__changed()
+      self.__update_vnf_cache(data=sg, si_id=si.id)
+      # Enqueued holding the lock to precede the status changes
+      if self.registry is not None:
+        self.registry.save_instance(si=si)
     self.log.info("Add managed service: %s with instance id: %s " % (ns_id,
                                                                      si.id))
     return si
 
+  def __changed (self):
+    """
+    Change the version of the managed instances.
+
+    :return: None
+    """
+    self.version = next(self.__versions)
+
+  @staticmethod
+  def __resort (items, old=None, new=None):
+    """
+    Remove the `old` and insert the `new` item into a copy of the given
+    sorted list.
+
+    :param items: sorted items
+    :type items: list
+    :param old: removed item (optional)
+    :param new: inserted item (optional)
+    :return: updated sorted list
+    :rtype: list
+    """
+    items = list(items)
+    if old is not None:
+      i = bisect.bisect_left(items, old)
+      if i < len(items) and items[i] == old:
+        del items[i]
+    if new is not None:
+      bisect.insort(items, new)
+    return items
+
+  def __reindex (self, index, item, old=None, new=None):
+    """
+    Move the given (seq, instance id) item from the `old` to the `new` key of
+    the given index. The index is not modified, the caller must replace it
+    with the returned one holding the lock.
+
+    :param index: attribute value --> (seq, instance id) in creation order
+    :type index: dict
+    :param item: (seq, instance id) of the service instance
+    :type item: tuple
+    :param old: previous value or None for a new instance
+    :param new: current value or None for a removed instance
+    :return: updated index
+    :rtype: dict
+    """
+    index = index.copy()
+    if old is not None:
+      index[old] = self.__resort(items=index.get(old, ()), old=item)
+      if not index[old]:
+        del index[old]
+    if new is not None:
+      index[new] = self.__resort(items=index.get(new, ()), new=item)
+    return index
+
+  def update_sg_hop_ids (self, si):
+    """
+    Allocate the SG hop ids of the given service instance and persist every
+    hop id reserved by the instance.
+
+    :param si: service instance
+    :type si: ServiceInstance
+    :return: the updated service graph
+    :rtype: NFFG
+    """
+    sg = si.update_sg_hop_ids(log=self.log)
+    if self.registry is not None:
+      self.registry.save_hops(si_id=si.id,
+                              hops=self.sg_hop_cache.ids_of(owner=si.id))
+    return sg
+
+  def update_sg (self, si, sg):
+    """
+    Store and persist the finalized service graph of the given service
+    instance.
+
+    :param si: service instance
+    :type si: ServiceInstance
+    :param sg: service graph sent to the RO
+    :type sg: NFFG
+    :return: None
+    """
+    si.update_sg(sg=sg)
+    if self.registry is not None:
+      self.registry.save_sg(si=si)
+
+  def get_template_stats (self):
+    """
+    :return: statistics of the service template cache
+    :rtype: dict
+    """
+    return self.__templates.stats()
+
   def __update_vnf_cache (self, data, si_id):
     if isinstance(data, NFFG):
       self.__vnf_cache.update(((nf.id, si_id) for nf in data.nfs))
-      self.log.debug("Updated VNF cache: %s" % self.__vnf_cache)
+      self.log.debug("Updated VNF cache: %s", self.__vnf_cache)
 
   def request_nsd_from_remote_store (self, ns_id):
     """
@@ -391,8 +803,8 @@ class ServiceManager(object):
     url = os.path.join(self.service_catalog_url, str(ns_id))
     self.log.debug("Used URL for NSD request: %s" % url)
     try:
-      response = requests.get(url=url,
-                              timeout=self.REQUEST_TIMEOUT)
+      response = self.__http.get(url=url,
+                                 timeout=self.REQUEST_TIMEOUT)
     except Timeout:
       self.log.error("Request timeout: %ss exceeded! Service Catalog: %s is "
                      "unreachable!" % (self.REQUEST_TIMEOUT,
@@ -410,8 +822,8 @@ class ServiceManager(object):
       return
     self.log.info("NSD: %s has been acquired from Service Catalog: %s" %
                   (ns_id, self.service_catalog_url))
-    self.log.log(VERBOSE,
-                 "Received body:\n%s" % pprint.pformat(response.json()))
+    self.log.log(VERBOSE, "Received body:\n%s",
+                 lazy(lambda: pprint.pformat(response.json())))
     return self.store_nsd(raw=response.text)
 
   def convert_service (self, nsd_file):
@@ -430,12 +842,17 @@ class ServiceManager(object):
     if sg is None:
       self.log.error("Service conversion was failed! Service is not saved!")
       return
-    self.log.log(VERBOSE, "Converted service:\n%s" % sg.dump())
+    self.log.log(VERBOSE, "Converted service:\n%s", lazy(sg.dump))
     # Save result NFFG into a file
     sg_path = os.path.join(self.SERVICE_DIR, "%s.nffg" % sg.id)
     with open(sg_path, 'w') as f:
       f.write(sg.dump())
       self.log.info("Converted NFFG has been saved! Path: %s" % sg_path)
+    # Drop the outdated template even if the fingerprint would not change
+    self.__templates.invalidate(key=sg.id)
+    if self.registry is not None:
+      self.registry.save_vlans(ns_id=sg.id,
+                               tags=self.converter.get_tags(ns_id=sg.id))
     return sg
 
   def remove_service_instance (self, id):
@@ -448,29 +865,50 @@ class ServiceManager(object):
     :rtype: ServiceInstance
     """
     self.log.debug("Remove service instance: %s from ServiceManager!" % id)
-    if id in self.__instances:
-      si = self.get_service(id=id)
-      del self.__instances[id]
+    with self.__lock:
+      if id not in self.__instances:
+        self.log.warning("Service: %s is not found!" % id)
+        return
+      instances = self.__instances.copy()
+      si = instances.pop(id)
+      self.__instances = instances
+      self.__order = self.__resort(items=self.__order, old=(si.seq, si.id))
+      self.__status_index = self.__reindex(index=self.__status_index,
+                                           item=(si.seq, si.id),
+                                           old=si.status)
+      self.__service_index = self.__reindex(index=self.__service_index,
+                                            item=(si.seq, si.id),
+                                            old=si.service_id)
+      self.__updated_index = self.__resort(
+        items=self.__updated_index, old=(si.updated_ts, si.seq, si.id))
+      self.__changed()
+      for nf_id in si.binding.itervalues():
+        if self.__vnf_cache.get(nf_id) == si.id:
+          del self.__vnf_cache[nf_id]
       self._remove_sg_hop_ids(si=si)
       si.status = ServiceInstance.STATUS_STOPPED
-      return si
-    else:
-      self.log.warning("Service: %s is not found!" % id)
+      # Reclaim the VLAN tags of the NS if its last instance is gone
+      if not any(i.service_id == si.service_id
+                 for i in instances.itervalues()):
+        if self.converter.release_tags(ns_id=si.service_id) and \
+           self.registry is not None:
+          self.registry.save_vlans(ns_id=si.service_id, tags={})
+      if self.registry is not None:
+        self.registry.remove_instance(id=si.id)
+    return si
 
   def _remove_sg_hop_ids (self, si):
-    print self.sg_hop_cache
-    ids = []
-    for id in self.sg_hop_cache:
-      if self.sg_hop_cache[id] == si.id:
-        ids.append(id)
-    # ids = [id for id, si_id in self.sg_hop_cache.itervalues() if si_id ==
-    # si.id]
-    for id in ids:
-      del self.sg_hop_cache[id]
+    """
+    Release the SG hop ids allocated for the given service instance.
+
+    :param si: service instance
+    :type si: ServiceInstance
+    :return: None
+    """
+    for id in self.sg_hop_cache.release_owner(owner=si.id):
       self.log.debug("Removed hop id: %s from SG hop cache" % id)
-    self.log.log(VERBOSE, "SG hop cache:\n%s"
-                 % pprint.pformat(self.sg_hop_cache))
-    print self.sg_hop_cache
+    self.log.log(VERBOSE, "SG hop cache:\n%s",
+                 lazy(lambda: pprint.pformat(self.sg_hop_cache.snapshot())))
 
   def set_service_status (self, id, status):
     """
@@ -482,10 +920,25 @@ class ServiceManager(object):
     :type status: str
     :return: None
     """
-    if id not in self.__instances:
-      self.log.warning("Missing service instance: %s from ServiceManager!" % id)
-    else:
-      self.__instances[id].status = status
+    with self.__lock:
+      si = self.__instances.get(id)
+      if si is None:
+        self.log.warning("Missing service instance: %s from ServiceManager!"
+                         % id)
+        return
+      if si.status != status:
+        self.__status_index = self.__reindex(index=self.__status_index,
+                                             item=(si.seq, si.id),
+                                             old=si.status, new=status)
+      updated = (si.updated_ts, si.seq, si.id)
+      si.status = status
+      self.__updated_index = self.__resort(
+        items=self.__updated_index, old=updated,
+        new=(si.updated_ts, si.seq, si.id))
+      self.__changed()
+      # Enqueued holding the lock to keep the order of the status changes
+      if self.registry is not None:
+        self.registry.save_status(si=si)
       self.log.info("Status for service: %s updated with value: %s" %
                     (id, status))
 
@@ -498,8 +951,9 @@ class ServiceManager(object):
     :return: service instance object
     :rtype: ServiceInstance
     """
-    if id in self.__instances:
-      return self.__instances[id]
+    si = self.__instances.get(id)
+    if si is not None:
+      return si
     else:
       self.log.warning("Missing service instance: %s from ServiceManager!" % id)
 
@@ -512,8 +966,9 @@ class ServiceManager(object):
     :return: service status
     :rtype: str
     """
-    if id in self.__instances:
-      return self.__instances[id].status
+    si = self.__instances.get(id)
+    if si is not None:
+      return si.status
     else:
       self.log.warning("Missing service instance: %s from ServiceManager!" % id)
 
@@ -526,11 +981,79 @@ class ServiceManager(object):
     :return: service name
     :rtype: str
     """
-    if id in self.__instances:
-      return self.__instances[id].name
+    si = self.__instances.get(id)
+    if si is not None:
+      return si.name
     else:
       self.log.warning("Missing service instance: %s from ServiceManager!" % id)
 
+  def get_services (self, status=None):
+    """
+    Return with the managed services.
+
+    :param status: return only the services with the given status (optional)
+    :type status: str
+    :return: service instances
+    :rtype: list
+    """
+    instances = self.__instances
+    if status is None:
+      return instances.values()
+    return [instances[id] for seq, id in self.__status_index.get(status, ())
+            if id in instances]
+
+  def find_services (self, status=None, ns_id=None, updated_since=None,
+                     cursor=None, limit=None):
+    """
+    Return with the managed services matching the given filters in creation
+    order. The smallest matching index is walked from the cursor, so a page
+    costs O(log n + limit) if the other filters match as well.
+
+    :param status: status of the services (optional)
+    :type status: str
+    :param ns_id: NS id of the services (optional)
+    :type ns_id: str
+    :param updated_since: return only the services updated at or after the
+      given time in seconds since the epoch, see :func:`parse_timestamp`
+      (optional)
+    :type updated_since: float
+    :param cursor: return the services after the given cursor (optional)
+    :type cursor: int
+    :param limit: max number of returned services (optional)
+    :type limit: int
+    :return: service instances and the cursor of the next page or None
+    :rtype: tuple
+    """
+    instances = self.__instances
+    indexes = [self.__order]
+    if status is not None:
+      indexes.append(self.__status_index.get(status, ()))
+    if ns_id is not None:
+      indexes.append(self.__service_index.get(ns_id, ()))
+    items = min(indexes, key=len)
+    if updated_since is not None:
+      updated = self.__updated_index
+      recent = updated[bisect.bisect_left(updated, (updated_since,)):]
+      # Recently updated instances of a delta poll are sorted by creation
+      if len(recent) < len(items):
+        items = sorted((seq, id) for ts, seq, id in recent)
+    ret = []
+    for i in xrange(bisect.bisect_left(items, (cursor + 1,)) if cursor else 0,
+                    len(items)):
+      si = instances.get(items[i][1])
+      if si is None:
+        # Removed after the snapshot of the index
+        continue
+      # The walked index is checked as well as it can be already outdated
+      if status is not None and si.status != status or \
+         ns_id is not None and si.service_id != ns_id or \
+         updated_since is not None and si.updated_ts < updated_since:
+        continue
+      if limit is not None and len(ret) == limit:
+        return ret, ret[-1].seq
+      ret.append(si)
+    return ret, None
+
   def get_running_services_status (self):
     """
     Return with the running services.
@@ -539,11 +1062,8 @@ class ServiceManager(object):
     :rtype: list
     """
     self.log.info("Collect running services from ServiceManager...")
-    ret = []
-    for si in self.__instances.itervalues():
-      if si.status == ServiceInstance.STATUS_START:
-        ret.append(si.get_json())
-    return ret
+    return [si.get_json() for si in
+            self.get_services(status=ServiceInstance.STATUS_START)]
 
   def get_services_status (self):
     """
@@ -553,10 +1073,17 @@ class ServiceManager(object):
     :rtype: list
     """
     self.log.info("Collect managed services from ServiceManager...")
-    ret = []
-    for si in self.__instances.itervalues():
-      ret.append(si.get_json())
-    return ret
+    return [si.get_json() for si in self.get_services()]
+
+  def count_services_by_status (self):
+    """
+    Return with the number of the managed services per status.
+
+    :return: status --> number of services
+    :rtype: dict
+    """
+    return {status: len(ids) for status, ids in
+            self.__status_index.iteritems() if ids}
 
   def update_sg_hops_from_ro (self, si, topo, virtualizer_enabled=False):
     self.log.debug("Updating SG hop IDs from RO response...")
@@ -566,9 +1093,8 @@ class ServiceManager(object):
           hop_id = int(hop_id)
         except ValueError:
           pass
-        if hop_id not in ServiceManager.sg_hop_cache:
+        if ServiceManager.sg_hop_cache.reserve(id=hop_id, owner=si.id):
           self.log.debug("Found unknown SG hop ID: %s" % hop_id)
-          ServiceManager.sg_hop_cache[hop_id] = si.id
     else:
       for node in topo.nodes:
         for flowentry in node.flowtable:
@@ -577,10 +1103,10 @@ class ServiceManager(object):
             new_id = int(new_id)
           except ValueError:
             pass
-          if new_id not in ServiceManager.sg_hop_cache:
+          if ServiceManager.sg_hop_cache.reserve(id=new_id, owner=si.id):
             self.log.debug("Found unknown SG hop ID: %s" % new_id)
-            ServiceManager.sg_hop_cache[new_id] = si.id
-    self.log.log(VERBOSE, "SG hop cache: %s" % ServiceManager.sg_hop_cache)
+    self.log.log(VERBOSE, "SG hop cache: %s",
+                 lazy(ServiceManager.sg_hop_cache.snapshot))
 
   def update_si_addresses_from_ro (self, topo):
     """
@@ -596,19 +1122,32 @@ class ServiceManager(object):
     else:
       self.log.error("Unrecognized topology format: %s" % type(topo))
       return
-    self.log.debug("Collected IP info:\n%s" % pprint.pformat(vnf_address))
+    self.log.debug("Collected IP info:\n%s", lazy(pprint.pformat, vnf_address))
     # Update SI based on collected NF<->IPs
+    collected = {}
     for vnf_id, ip in vnf_address.iteritems():
-      if vnf_id not in self.__vnf_cache:
+      si = self.__instances.get(self.__vnf_cache.get(vnf_id))
+      if si is None:
         self.log.warning("VNF: %s is missing from cache!" % vnf_id)
         continue
-      si = self.get_service(id=self.__vnf_cache[vnf_id])
       if si.status != ServiceInstance.STATUS_START:
         self.log.debug("Service Instance: %s is not started. "
                        "Skip IP address update..." % si.id)
         continue
-      si.vnf_addresses.update({vnf_id: ip})
+      collected.setdefault(si, {})[vnf_id] = ip
       self.log.debug("Updated IP: %s ---> %s" % (vnf_id, ip))
+    for si, addresses in collected.iteritems():
+      with self.__lock:
+        updated = (si.updated_ts, si.seq, si.id)
+        if not si.update_vnf_addresses(addresses=addresses):
+          continue
+        if self.__instances.get(si.id) is si:
+          self.__updated_index = self.__resort(
+            items=self.__updated_index, old=updated,
+            new=(si.updated_ts, si.seq, si.id))
+        self.__changed()
+      if self.registry is not None:
+        self.registry.save_addresses(si=si)
 
   @staticmethod
   def __collect_addr_from_nffg (nffg):
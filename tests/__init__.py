@@ -0,0 +1,30 @@
+# Copyright 2017 Janos Czentye
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Unit tests of the T-NOVA Connector.
+
+Run from the project root with: python -m unittest discover -s tests -t .
+"""
+import atexit
+import logging
+import shutil
+import tempfile
+
+from util.trail import MessageDumper
+
+# Keep the message trails of the tests out of the project folder
+MessageDumper.DIR = tempfile.mkdtemp(prefix="tnova-trails-") + "/"
+# Runs after the shutdown of the dumper registered at its first use
+atexit.register(shutil.rmtree, MessageDumper.DIR, True)
+logging.getLogger().addHandler(logging.NullHandler())
@@ -0,0 +1,78 @@
+# Copyright 2017 Janos Czentye
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Tests of the service template cache.
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from util.cache import TemplateCache
+
+
+class Template(object):
+
+  def __init__ (self, path):
+    self.path = path
+    self.copies = 0
+
+  def copy (self):
+    self.copies += 1
+    return Template(path=self.path)
+
+
+class TemplateCacheTest(unittest.TestCase):
+
+  def setUp (self):
+    self.dir = tempfile.mkdtemp()
+    self.path = os.path.join(self.dir, "ns.nffg")
+    with open(self.path, "w") as f:
+      f.write("{}")
+    self.loaded = []
+
+  def tearDown (self):
+    shutil.rmtree(self.dir)
+
+  def load (self, path):
+    template = Template(path=path)
+    self.loaded.append(template)
+    return template
+
+  def test_default_copy (self):
+    cache = TemplateCache(loader=self.load)
+    first = cache.get(key="ns", path=self.path)
+    second = cache.get(key="ns", path=self.path)
+    self.assertEqual(len(self.loaded), 1)
+    self.assertEqual(self.loaded[0].copies, 2)
+    self.assertIsNot(first, second)
+    self.assertNotIn(first, self.loaded)
+
+  def test_cloner (self):
+    clones = []
+
+    def clone (template):
+      clones.append(template)
+      return Template(path=template.path)
+
+    cache = TemplateCache(loader=self.load, cloner=clone)
+    for _ in xrange(3):
+      self.assertEqual(cache.get(key="ns", path=self.path).path, self.path)
+    self.assertEqual(clones, self.loaded * 3)
+    self.assertEqual(self.loaded[0].copies, 0)
+    self.assertEqual(cache.stats()['hits'], 2)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,71 @@
+# Copyright 2017 Janos Czentye
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Tests of the callback handling.
+"""
+import logging
+import threading
+import unittest
+
+from service.callback import CallbackManager
+
+
+class CallbackRaceTest(unittest.TestCase):
+
+  def setUp (self):
+    self.manager = CallbackManager(domain_name="test", port=0, timeout=60,
+                                   logger=logging.getLogger("test"))
+    self.hooked = []
+    self.hooked_lock = threading.Lock()
+
+  def tearDown (self):
+    self.manager.server_close()
+
+  def hook (self, callback):
+    with self.hooked_lock:
+      self.hooked.append((callback.callback_id, callback.result_code))
+
+  def test_timeout_and_result_race (self):
+    callbacks = [self.manager.subscribe_callback(hook=self.hook,
+                                                 cb_id="cb-%s" % i,
+                                                 type="SERVICE")
+                 for i in xrange(200)]
+    start = threading.Event()
+
+    def invoke (cb_id, result):
+      start.wait()
+      self.manager.invoke_hook(msg_id=cb_id, result=result)
+
+    threads = []
+    for cb in callbacks:
+      for result in (0, 202):
+        threads.append(threading.Thread(target=invoke,
+                                        args=(cb.callback_id, result)))
+    for t in threads:
+      t.start()
+    start.set()
+    for t in threads:
+      t.join()
+    # Every hook has been called once with the result of the first outcome
+    self.assertEqual(sorted(cb_id for cb_id, _ in self.hooked),
+                     sorted(cb.callback_id for cb in callbacks))
+    for cb_id, result in self.hooked:
+      cb = callbacks[int(cb_id.split("-")[1])]
+      self.assertIn(result, (0, 202))
+      self.assertEqual(cb.result_code, result)
+    self.assertEqual(self.manager.pending, 0)
+
+
+if __name__ == '__main__':
+  unittest.main()
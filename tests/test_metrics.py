@@ -0,0 +1,56 @@
+# Copyright 2017 Janos Czentye
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Tests of the exported metrics.
+"""
+import unittest
+
+from util.metrics import MetricsRegistry
+
+
+class MetricsTest(unittest.TestCase):
+
+  def setUp (self):
+    self.registry = MetricsRegistry()
+
+  def test_collected_counter (self):
+    values = [3]
+    self.registry.counter(name="test_dropped_total", help="Dropped items",
+                          collect=lambda: values[0])
+    self.assertEqual(self.registry.expose(),
+                     "# HELP test_dropped_total Dropped items\n"
+                     "# TYPE test_dropped_total counter\n"
+                     "test_dropped_total 3.0\n")
+    values[0] = 5
+    self.assertIn("test_dropped_total 5.0\n", self.registry.expose())
+
+  def test_collected_gauge_with_labels (self):
+    self.registry.gauge(name="test_instances", help="Instances",
+                        labels=("status",),
+                        collect=lambda: {"running": 2, "error": 1})
+    self.assertIn('test_instances{status="error"} 1.0\n'
+                  'test_instances{status="running"} 2.0\n',
+                  self.registry.expose())
+
+  def test_counter (self):
+    counter = self.registry.counter(name="test_requests_total",
+                                    help="Requests", labels=("route",))
+    counter.inc(route="/service")
+    counter.inc(route="/service")
+    self.assertIn('test_requests_total{route="/service"} 2.0\n',
+                  self.registry.expose())
+
+
+if __name__ == '__main__':
+  unittest.main()
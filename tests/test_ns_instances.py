@@ -0,0 +1,109 @@
+# Copyright 2017 Janos Czentye
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Tests of the /ns-instances listing.
+"""
+import json
+import unittest
+
+import connector
+from util.trail import MessageDumper
+
+
+class FakeInstance(object):
+
+  def __init__ (self, id):
+    self.id = id
+
+  def get_json_fragment (self):
+    return json.dumps({"id": self.id})
+
+
+class FakeServiceManager(object):
+  version = 1
+
+  def __init__ (self, *instances):
+    self.instances = list(instances)
+    self.queries = []
+
+  def find_services (self, status=None, ns_id=None, updated_since=None,
+                     cursor=None, limit=None):
+    self.queries.append(updated_since)
+    return self.instances, None
+
+
+class ListServiceInstancesTest(unittest.TestCase):
+  UNIQUE = "ns-instances-response"
+
+  def setUp (self):
+    self.service_mgr = connector.service_mgr
+    self.dynamic_update = connector.DYNAMIC_UPDATE_ENABLED
+    self.disabled = MessageDumper.DISABLED
+    self.sampling = MessageDumper.SAMPLING
+    connector.service_mgr = FakeServiceManager(FakeInstance(id="si-1"),
+                                               FakeInstance(id="si-2"))
+    connector.DYNAMIC_UPDATE_ENABLED = False
+    self.dumps = []
+    dumper = MessageDumper()
+    dump_to_file = dumper.dump_to_file
+
+    def record (data, unique, sampled=False):
+      if unique == self.UNIQUE and (sampled or dumper.will_dump(unique)):
+        self.dumps.append(data)
+
+    dumper.dump_to_file = record
+    self.addCleanup(setattr, dumper, "dump_to_file", dump_to_file)
+    self.client = connector.app.test_client()
+
+  def tearDown (self):
+    connector.service_mgr = self.service_mgr
+    connector.DYNAMIC_UPDATE_ENABLED = self.dynamic_update
+    MessageDumper.DISABLED = self.disabled
+    MessageDumper.SAMPLING = self.sampling
+
+  def test_malformed_cursor (self):
+    self.assertEqual(self.client.get("/ns-instances?cursor=x").status_code,
+                     400)
+    self.assertEqual(self.client.get("/ns-instances?limit=0").status_code,
+                     400)
+
+  def test_updated_since (self):
+    for value in ("yesterday", "2017-05-04%2012:00:00", "2017-05-04T12"):
+      self.assertEqual(self.client.get(
+        "/ns-instances?updated-since=%s" % value).status_code, 400)
+    self.assertEqual(connector.service_mgr.queries, [])
+    self.assertEqual(self.client.get(
+      "/ns-instances?updated-since=2017-05-04T14:00:00%2B02:00").status_code,
+                     200)
+    self.assertEqual(connector.service_mgr.queries, [1493899200])
+
+  def test_sampled_response (self):
+    MessageDumper.SAMPLING = {self.UNIQUE: 2}
+    for _ in xrange(4):
+      resp = self.client.get("/ns-instances")
+      self.assertEqual(json.loads(resp.data), [{"id": "si-1"},
+                                               {"id": "si-2"}])
+    # Every sampled response is dumped exactly once
+    self.assertEqual(len(self.dumps), 2)
+    self.assertEqual(json.loads(self.dumps[0]), [{"id": "si-1"},
+                                                 {"id": "si-2"}])
+
+  def test_disabled_response (self):
+    MessageDumper.DISABLED = frozenset([self.UNIQUE])
+    self.assertEqual(self.client.get("/ns-instances").status_code, 200)
+    self.assertEqual(self.dumps, [])
+
+
+if __name__ == '__main__':
+  unittest.main()
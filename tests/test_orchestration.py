@@ -0,0 +1,205 @@
+# Copyright 2017 Janos Czentye
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Tests of the service orchestration running in the connector.
+"""
+import threading
+import unittest
+
+from flask import Response
+
+import connector
+from service.service_mgr import ServiceInstance
+
+
+class FakeServiceManager(object):
+  """
+  Record the status changes of the service instances.
+  """
+
+  def __init__ (self, *instances):
+    self.statuses = []
+    self.instances = {si.id: si for si in instances}
+
+  def get_service (self, id):
+    return self.instances.get(id)
+
+  def set_service_status (self, id, status):
+    self.statuses.append((id, status))
+
+  def remove_service_instance (self, id):
+    self.statuses.append((id, "removed"))
+    return self.instances.pop(id, None)
+
+
+class FakeInstance(object):
+  id = "si-1"
+
+  def __init__ (self, id=None):
+    if id is not None:
+      self.id = id
+    self.status = ServiceInstance.STATUS_INIT
+    self.lock = threading.Lock()
+
+  def get_json (self):
+    return {"id": self.id, "status": self.status}
+
+
+class AsyncOrchestrationTest(unittest.TestCase):
+
+  def setUp (self):
+    self.service_mgr = connector.service_mgr
+    self.run_orchestration = connector._run_orchestration
+    connector.service_mgr = FakeServiceManager()
+
+  def tearDown (self):
+    connector.service_mgr = self.service_mgr
+    connector._run_orchestration = self.run_orchestration
+
+  def test_unexpected_error_sets_error_status (self):
+    def fail (si, instantiate_params, timer):
+      raise RuntimeError("unexpected")
+
+    connector._run_orchestration = fail
+    connector._run_async_orchestration(si=FakeInstance(),
+                                       instantiate_params={},
+                                       timer=None)
+    self.assertEqual(connector.service_mgr.statuses,
+                     [("si-1", ServiceInstance.STATUS_ERROR)])
+
+
+class TerminationRaceTest(unittest.TestCase):
+  """
+  A termination can remove the instance while its orchestration is queued.
+  """
+
+  def setUp (self):
+    self.service_mgr = connector.service_mgr
+    self.orchestrate_service = connector._orchestrate_service
+    self.orchestrated = []
+    self.violations = []
+
+    def orchestrate (si, instantiate_params, timer):
+      # Stands for the hop id allocation and the RO request
+      if connector.service_mgr.get_service(id=si.id) is not si:
+        self.violations.append(si.id)
+      self.orchestrated.append(si.id)
+      return Response(status=202)
+
+    connector._orchestrate_service = orchestrate
+
+  def tearDown (self):
+    connector.service_mgr = self.service_mgr
+    connector._orchestrate_service = self.orchestrate_service
+
+  def orchestrate_async (self, si):
+    connector._run_async_orchestration(si=si, instantiate_params={},
+                                       timer=connector.PhaseTimer())
+
+  def test_terminate_queued_orchestration (self):
+    si = FakeInstance()
+    connector.service_mgr = FakeServiceManager(si)
+    with si.lock:
+      worker = threading.Thread(target=self.orchestrate_async, args=(si,))
+      worker.start()
+      # The termination wins the instance lock
+      response = connector._delete_service(si=si,
+                                           timer=connector.PhaseTimer())
+      self.assertEqual(response.status_code, 200)
+    worker.join()
+    self.assertEqual(self.orchestrated, [])
+    self.assertEqual(connector.service_mgr.statuses, [("si-1", "removed")])
+
+  def test_concurrent_terminations (self):
+    instances = [FakeInstance(id="si-%s" % i) for i in xrange(200)]
+    connector.service_mgr = FakeServiceManager(*instances)
+    start = threading.Event()
+
+    def terminate (si):
+      start.wait()
+      connector._terminate_service(instance_id=si.id,
+                                   timer=connector.PhaseTimer())
+
+    def orchestrate (si):
+      start.wait()
+      self.orchestrate_async(si=si)
+
+    threads = []
+    for si in instances:
+      # Start the terminations first to let them overtake the orchestrations
+      threads.append(threading.Thread(target=terminate, args=(si,)))
+      threads.append(threading.Thread(target=orchestrate, args=(si,)))
+    for t in threads:
+      t.start()
+    start.set()
+    for t in threads:
+      t.join()
+    self.assertEqual(self.violations, [])
+    self.assertEqual(connector.service_mgr.instances, {})
+    # Every instance is either orchestrated or skipped, but never failed
+    self.assertNotIn(ServiceInstance.STATUS_ERROR,
+                     [status for id, status in
+                      connector.service_mgr.statuses])
+
+
+class ResultCodeTest(unittest.TestCase):
+  """
+  The RO accepts a request directly with 202, a callback with any 2xx code.
+  """
+
+  def setUp (self):
+    self.service_mgr = connector.service_mgr
+    connector.service_mgr = FakeServiceManager()
+
+  def tearDown (self):
+    connector.service_mgr = self.service_mgr
+
+  def test_initiation_accepted_directly (self):
+    connector._finish_service_initiation(si=FakeInstance(),
+                                         instantiate_params={},
+                                         result_code=202)
+    self.assertEqual(connector.service_mgr.statuses,
+                     [("si-1", ServiceInstance.STATUS_START)])
+
+  def test_initiation_not_accepted_directly (self):
+    result = connector._finish_service_initiation(si=FakeInstance(),
+                                                  instantiate_params={},
+                                                  result_code=200)
+    self.assertEqual(result, 200)
+    self.assertEqual(connector.service_mgr.statuses,
+                     [("si-1", ServiceInstance.STATUS_ERROR)])
+
+  def test_initiation_callback_success (self):
+    connector._finish_service_initiation(si=FakeInstance(),
+                                         instantiate_params={},
+                                         result_code=200,
+                                         from_callback=True)
+    self.assertEqual(connector.service_mgr.statuses,
+                     [("si-1", ServiceInstance.STATUS_START)])
+
+  def test_termination (self):
+    self.assertEqual(connector._finish_service_termination(
+      si=FakeInstance(), result_code=202, remove=True), 200)
+    self.assertEqual(connector._finish_service_termination(
+      si=FakeInstance(), result_code=204), 204)
+    self.assertEqual(connector._finish_service_termination(
+      si=FakeInstance(), result_code=204, from_callback=True), 200)
+    self.assertEqual(connector.service_mgr.statuses,
+                     [("si-1", "removed"),
+                      ("si-1", ServiceInstance.STATUS_ERROR),
+                      ("si-1", ServiceInstance.STATUS_STOPPED)])
+
+
+if __name__ == '__main__':
+  unittest.main()
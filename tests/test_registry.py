@@ -0,0 +1,92 @@
+# Copyright 2017 Janos Czentye
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Tests of the service registry.
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from service.registry import ServiceRegistry
+
+
+class FakeInstance(object):
+  id = "si-1"
+  service_id = "ns-1"
+  name = "ns"
+  path = "/ns-instances"
+  status = "init"
+  created_at = "2017-01-01T00:00:00Z"
+  updated_at = created_at
+  vnf_addresses = {}
+  binding = {}
+
+  def __init__ (self):
+    self.sg_dumps = 0
+
+  def get_sg_text (self):
+    self.sg_dumps += 1
+    return "{}"
+
+
+class ServiceRegistryTest(unittest.TestCase):
+
+  def setUp (self):
+    self.dir = tempfile.mkdtemp()
+    self.registry = ServiceRegistry(path=os.path.join(self.dir, "test.db"))
+    self.registry.open()
+
+  def tearDown (self):
+    self.registry.close()
+    shutil.rmtree(self.dir)
+
+  def test_status_change_does_not_dump_sg (self):
+    si = FakeInstance()
+    self.registry.save_instance(si=si)
+    si.status = "start"
+    self.registry.save_status(si=si)
+    self.registry.flush()
+    self.assertEqual(si.sg_dumps, 0)
+    instances, hops, vlans = self.registry.load()
+    self.assertEqual(instances[0]['status'], "start")
+    self.assertIsNone(instances[0]['sg'])
+
+  def test_save_hops_and_sg (self):
+    si = FakeInstance()
+    self.registry.save_instance(si=si)
+    self.registry.save_hops(si_id=si.id, hops=(1, 2, "ro-hop"))
+    self.registry.save_hops(si_id=si.id, hops=(1, 3))
+    self.registry.save_sg(si=si)
+    self.registry.flush()
+    self.assertEqual(si.sg_dumps, 1)
+    instances, hops, vlans = self.registry.load()
+    self.assertEqual(hops, {1: si.id, 3: si.id})
+    self.assertEqual(instances[0]['sg'], "{}")
+    self.registry.remove_instance(id=si.id)
+    self.registry.flush()
+    self.assertEqual(self.registry.load()[:2], ([], {}))
+
+  def test_change_after_close (self):
+    si = FakeInstance()
+    self.registry.save_instance(si=si)
+    self.registry.close()
+    si.status = "start"
+    self.registry.save_status(si=si)
+    self.assertEqual(self.registry.stats()['dropped'], 1)
+    self.assertEqual(self.registry.load()[0][0]['status'], "init")
+
+
+if __name__ == '__main__':
+  unittest.main()
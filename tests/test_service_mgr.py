@@ -0,0 +1,215 @@
+# Copyright 2017 Janos Czentye
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Tests of the service instance listing of the service manager.
+"""
+import datetime
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from service.registry import ServiceRegistry
+from service.service_mgr import ServiceInstance, ServiceManager
+from service.service_mgr import parse_timestamp
+
+START = ServiceInstance.STATUS_START
+STOPPED = ServiceInstance.STATUS_STOPPED
+BASE = datetime.datetime(2017, 5, 4, 12, 0, 0)
+
+
+class FakeConverter(object):
+
+  def release_tags (self, ns_id):
+    return False
+
+
+class ParseTimestampTest(unittest.TestCase):
+
+  def test_local_time (self):
+    self.assertEqual(parse_timestamp("2017-05-04T12:00:00"),
+                     time.mktime(BASE.timetuple()))
+    self.assertEqual(parse_timestamp("2017-05-04"),
+                     parse_timestamp("2017-05-04T00:00"))
+    self.assertEqual(parse_timestamp("2017-05-04T12:00:00.25"),
+                     time.mktime(BASE.timetuple()) + 0.25)
+
+  def test_utc_offset (self):
+    self.assertEqual(parse_timestamp("2017-05-04T12:00:00Z"), 1493899200)
+    self.assertEqual(parse_timestamp("2017-05-04T14:00:00+02:00"),
+                     1493899200)
+    self.assertEqual(parse_timestamp("2017-05-04T10:30:00-0130"),
+                     1493899200)
+
+  def test_malformed (self):
+    for value in ("yesterday", "2017-05-04 12:00:00", "2017-13-01",
+                  "2017-05-04T25:00", "2017-05-04T12:00:00+2", ""):
+      self.assertRaises(ValueError, parse_timestamp, value)
+
+  def test_instance_round_trip (self):
+    si = ServiceInstance(service_id="ns")
+    self.assertEqual(parse_timestamp(si.updated_at), si.updated_ts)
+
+
+class FindServicesTest(unittest.TestCase):
+  """
+  30 instances created one minute after each other, the odd ones are running
+  and every third one belongs to the same NS.
+  """
+
+  def setUp (self):
+    self.dir = tempfile.mkdtemp()
+    self.registry = ServiceRegistry(path=os.path.join(self.dir, "test.db"))
+    self.registry.open()
+    self.ids = []
+    for i in xrange(30):
+      si = ServiceInstance(service_id="ns-%s" % (i % 3),
+                           instance_id="si-%02d" % i,
+                           status=START if i % 2 else STOPPED)
+      si.created_at = si.updated_at = (
+        BASE + datetime.timedelta(minutes=i)).isoformat()
+      self.registry.save_instance(si=si)
+      self.ids.append(si.id)
+    self.registry.flush()
+    self.service_mgr = ServiceManager(converter=FakeConverter(),
+                                      cache_dir=self.dir,
+                                      logger=logging.getLogger("test"),
+                                      registry=self.registry)
+    self.service_mgr.initialize()
+
+  def tearDown (self):
+    self.registry.close()
+    shutil.rmtree(self.dir)
+
+  def find (self, **filters):
+    services, cursor = self.service_mgr.find_services(**filters)
+    return [si.id for si in services], cursor
+
+  def page (self, limit, **filters):
+    """
+    :return: ids of every page
+    :rtype: list
+    """
+    pages, cursor = [], None
+    while True:
+      ids, cursor = self.find(cursor=cursor, limit=limit, **filters)
+      pages.append(ids)
+      if cursor is None:
+        return pages
+
+  def test_filters (self):
+    self.assertEqual(self.find(), (self.ids, None))
+    self.assertEqual(self.find(status=START), (self.ids[1::2], None))
+    self.assertEqual(self.find(ns_id="ns-1"), (self.ids[1::3], None))
+    self.assertEqual(self.find(status=START, ns_id="ns-1"),
+                     (self.ids[1::6], None))
+    self.assertEqual(self.find(status="unknown"), ([], None))
+    since = parse_timestamp((BASE + datetime.timedelta(minutes=20))
+                            .isoformat())
+    self.assertEqual(self.find(updated_since=since), (self.ids[20:], None))
+    self.assertEqual(self.find(updated_since=since, status=START,
+                               ns_id="ns-0"), (["si-21", "si-27"], None))
+    self.assertEqual(self.find(updated_since=since - 30), (self.ids[20:],
+                                                           None))
+
+  def test_paging (self):
+    pages = self.page(limit=4, status=START)
+    self.assertEqual([len(ids) for ids in pages], [4, 4, 4, 3])
+    self.assertEqual(sum(pages, []), self.ids[1::2])
+    # The last full page has no next cursor
+    self.assertEqual([len(ids) for ids in self.page(limit=5, status=START)],
+                     [5, 5, 5])
+    since = parse_timestamp((BASE + datetime.timedelta(minutes=10))
+                            .isoformat())
+    self.assertEqual(self.page(limit=7, ns_id="ns-2", updated_since=since),
+                     [["si-11", "si-14", "si-17", "si-20", "si-23", "si-26",
+                       "si-29"]])
+    ids, cursor = self.find(status=START, limit=2)
+    self.assertEqual(self.find(status=START, ns_id="ns-0", cursor=cursor),
+                     (["si-09", "si-15", "si-21", "si-27"], None))
+
+  def test_status_change (self):
+    start = time.time()
+    self.service_mgr.set_service_status(id="si-03", status=STOPPED)
+    self.assertNotIn("si-03", self.find(status=START)[0])
+    self.assertIn("si-03", self.find(status=STOPPED)[0])
+    self.assertEqual(self.find(updated_since=start - 1), (["si-03"], None))
+
+  def test_removed_between_pages (self):
+    ids, cursor = self.find(status=START, limit=5)
+    self.service_mgr.remove_service_instance(id=ids[0])
+    self.service_mgr.remove_service_instance(id="si-13")
+    ids, cursor = self.find(status=START, limit=5, cursor=cursor)
+    self.assertEqual(ids, ["si-11", "si-15", "si-17", "si-19", "si-21"])
+    self.assertEqual(sum(self.page(limit=4, status=START), []),
+                     [id for id in self.ids[1::2]
+                      if id not in ("si-01", "si-13")])
+
+  def test_concurrent_removal (self):
+    def remove ():
+      for id in self.ids:
+        self.service_mgr.remove_service_instance(id=id)
+
+    remover = threading.Thread(target=remove)
+    remover.start()
+    while remover.is_alive():
+      for filters in ({}, {"status": START}, {"ns_id": "ns-1"}):
+        ids = sum(self.page(limit=3, **filters), [])
+        # Every listed instance is listed once in creation order
+        self.assertEqual(ids, sorted(set(ids)))
+    remover.join()
+    self.assertEqual(self.find(), ([], None))
+    self.assertEqual(self.find(status=START), ([], None))
+
+
+class RestoreTest(unittest.TestCase):
+
+  def setUp (self):
+    self.dir = tempfile.mkdtemp()
+    self.registry = ServiceRegistry(path=os.path.join(self.dir, "test.db"))
+    self.registry.open()
+
+  def tearDown (self):
+    self.registry.close()
+    shutil.rmtree(self.dir)
+
+  def test_interrupted_orchestration (self):
+    for id, status in (("si-1", ServiceInstance.STATUS_INIT),
+                       ("si-2", START)):
+      self.registry.save_instance(si=ServiceInstance(service_id="ns",
+                                                     instance_id=id,
+                                                     status=status))
+    self.registry.flush()
+    service_mgr = ServiceManager(converter=FakeConverter(),
+                                 cache_dir=self.dir,
+                                 logger=logging.getLogger("test"),
+                                 registry=self.registry)
+    service_mgr.initialize()
+    self.assertEqual(service_mgr.get_service_status(id="si-1"),
+                     ServiceInstance.STATUS_ERROR)
+    self.assertEqual(service_mgr.get_service_status(id="si-2"), START)
+    self.assertEqual([si.id for si in service_mgr.find_services(
+      status=ServiceInstance.STATUS_ERROR)[0]], ["si-1"])
+    self.registry.flush()
+    self.assertEqual(sorted((data['id'], data['status']) for data in
+                            self.registry.load()[0]),
+                     [("si-1", ServiceInstance.STATUS_ERROR),
+                      ("si-2", START)])
+
+
+if __name__ == '__main__':
+  unittest.main()
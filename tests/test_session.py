@@ -0,0 +1,67 @@
+# Copyright 2017 Janos Czentye
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Tests of the pooled HTTP sessions of the remote endpoints.
+"""
+import unittest
+
+from requests import Response
+from requests.adapters import BaseAdapter
+
+from util.session import SessionManager
+
+
+class RecordingAdapter(BaseAdapter):
+  """
+  Record the timeout of the sent requests without network access.
+  """
+
+  def __init__ (self):
+    super(RecordingAdapter, self).__init__()
+    self.timeouts = []
+
+  def send (self, request, timeout=None, **kwargs):
+    self.timeouts.append(timeout)
+    response = Response()
+    response.status_code = 200
+    response.request = request
+    response.url = request.url
+    return response
+
+  def close (self):
+    pass
+
+
+class EndpointSessionTest(unittest.TestCase):
+
+  def setUp (self):
+    self.sessions = SessionManager(pool_size=1)
+    self.session = self.sessions.register(name="RO", timeout=3)
+    self.adapter = RecordingAdapter()
+    self.session.mount("http://", self.adapter)
+
+  def tearDown (self):
+    self.sessions.close()
+
+  def test_endpoint_timeout_is_default (self):
+    self.sessions.get("RO").get("http://ro/topology")
+    self.assertEqual(self.adapter.timeouts, [3])
+
+  def test_explicit_timeout_overrides_default (self):
+    self.sessions.get("RO").get("http://ro/topology", timeout=1)
+    self.assertEqual(self.adapter.timeouts, [1])
+
+
+if __name__ == '__main__':
+  unittest.main()
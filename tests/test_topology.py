@@ -0,0 +1,95 @@
+# Copyright 2017 Janos Czentye
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Tests of the cached and coalesced topology requests of the connector.
+"""
+import threading
+import unittest
+
+import connector
+from util.cache import SingleFlight, TopologyCache
+
+
+class FakeResponse(object):
+
+  def __init__ (self, text):
+    self.status_code = 200
+    self.text = text
+
+
+class BlockingSession(object):
+  """
+  Return a new topology for every request, the first one waits for release.
+  """
+
+  def __init__ (self):
+    self.requests = 0
+    self.started = threading.Event()
+    self.release = threading.Event()
+
+  def get (self, url, **kwargs):
+    self.requests += 1
+    cntr = self.requests
+    if cntr == 1:
+      self.started.set()
+      self.release.wait()
+    return FakeResponse(text="sg:topo%s:nf" % cntr)
+
+
+class FakeSessionManager(object):
+
+  def __init__ (self, session):
+    self.session = session
+
+  def get (self, name):
+    return self.session
+
+
+class TopologyViewTest(unittest.TestCase):
+
+  def setUp (self):
+    self.saved = (connector.http_sessions, connector.topology_cache,
+                  connector.ro_single_flight)
+    self.session = BlockingSession()
+    connector.http_sessions = FakeSessionManager(session=self.session)
+    connector.topology_cache = TopologyCache(ttl=60)
+    connector.ro_single_flight = SingleFlight()
+
+  def tearDown (self):
+    (connector.http_sessions, connector.topology_cache,
+     connector.ro_single_flight) = self.saved
+
+  def test_invalidated_flight_is_not_joined (self):
+    results = {}
+
+    def leader ():
+      results["leader"] = connector._get_topology_view()
+
+    t = threading.Thread(target=leader)
+    t.start()
+    self.assertTrue(self.session.started.wait(5))
+    # The RO has changed while the first request was in flight
+    connector.topology_cache.invalidate()
+    follower = connector._get_topology_view()
+    self.session.release.set()
+    t.join(5)
+    self.assertEqual(self.session.requests, 2)
+    self.assertEqual(results["leader"].id, "topo1")
+    self.assertEqual(follower.id, "topo2")
+    # The stale result of the first request is not cached
+    self.assertEqual(connector._get_topology_view().id, "topo2")
+
+
+if __name__ == '__main__':
+  unittest.main()
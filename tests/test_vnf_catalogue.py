@@ -0,0 +1,62 @@
+# Copyright 2017 Janos Czentye
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Tests of the VNFD catalogue.
+"""
+import logging
+import threading
+import unittest
+
+from conversion.vnf_catalogue import VNFCatalogue, VNFWrapper
+
+
+def create_vnfd (id, alias):
+  return VNFWrapper(raw={"id": id,
+                         "name": "vnf-%s" % id,
+                         "type": "TNOVA",
+                         "created_at": None,
+                         "modified_at": None,
+                         "vdu": [{"alias": alias}]})
+
+
+class VNFCatalogueIndexTest(unittest.TestCase):
+
+  def setUp (self):
+    self.catalogue = VNFCatalogue(logger=logging.getLogger("test"))
+
+  def test_concurrent_register (self):
+    threads = [threading.Thread(target=self.catalogue.register,
+                                args=("vnf-%s" % i,
+                                      create_vnfd(id=i % 10, alias="cache")))
+               for i in xrange(200)]
+    for t in threads:
+      t.start()
+    for t in threads:
+      t.join()
+    self.assertEqual(len(self.catalogue.get_registered_vnfs()), 200)
+    self.assertIsNotNone(self.catalogue.get_by_type("cache"))
+    for i in xrange(200):
+      self.catalogue.unregister(id="vnf-%s" % i)
+    # Every key has been removed from the indexes
+    self.assertIsNone(self.catalogue.get_by_type("cache"))
+
+  def test_override (self):
+    self.catalogue.register(id="vnf", vnfd=create_vnfd(id=1, alias="dpi"))
+    self.catalogue.register(id="vnf", vnfd=create_vnfd(id=2, alias="nat"))
+    self.assertIsNone(self.catalogue.get_by_type("dpi"))
+    self.assertEqual(self.catalogue.get_by_type("nat").id, 2)
+
+
+if __name__ == '__main__':
+  unittest.main()
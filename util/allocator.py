@@ -0,0 +1,161 @@
+# Copyright 2017 Janos Czentye
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Contains the allocator class for unique numeric ids, e.g. VLAN tags.
+"""
+import heapq
+import threading
+
+
+class IdAllocator(object):
+  """
+  Thread-safe allocator of numeric ids from the range: [start, stop).
+
+  Every allocated id belongs to an owner, so the ids of an owner can be
+  released at once. The lowest free id is allocated in O(log n), checking and
+  reserving an explicit id is O(1). Arbitrary hashable ids (e.g. non-numeric
+  ids received from other components) can be reserved as well, but only the
+  ids of the range are handed out by :meth:`allocate`.
+  """
+
+  def __init__ (self, start, stop):
+    """
+    Init.
+
+    :param start: first id of the range
+    :type start: int
+    :param stop: end of the range (exclusive)
+    :type stop: int
+    """
+    self.start = start
+    self.stop = stop
+    # Reserved id --> owner
+    self.__owners = {}
+    # Owner --> set of reserved ids
+    self.__owned = {}
+    # Every free id below the watermark is in the heap (beside stale entries
+    # which have been reserved explicitly since their release)
+    self.__released = []
+    self.__watermark = start
+    self.__lock = threading.RLock()
+
+  def __contains__ (self, item):
+    return item in self.__owners
+
+  def __len__ (self):
+    return len(self.__owners)
+
+  def __repr__ (self):
+    return "%s(range: [%s, %s), reserved: %s)" % (self.__class__.__name__,
+                                                  self.start, self.stop,
+                                                  len(self.__owners))
+
+  def owner_of (self, id):
+    """
+    :param id: reserved id
+    :return: owner of the id or None
+    """
+    return self.__owners.get(id)
+
+  def ids_of (self, owner):
+    """
+    :param owner: owner of the ids
+    :return: reserved ids of the owner
+    :rtype: set
+    """
+    with self.__lock:
+      return set(self.__owned.get(owner, ()))
+
+  def reserve (self, id, owner=None):
+    """
+    Reserve the given id if it is free.
+
+    :param id: requested id
+    :param owner: owner of the id
+    :return: the id was free and has been reserved
+    :rtype: bool
+    """
+    with self.__lock:
+      if id in self.__owners:
+        return False
+      self.__owners[id] = owner
+      self.__owned.setdefault(owner, set()).add(id)
+      return True
+
+  def allocate (self, owner=None):
+    """
+    Reserve and return with the lowest free id of the range.
+
+    :param owner: owner of the id
+    :return: allocated id or None if the range is exhausted
+    :rtype: int
+    """
+    with self.__lock:
+      while self.__released:
+        id = heapq.heappop(self.__released)
+        if self.reserve(id=id, owner=owner):
+          return id
+      while self.__watermark < self.stop:
+        id = self.__watermark
+        self.__watermark += 1
+        if self.reserve(id=id, owner=owner):
+          return id
+
+  def release (self, id):
+    """
+    Release the given id.
+
+    :param id: reserved id
+    :return: owner of the released id
+    """
+    with self.__lock:
+      if id not in self.__owners:
+        return
+      owner = self.__owners.pop(id)
+      ids = self.__owned[owner]
+      ids.discard(id)
+      if not ids:
+        del self.__owned[owner]
+      self.__recycle(id=id)
+      return owner
+
+  def release_owner (self, owner):
+    """
+    Release every id of the given owner.
+
+    :param owner: owner of the ids
+    :return: released ids
+    :rtype: set
+    """
+    with self.__lock:
+      ids = self.__owned.pop(owner, set())
+      for id in ids:
+        del self.__owners[id]
+        self.__recycle(id=id)
+      return ids
+
+  def __recycle (self, id):
+    """
+    Make a released id of the range available for :meth:`allocate`.
+    """
+    if isinstance(id, (int, long)) and self.start <= id < self.__watermark:
+      heapq.heappush(self.__released, id)
+
+  def snapshot (self):
+    """
+    :return: copy of the reserved ids with their owners
+    :rtype: dict
+    """
+    with self.__lock:
+      return dict(self.__owners)
@@ -0,0 +1,346 @@
+# Copyright 2017 Janos Czentye
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Contains caching helper classes for the communication with the RO and for
+the parsed service templates.
+"""
+import logging
+import os
+import threading
+import time
+
+log = logging.getLogger("cache")
+
+
+class CacheEntry(object):
+  """
+  Container class for a cached topology view.
+  """
+
+  def __init__ (self, raw, parsed, version):
+    """
+    Init.
+
+    :param raw: raw topology received from the RO
+    :type raw: str
+    :param parsed: parsed topology
+    :type parsed: :class:`Virtualizer` or :class:`NFFG`
+    :param version: version of the cache at the time of storing
+    :type version: int
+    """
+    self.raw = raw
+    self.parsed = parsed
+    self.version = version
+    self.timestamp = time.time()
+
+  def age (self):
+    """
+    :return: elapsed time since the entry was stored in sec
+    :rtype: float
+    """
+    return time.time() - self.timestamp
+
+
+class TopologyCache(object):
+  """
+  Thread-safe cache of the topology views requested from the RO.
+
+  Entries are stored per RPC name and expire after `ttl` seconds. Every stored
+  topology increases the version of the cache.
+  """
+  DEFAULT_TTL = 5.0
+
+  def __init__ (self, ttl=DEFAULT_TTL):
+    """
+    Init.
+
+    :param ttl: time-to-live of the entries in sec, 0 disables caching
+    :type ttl: float
+    """
+    self.ttl = float(ttl)
+    self.version = 0
+    self.hits = 0
+    self.misses = 0
+    self.__entries = {}
+    self.__generation = 0
+    self.__lock = threading.Lock()
+
+  @property
+  def generation (self):
+    """
+    Counter of invalidations. Capture it before requesting a topology to avoid
+    storing a response which has been outdated by an invalidation meanwhile.
+
+    :return: invalidation counter
+    :rtype: int
+    """
+    return self.__generation
+
+  def get (self, rpc):
+    """
+    Return with the cached entry of the given RPC if it is not expired.
+
+    :param rpc: RPC name
+    :type rpc: str
+    :return: cached entry or None
+    :rtype: CacheEntry
+    """
+    with self.__lock:
+      entry = self.__entries.get(rpc)
+      if entry is not None and entry.age() < self.ttl:
+        self.hits += 1
+        return entry
+      self.misses += 1
+
+  def peek (self, rpc):
+    """
+    Return with the not expired entry of the given RPC without counting a
+    lookup.
+
+    :param rpc: RPC name
+    :type rpc: str
+    :return: cached entry or None
+    :rtype: CacheEntry
+    """
+    entry = self.__entries.get(rpc)
+    if entry is not None and entry.age() < self.ttl:
+      return entry
+
+  def is_fresh (self, rpc):
+    """
+    Return True if the RPC has a not expired entry without counting a lookup.
+
+    :param rpc: RPC name
+    :type rpc: str
+    :return: entry is valid
+    :rtype: bool
+    """
+    return self.peek(rpc=rpc) is not None
+
+  def update (self, rpc, raw, parsed, generation=None):
+    """
+    Store the received topology of the given RPC. The topology is not cached
+    if the cache has been invalidated since the given `generation`.
+
+    :param rpc: RPC name
+    :type rpc: str
+    :param raw: raw topology
+    :type raw: str
+    :param parsed: parsed topology
+    :type parsed: :class:`Virtualizer` or :class:`NFFG`
+    :param generation: generation captured before the request (optional)
+    :type generation: int
+    :return: stored entry
+    :rtype: CacheEntry
+    """
+    with self.__lock:
+      self.version += 1
+      entry = CacheEntry(raw=raw, parsed=parsed, version=self.version)
+      if self.ttl > 0 and (generation is None or
+                           generation == self.__generation):
+        self.__entries[rpc] = entry
+      return entry
+
+  def invalidate (self, rpc=None):
+    """
+    Drop the entry of the given RPC or every entry if `rpc` is not given.
+
+    :param rpc: RPC name (optional)
+    :type rpc: str
+    :return: None
+    """
+    with self.__lock:
+      self.__generation += 1
+      if rpc is None:
+        self.__entries.clear()
+      else:
+        self.__entries.pop(rpc, None)
+    log.debug("Topology cache has been invalidated (rpc: %s)" % rpc)
+
+  def stats (self):
+    """
+    :return: counters of the cache
+    :rtype: dict
+    """
+    lookups = self.hits + self.misses
+    return {"version": self.version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": float(self.hits) / lookups if lookups else 0.0}
+
+
+class InFlightCall(object):
+  """
+  Container class for a call shared by concurrent callers.
+  """
+
+  def __init__ (self):
+    self.done = threading.Event()
+    self.result = None
+    self.error = None
+
+
+class SingleFlight(object):
+  """
+  Coalesce concurrent calls with identical key into one execution.
+
+  The first caller of a key executes the given function, the callers arriving
+  meanwhile wait for it and get the same result.
+  """
+
+  def __init__ (self):
+    self.executed = 0
+    self.deduplicated = 0
+    self.__calls = {}
+    self.__lock = threading.Lock()
+
+  def do (self, key, func, *args, **kwargs):
+    """
+    Execute the function or wait for the in-flight execution of the same key.
+
+    :param key: hashable key of the call, e.g. the RPC name
+    :param func: called function
+    :type func: callable
+    :return: result of the function
+    """
+    with self.__lock:
+      call = self.__calls.get(key)
+      if call is None:
+        call = self.__calls[key] = InFlightCall()
+        self.executed += 1
+        leader = True
+      else:
+        self.deduplicated += 1
+        leader = False
+    if not leader:
+      log.debug("Waiting for in-flight call with key: %s" % str(key)[:64])
+      call.done.wait()
+      if call.error is not None:
+        raise call.error
+      return call.result
+    try:
+      call.result = func(*args, **kwargs)
+      return call.result
+    except Exception as e:
+      call.error = e
+      raise
+    finally:
+      with self.__lock:
+        del self.__calls[key]
+      call.done.set()
+
+  def stats (self):
+    """
+    :return: counters of the coalesced calls
+    :rtype: dict
+    """
+    return {"executed": self.executed,
+            "deduplicated": self.deduplicated}
+
+
+class TemplateCache(object):
+  """
+  Thread-safe cache of parsed templates stored in files, e.g. service NFFGs.
+
+  Entries are keyed by an id and validated with the fingerprint (mtime, size)
+  of the origin file. Every lookup returns with a private clone of the parsed
+  template made by the `cloner`, so the cached object is never modified by
+  the callers.
+  """
+
+  def __init__ (self, loader, cloner=None):
+    """
+    Init.
+
+    :param loader: function which parses the template from the given path
+    :type loader: callable
+    :param cloner: function which returns a private clone of the given parsed
+      template, default: the copy() method of the template
+    :type cloner: callable
+    """
+    self.loader = loader
+    self.cloner = cloner if cloner is not None else lambda t: t.copy()
+    self.hits = 0
+    self.misses = 0
+    # Key --> (path, fingerprint, parsed template)
+    self.__entries = {}
+    self.__lock = threading.Lock()
+
+  @staticmethod
+  def _fingerprint (path):
+    """
+    :param path: file path
+    :type path: str
+    :return: modification time and size of the file
+    :rtype: tuple
+    """
+    try:
+      stat = os.stat(path)
+    except OSError as e:
+      raise IOError(e.errno, e.strerror, path)
+    return stat.st_mtime, stat.st_size
+
+  def get (self, key, path):
+    """
+    Return with a clone of the template stored in the given file. The file is
+    parsed only if it is not cached yet or it has been changed since.
+
+    :param key: id of the template
+    :type key: str
+    :param path: path of the template file
+    :type path: str
+    :raise: :any:`exceptions.IOError` if the file is missing
+    :return: private clone of the parsed template
+    """
+    fingerprint = self._fingerprint(path=path)
+    with self.__lock:
+      entry = self.__entries.get(key)
+    if entry is not None and entry[:2] == (path, fingerprint):
+      with self.__lock:
+        self.hits += 1
+      return self.cloner(entry[2])
+    else:
+      with self.__lock:
+        self.misses += 1
+      parsed = self.loader(path)
+      with self.__lock:
+        self.__entries[key] = (path, fingerprint, parsed)
+      return self.cloner(parsed)
+
+  def invalidate (self, key=None):
+    """
+    Drop the template of the given key or every template if `key` is not
+    given.
+
+    :param key: id of the template (optional)
+    :type key: str
+    :return: None
+    """
+    with self.__lock:
+      if key is None:
+        self.__entries.clear()
+      else:
+        self.__entries.pop(key, None)
+    log.debug("Template cache has been invalidated (key: %s)" % key)
+
+  def stats (self):
+    """
+    :return: counters of the cache
+    :rtype: dict
+    """
+    lookups = self.hits + self.misses
+    return {"templates": len(self.__entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": float(self.hits) / lookups if lookups else 0.0}
@@ -112,3 +112,31 @@ def setup_flask_logging (app, log_file=LOG_FILE):
   app.logger.propagate = False
   app.logger.setLevel(log.getEffectiveLevel())
   return log
+
+
+class lazy(object):
+  """
+  Log message argument which is rendered only if the message is emitted.
+
+  Usage:
+
+    log.log(VERBOSE, "Received topology:\\n%s", lazy(topo.xml))
+    log.debug("Parsed body:\\n%s", lazy(pprint.pformat, data))
+  """
+  __slots__ = ('func', 'args', 'kwargs')
+
+  def __init__ (self, func, *args, **kwargs):
+    """
+    Init.
+
+    :param func: function which renders the argument
+    :type func: callable
+    :return: None
+    """
+    self.func = func
+    self.args = args
+    self.kwargs = kwargs
+
+  def __str__ (self):
+    value = self.func(*self.args, **self.kwargs)
+    return value.encode('utf-8') if isinstance(value, unicode) else str(value)
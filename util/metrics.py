@@ -0,0 +1,331 @@
+# Copyright 2017 Janos Czentye
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Contains minimal metric classes exported in the Prometheus text format.
+"""
+import bisect
+import threading
+import time
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape (value):
+  """
+  :param value: label value
+  :return: escaped label value
+  :rtype: str
+  """
+  return str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"',
+                                                                      r'\"')
+
+
+def _format_value (value):
+  """
+  :param value: sample value
+  :type value: float
+  :return: formatted sample value
+  :rtype: str
+  """
+  if value == float("inf"):
+    return "+Inf"
+  return repr(float(value))
+
+
+class Metric(object):
+  """
+  Base class of the metrics with optional labels.
+
+  The values are updated explicitly or collected by a function at exposition.
+  """
+  TYPE = None
+
+  def __init__ (self, name, help, labels=(), collect=None):
+    """
+    Init.
+
+    :param name: metric name
+    :type name: str
+    :param help: description of the metric
+    :type help: str
+    :param labels: label names
+    :type labels: tuple
+    :param collect: function which returns with the current value or with a
+      dict of label values --> value if the metric has labels, the label values
+      of a metric with only one label can be given without tuple (optional)
+    :type collect: callable
+    """
+    self.name = name
+    self.help = help
+    self.labels = tuple(labels)
+    self.collect = collect
+    # Label values --> value of the child
+    self._values = {}
+    self._lock = threading.Lock()
+
+  def _key (self, labels):
+    """
+    :param labels: label values
+    :type labels: dict
+    :return: label values in the order of the label names
+    :rtype: tuple
+    """
+    try:
+      return tuple(str(labels[l]) for l in self.labels)
+    except KeyError as e:
+      raise ValueError("Missing label: %s of metric: %s" % (e, self.name))
+
+  def _format_labels (self, key, extra=()):
+    """
+    :param key: label values
+    :type key: tuple
+    :param extra: additional (name, value) pairs
+    :type extra: tuple
+    :return: formatted label set
+    :rtype: str
+    """
+    pairs = zip(self.labels, key) + list(extra)
+    if not pairs:
+      return ""
+    return "{%s}" % ",".join('%s="%s"' % (n, _escape(v)) for n, v in pairs)
+
+  def samples (self):
+    """
+    :return: samples of the metric as (name suffix, label set, value)
+    :rtype: list
+    """
+    if self.collect is not None:
+      values = self.collect()
+      if not self.labels:
+        values = {(): values}
+      with self._lock:
+        self._values = {tuple(map(str, k if isinstance(k, tuple) else (k,))):
+                          v for k, v in values.iteritems()}
+    with self._lock:
+      return [("", self._format_labels(key), value)
+              for key, value in sorted(self._values.iteritems())]
+
+  def expose (self):
+    """
+    :return: metric in Prometheus text format
+    :rtype: str
+    """
+    lines = ["# HELP %s %s" % (self.name, self.help),
+             "# TYPE %s %s" % (self.name, self.TYPE)]
+    for suffix, labels, value in self.samples():
+      lines.append("%s%s%s %s" % (self.name, suffix, labels,
+                                  _format_value(value)))
+    return "\n".join(lines)
+
+
+class Counter(Metric):
+  """
+  Monotonically increasing counter which is increased explicitly or collected
+  from a monotonic source at exposition.
+  """
+  TYPE = "counter"
+
+  def inc (self, amount=1, **labels):
+    key = self._key(labels)
+    with self._lock:
+      self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+  """
+  Gauge which is set explicitly or collected by a function at exposition.
+  """
+  TYPE = "gauge"
+
+  def set (self, value, **labels):
+    key = self._key(labels)
+    with self._lock:
+      self._values[key] = value
+
+
+class Histogram(Metric):
+  """
+  Histogram of observed values, e.g. latencies in sec.
+  """
+  TYPE = "histogram"
+  DEFAULT_BUCKETS = (.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30)
+
+  def __init__ (self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+    """
+    Init.
+
+    :param buckets: upper bounds of the buckets
+    :type buckets: tuple
+    """
+    super(Histogram, self).__init__(name=name, help=help, labels=labels)
+    self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+  def observe (self, value, **labels):
+    key = self._key(labels)
+    with self._lock:
+      if key not in self._values:
+        # Bucket counters, sum, count
+        self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+      child = self._values[key]
+      child[0][bisect.bisect_left(self.buckets, value)] += 1
+      child[1] += value
+      child[2] += 1
+
+  def time (self, **labels):
+    """
+    :return: context manager which observes the duration of its block
+    :rtype: Timer
+    """
+    return Timer(callback=lambda elapsed: self.observe(elapsed, **labels))
+
+  def samples (self):
+    samples = []
+    with self._lock:
+      for key, (counts, total, count) in sorted(self._values.iteritems()):
+        cumulative = 0
+        for bound, cnt in zip(self.buckets, counts):
+          cumulative += cnt
+          samples.append(("_bucket",
+                          self._format_labels(key, (("le",
+                                                     _format_value(bound)),)),
+                          cumulative))
+        samples.append(("_sum", self._format_labels(key), total))
+        samples.append(("_count", self._format_labels(key), count))
+    return samples
+
+
+class Timer(object):
+  """
+  Context manager which measures the duration of its block.
+  """
+
+  def __init__ (self, callback=None):
+    """
+    Init.
+
+    :param callback: called with the elapsed time in sec (optional)
+    :type callback: callable
+    """
+    self.callback = callback
+    self.start = None
+    self.elapsed = None
+
+  def __enter__ (self):
+    self.start = time.time()
+    return self
+
+  def __exit__ (self, exc_type, exc_val, exc_tb):
+    self.elapsed = time.time() - self.start
+    if self.callback is not None:
+      self.callback(self.elapsed)
+
+
+class PhaseTimer(object):
+  """
+  Record the wall time of the named phases of one request.
+  """
+
+  def __init__ (self):
+    self.started = time.time()
+    # (phase name, elapsed time in sec) in the order of completion
+    self.phases = []
+
+  def phase (self, name):
+    """
+    :param name: phase name
+    :type name: str
+    :return: context manager which records the duration of its block
+    :rtype: Timer
+    """
+    return Timer(callback=lambda elapsed: self.phases.append((name, elapsed)))
+
+  def total (self):
+    """
+    :return: elapsed time since the creation of the timer in sec
+    :rtype: float
+    """
+    return time.time() - self.started
+
+  def server_timing (self):
+    """
+    :return: recorded phases as a Server-Timing header value
+    :rtype: str
+    """
+    return ", ".join("%s;dur=%.3f" % (name, elapsed * 1000)
+                     for name, elapsed in
+                     self.phases + [("total", self.total())])
+
+  def get_json (self):
+    """
+    :return: recorded phases in ms
+    :rtype: dict
+    """
+    return {"phases": [{"name": name, "duration_ms": elapsed * 1000}
+                       for name, elapsed in self.phases],
+            "total_ms": self.total() * 1000}
+
+
+class MetricsRegistry(object):
+  """
+  Container class for the exported metrics.
+  """
+
+  def __init__ (self):
+    self.__metrics = []
+    self.__lock = threading.Lock()
+
+  def register (self, metric):
+    """
+    :param metric: exported metric
+    :type metric: Metric
+    :return: the registered metric
+    :rtype: Metric
+    """
+    with self.__lock:
+      self.__metrics.append(metric)
+    return metric
+
+  def counter (self, name, help, labels=(), collect=None):
+    return self.register(Counter(name=name, help=help, labels=labels,
+                                 collect=collect))
+
+  def gauge (self, name, help, labels=(), collect=None):
+    return self.register(Gauge(name=name, help=help, labels=labels,
+                               collect=collect))
+
+  def histogram (self, name, help, labels=(),
+                 buckets=Histogram.DEFAULT_BUCKETS):
+    return self.register(Histogram(name=name, help=help, labels=labels,
+                                   buckets=buckets))
+
+  def __getitem__ (self, name):
+    """
+    :param name: metric name
+    :type name: str
+    :return: registered metric with the given name
+    :rtype: Metric
+    """
+    for metric in self.__metrics:
+      if metric.name == name:
+        return metric
+    raise KeyError(name)
+
+  def expose (self):
+    """
+    :return: every metric in Prometheus text format
+    :rtype: str
+    """
+    with self.__lock:
+      metrics = list(self.__metrics)
+    return "\n".join(m.expose() for m in metrics) + "\n"
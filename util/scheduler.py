@@ -0,0 +1,165 @@
+# Copyright 2017 Janos Czentye
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Contains the scheduler used for delayed function calls, e.g. callback timeouts.
+"""
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+log = logging.getLogger("scheduler")
+
+
+class ScheduledTask(object):
+  """
+  Container class for a delayed function call.
+  """
+
+  def __init__ (self, delay, func, kwargs=None):
+    """
+    Init.
+
+    :param delay: delay of the call in sec
+    :type delay: float
+    :param func: called function
+    :type func: callable
+    :param kwargs: keyword arguments of the call
+    :type kwargs: dict
+    """
+    self.interval = float(delay)
+    self.deadline = time.time() + self.interval
+    self.func = func
+    self.kwargs = kwargs if kwargs is not None else {}
+    self.cancelled = False
+    # Set when the task is taken out of the scheduler for execution
+    self.done = False
+
+  def __repr__ (self):
+    return "%s(func: %s, interval: %s, cancelled: %s)" % (
+      self.__class__.__name__, getattr(self.func, '__name__', self.func),
+      self.interval, self.cancelled)
+
+
+class Scheduler(threading.Thread):
+  """
+  Execute delayed function calls in one common thread.
+
+  The pending tasks are stored in a heap ordered by their deadline, so
+  scheduling is O(log n). Cancelled tasks are only marked and dropped when they
+  reach the top of the heap or when they make up the majority of the heap, so
+  cancellation is O(log n) amortized. The scheduled functions are called in the
+  scheduler thread, so they should return quickly.
+  """
+
+  # Minimum heap size for dropping the cancelled tasks at once
+  COMPACT_THRESHOLD = 64
+
+  def __init__ (self, name=None):
+    """
+    Init.
+
+    :param name: name of the scheduler thread (optional)
+    :type name: str
+    """
+    threading.Thread.__init__(self, name=name or self.__class__.__name__)
+    self.daemon = True
+    # (deadline, sequence number, ScheduledTask)
+    self.__tasks = []
+    self.__counter = itertools.count()
+    self.__cancelled = 0
+    self.__cond = threading.Condition()
+    self.__running = True
+
+  def __len__ (self):
+    return len(self.__tasks)
+
+  def schedule (self, delay, func, **kwargs):
+    """
+    Call the given function with the keyword arguments after `delay` sec.
+
+    :param delay: delay in sec
+    :type delay: float
+    :param func: called function
+    :type func: callable
+    :return: scheduled task which can be cancelled
+    :rtype: ScheduledTask
+    """
+    task = ScheduledTask(delay=delay, func=func, kwargs=kwargs)
+    with self.__cond:
+      if not self.is_alive() and self.__running:
+        self.start()
+      heapq.heappush(self.__tasks,
+                     (task.deadline, next(self.__counter), task))
+      # Wake up the scheduler only if the new task is the next one to run
+      if self.__tasks[0][2] is task:
+        self.__cond.notify()
+    return task
+
+  def cancel (self, task):
+    """
+    Cancel the given task if it has not run yet.
+
+    :param task: scheduled task
+    :type task: ScheduledTask
+    :return: None
+    """
+    with self.__cond:
+      if task.cancelled or task.done:
+        return
+      task.cancelled = True
+      self.__cancelled += 1
+      if self.__cancelled > max(self.COMPACT_THRESHOLD, len(self.__tasks) / 2):
+        self.__tasks = [t for t in self.__tasks if not t[2].cancelled]
+        heapq.heapify(self.__tasks)
+        self.__cancelled = 0
+
+  def run (self):
+    log.debug("Start %s" % self.name)
+    while True:
+      with self.__cond:
+        while self.__running:
+          # Drop the cancelled tasks from the top of the heap
+          while self.__tasks and self.__tasks[0][2].cancelled:
+            heapq.heappop(self.__tasks)
+            self.__cancelled -= 1
+          if not self.__tasks:
+            self.__cond.wait()
+            continue
+          remaining = self.__tasks[0][0] - time.time()
+          if remaining <= 0:
+            break
+          self.__cond.wait(timeout=remaining)
+        if not self.__running:
+          break
+        task = heapq.heappop(self.__tasks)[2]
+        task.done = True
+      try:
+        task.func(**task.kwargs)
+      except Exception:
+        log.exception("Got exception in scheduled task: %s" % task)
+    log.debug("%s has been stopped" % self.name)
+
+  def stop (self):
+    """
+    Stop the scheduler thread and drop the pending tasks.
+
+    :return: None
+    """
+    with self.__cond:
+      self.__running = False
+      del self.__tasks[:]
+      self.__cancelled = 0
+      self.__cond.notify()
@@ -0,0 +1,90 @@
+# Copyright 2017 Janos Czentye
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Contains the WSGI server used for serving the REST-API concurrently.
+"""
+import logging
+from multiprocessing.pool import ThreadPool
+
+from werkzeug.serving import BaseWSGIServer
+
+log = logging.getLogger("server")
+
+
+class PooledWSGIServer(BaseWSGIServer):
+  """
+  WSGI server which dispatches the accepted requests to a fixed-size pool of
+  worker threads.
+
+  Unlike the thread-per-request model of the Flask development server the
+  number of concurrently served requests is bounded, so a burst of slow
+  requests can not exhaust the resources of the connector.
+  """
+  multithread = True
+  DEFAULT_WORKERS = 16
+
+  def __init__ (self, host, port, app, workers=DEFAULT_WORKERS, **kwargs):
+    """
+    Init.
+
+    :param host: listening address
+    :type host: str
+    :param port: listening port
+    :type port: int
+    :param app: served WSGI application
+    :type app: :class:`flask.Flask`
+    :param workers: number of worker threads
+    :type workers: int
+    :return: None
+    """
+    BaseWSGIServer.__init__(self, host, port, app, **kwargs)
+    self.workers = workers if workers > 0 else self.DEFAULT_WORKERS
+    self.__pool = ThreadPool(processes=self.workers)
+
+  def process_request (self, request, client_address):
+    """
+    Hand over the accepted request to a worker thread.
+
+    :param request: accepted socket
+    :param client_address: client address
+    :return: None
+    """
+    self.__pool.apply_async(self.__process_request_worker,
+                            args=(request, client_address))
+
+  def __process_request_worker (self, request, client_address):
+    """
+    Serve the given request in the context of a worker thread.
+
+    :param request: accepted socket
+    :param client_address: client address
+    :return: None
+    """
+    try:
+      self.finish_request(request, client_address)
+    except Exception:
+      self.handle_error(request, client_address)
+    finally:
+      self.shutdown_request(request)
+
+  def server_close (self):
+    """
+    Stop the worker threads beside closing the listening socket.
+
+    :return: None
+    """
+    BaseWSGIServer.server_close(self)
+    self.__pool.terminate()
+    log.debug("Worker pool of %s has been terminated"
+              % self.__class__.__name__)
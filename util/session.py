@@ -0,0 +1,167 @@
+# Copyright 2017 Janos Czentye
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Contains pooled HTTP sessions for the outbound communication.
+"""
+import logging
+import threading
+import time
+
+from requests import Session
+from requests.adapters import HTTPAdapter
+
+log = logging.getLogger("http")
+
+
+class EndpointSession(Session):
+  """
+  Keep-alive HTTP session with a bounded connection pool dedicated to one
+  remote integration endpoint.
+  """
+
+  def __init__ (self, name, pool_size, timeout=None, observer=None):
+    """
+    Init.
+
+    :param name: endpoint name
+    :type name: str
+    :param pool_size: max number of kept connections per remote host
+    :type pool_size: int
+    :param timeout: default timeout of the requests in sec (optional)
+    :type timeout: float
+    :param observer: called after every request with the keyword arguments:
+      endpoint, method, url, status and elapsed (optional)
+    :type observer: callable
+    """
+    super(EndpointSession, self).__init__()
+    self.name = name
+    self.timeout = timeout
+    self.observer = observer
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    self.mount("http://", adapter)
+    self.mount("https://", adapter)
+
+  def request (self, method, url, **kwargs):
+    """
+    Override to apply the default timeout of the endpoint.
+    """
+    if kwargs.get('timeout') is None:
+      kwargs['timeout'] = self.timeout
+    if self.observer is None:
+      return super(EndpointSession, self).request(method, url, **kwargs)
+    start = time.time()
+    status = "error"
+    try:
+      response = super(EndpointSession, self).request(method, url, **kwargs)
+      status = response.status_code
+      return response
+    finally:
+      try:
+        self.observer(endpoint=self.name, method=method, url=url,
+                      status=status, elapsed=time.time() - start)
+      except Exception:
+        log.exception("Got exception in observer of endpoint: %s" % self.name)
+
+  def stats (self):
+    """
+    Collect the connection usage of the session.
+
+    :return: number of sent requests, opened and reused connections
+    :rtype: dict
+    """
+    sent, opened = 0, 0
+    for adapter in set(self.adapters.itervalues()):
+      pools = adapter.poolmanager.pools
+      for key in pools.keys():
+        try:
+          pool = pools[key]
+        except KeyError:
+          # Pool has been evicted meanwhile
+          continue
+        sent += pool.num_requests
+        opened += pool.num_connections
+    return {"requests": sent,
+            "connections": opened,
+            "reused": max(sent - opened, 0)}
+
+
+class SessionManager(object):
+  """
+  Container class for the endpoint sessions.
+  """
+  DEFAULT_POOL_SIZE = 10
+
+  def __init__ (self, pool_size=DEFAULT_POOL_SIZE, observer=None):
+    """
+    Init.
+
+    :param pool_size: max number of kept connections per remote host
+    :type pool_size: int
+    :param observer: request observer of the sessions (optional)
+    :type observer: callable
+    """
+    self.pool_size = pool_size
+    self.observer = observer
+    self.__sessions = {}
+    self.__lock = threading.Lock()
+
+  def register (self, name, timeout=None):
+    """
+    Create the session of the given endpoint if it does not exist.
+
+    :param name: endpoint name
+    :type name: str
+    :param timeout: default timeout of the requests in sec (optional)
+    :type timeout: float
+    :return: session of the endpoint
+    :rtype: EndpointSession
+    """
+    with self.__lock:
+      if name not in self.__sessions:
+        log.debug("Create HTTP session for endpoint: %s (pool size: %s, "
+                  "timeout: %s)" % (name, self.pool_size, timeout))
+        self.__sessions[name] = EndpointSession(name=name,
+                                                pool_size=self.pool_size,
+                                                timeout=timeout,
+                                                observer=self.observer)
+      return self.__sessions[name]
+
+  def get (self, name):
+    """
+    Return with the session of the given endpoint.
+
+    :param name: endpoint name
+    :type name: str
+    :return: session of the endpoint
+    :rtype: EndpointSession
+    """
+    session = self.__sessions.get(name)
+    return session if session is not None else self.register(name=name)
+
+  def stats (self):
+    """
+    :return: connection usage per endpoint
+    :rtype: dict
+    """
+    return {name: session.stats()
+            for name, session in self.__sessions.items()}
+
+  def close (self):
+    """
+    Close the connections of every session.
+
+    :return: None
+    """
+    for session in self.__sessions.values():
+      session.close()
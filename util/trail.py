@@ -14,8 +14,12 @@
 """
 Contains functions and classes for remote visualization.
 """
+import Queue
+import atexit
+import gzip
 import os
 import shutil
+import tarfile
 import threading
 import time
 
@@ -44,21 +48,137 @@ class Singleton(type):
 
 
 class MessageDumper(object):
+  """
+  Dump the exchanged messages into trail files.
+
+  The files are written by a background thread in batches, so the request
+  path only enqueues the data. If the bounded queue is full the message is
+  dropped instead of blocking the caller.
+
+  The trails are written into segment directories. A new segment is started
+  when the current one reaches SEGMENT_FILES or SEGMENT_SIZE. A background
+  task rotates out the oldest segments if the trails exceed MAX_SIZE or
+  MAX_FILES or a segment is older than MAX_AGE. Rotated segments are deleted
+  or, if ARCHIVE is set, compressed into a tar.gz archive first.
+
+  Trails are dumped per category (the `unique` name of the message). The
+  categories in DISABLED are not dumped, a category in SAMPLING is dumped only
+  once in every N messages and payloads larger than MAX_PAYLOAD are truncated.
+  Use :meth:`configure` to set the filtering and the retention parameters.
+  """
   __metaclass__ = Singleton
   DIR = "log/trails/"
+  QUEUE_SIZE = 1000  # max number of messages waiting for writing
+  BATCH_SIZE = 50  # max number of messages written in one round
+  COMPRESS_THRESHOLD = 1024 * 1024  # gzip larger payloads, 0 means disabled
+  # Retention parameters, 0 means no limit
+  SEGMENT_FILES = 1000  # max number of files in one segment
+  SEGMENT_SIZE = 64 * 1024 * 1024  # max size of one segment in bytes
+  MAX_FILES = 20000  # max number of trail files
+  MAX_SIZE = 512 * 1024 * 1024  # max total size of the trails in bytes
+  MAX_AGE = 7 * 24 * 3600  # max age of the segments and archives in sec
+  ARCHIVE = False  # compress rotated segments instead of deleting them
+  MAX_ARCHIVES = 10  # max number of kept archives
+  ARCHIVE_EXT = ".tar.gz"
+  RETENTION_INTERVAL = 60  # period of retention checks in sec
+  # Filtering parameters
+  DISABLED = frozenset()  # categories which are not dumped
+  SAMPLING = {}  # category --> dump 1 in every N messages
+  MAX_PAYLOAD = 0  # truncate larger payloads in bytes, 0 means no limit
   __lock = threading.Lock()
 
   def __init__ (self):
     self.__cntr = 0
-    self.__clear_trails()
+    self.dropped = 0
+    self.written = 0
+    self.compressed = 0
+    self.rotated = 0
+    self.skipped = 0
+    self.truncated = 0
+    # Category --> number of received messages
+    self.__sampling_cntrs = {}
+    self.__queue = Queue.Queue(maxsize=self.QUEUE_SIZE)
     self.__init()
+    self.__writer = threading.Thread(target=self.__write_trails,
+                                     name="TrailWriter")
+    self.__writer.daemon = True
+    self.__writer.start()
+    self.__stopped = threading.Event()
+    self.__retention = threading.Thread(target=self.__run_retention,
+                                        name="TrailRetention")
+    self.__retention.daemon = True
+    self.__retention.start()
+    # Write the queued trails before the interpreter tears down the modules
+    atexit.register(self.shutdown)
+
+  @classmethod
+  def configure (cls, disabled=None, sampling=None, max_payload=None,
+                 max_files=None, max_size=None, max_age=None, archive=None):
+    """
+    Set the filtering and the retention parameters of the dumped trails.
+
+    :param disabled: categories which are not dumped (optional)
+    :type disabled: list
+    :param sampling: dump 1 in every N messages of the categories (optional)
+    :type sampling: dict
+    :param max_payload: truncate larger payloads in bytes (optional)
+    :type max_payload: int
+    :param max_files: max number of trail files, 0 means no limit (optional)
+    :type max_files: int
+    :param max_size: max total size of the trails in bytes, 0 means no limit
+      (optional)
+    :type max_size: int
+    :param max_age: max age of the segments and archives in sec, 0 means no
+      limit (optional)
+    :type max_age: float
+    :param archive: compress rotated segments instead of deleting them
+      (optional)
+    :type archive: bool
+    :return: None
+    """
+    if disabled is not None:
+      cls.DISABLED = frozenset(disabled)
+    if sampling is not None:
+      cls.SAMPLING = dict(sampling)
+    if max_payload is not None:
+      cls.MAX_PAYLOAD = max_payload
+    if max_files is not None:
+      cls.MAX_FILES = max_files
+    if max_size is not None:
+      cls.MAX_SIZE = max_size
+    if max_age is not None:
+      cls.MAX_AGE = max_age
+    if archive is not None:
+      cls.ARCHIVE = archive
+    log.debug("Trail filtering: disabled: %s, sampling: %s, max payload: %s"
+              % (sorted(cls.DISABLED), cls.SAMPLING, cls.MAX_PAYLOAD))
+    log.debug("Trail retention: max files: %s, max size: %s, max age: %s, "
+              "archive: %s" % (cls.MAX_FILES, cls.MAX_SIZE, cls.MAX_AGE,
+                               cls.ARCHIVE))
 
   @wrapt.synchronized(__lock)
   def increase_cntr (self):
     self.__cntr += 1
     return self.__cntr
 
+  @wrapt.synchronized(__lock)
+  def is_sampled (self, unique):
+    """
+    :param unique: category of the message
+    :type unique: str
+    :return: the message of the category should be dumped
+    :rtype: bool
+    """
+    rate = self.SAMPLING.get(unique)
+    if not rate or rate <= 1:
+      return True
+    cntr = self.__sampling_cntrs.get(unique, 0)
+    self.__sampling_cntrs[unique] = cntr + 1
+    return cntr % rate == 0
+
   def __init (self):
+    self.__segment_files = 0
+    self.__segment_size = 0
     self.log_dir = self.DIR + time.strftime("%Y%m%d%H%M%S")
     for i in xrange(1, 10):
       if not os.path.exists(os.path.join(PROJECT_ROOT, self.log_dir)):
@@ -69,29 +189,244 @@ class MessageDumper(object):
     else:
       log.warning("Log dir: %s has already exist for given timestamp prefix!")
 
-  def __clear_trails (self):
-    log.debug("Remove trails...")
-    try:
-      for f in os.listdir(os.path.join(PROJECT_ROOT, self.DIR)):
-        if f != ".placeholder" and not f.startswith(time.strftime("%Y%m%d")):
-          # os.remove(os.path.join(PROJECT_ROOT, self.log_dir, f))
-          shutil.rmtree(os.path.join(PROJECT_ROOT, self.DIR, f),
-                        ignore_errors=True)
-    except OSError:
-      # trails folder is missing, nothing to clear
-      pass
+  def will_dump (self, unique):
+    """
+    Decide whether the next message of the given category is dumped, so the
+    caller can skip assembling a message which would be dropped anyway.
 
-  def dump_to_file (self, data, unique):
+    The sample is consumed, so the message must be passed to
+    :meth:`dump_to_file` with `sampled=True`.
+
+    :param unique: category of the message
+    :type unique: str
+    :return: the message of the category should be dumped
+    :rtype: bool
+    """
+    if unique in self.DISABLED:
+      return False
+    if not self.is_sampled(unique=unique):
+      self.skipped += 1
+      return False
+    return True
+
+  def dump_to_file (self, data, unique, sampled=False):
     if not isinstance(data, basestring):
       log.error("Data is not str: %s" % type(data))
       return
-    trails = os.path.join(PROJECT_ROOT, self.log_dir)
+    if not sampled and not self.will_dump(unique=unique):
+      return
+    if 0 < self.MAX_PAYLOAD < len(data):
+      data = "%s\n... truncated %s bytes" % (data[:self.MAX_PAYLOAD],
+                                             len(data) - self.MAX_PAYLOAD)
+      self.truncated += 1
     date = time.strftime("%Y%m%d%H%M%S")
     cntr = self.increase_cntr()
-    file_path = os.path.join(trails,
-                             "%s_%03d_%s.log" % (date, cntr, unique))
+    # The segment directory is chosen by the writer
+    file_name = "%s_%03d_%s.log" % (date, cntr, unique)
+    try:
+      self.__queue.put_nowait((file_name, data))
+    except Queue.Full:
+      self.dropped += 1
+      log.debug("Trail queue is full! Drop data of: %s" % file_name)
+
+  @property
+  def queue_depth (self):
+    """
+    :return: number of messages waiting for writing
+    :rtype: int
+    """
+    return self.__queue.qsize()
+
+  def stats (self):
+    """
+    :return: counters of the trail writer
+    :rtype: dict
+    """
+    return {"queue_depth": self.queue_depth,
+            "written": self.written,
+            "compressed": self.compressed,
+            "dropped": self.dropped,
+            "rotated": self.rotated,
+            "skipped": self.skipped,
+            "truncated": self.truncated}
+
+  def __write_trails (self):
+    """
+    Write the enqueued messages in batches. A None item stops the writer.
+
+    :return: None
+    """
+    while True:
+      batch = [self.__queue.get()]
+      try:
+        while len(batch) < self.BATCH_SIZE:
+          batch.append(self.__queue.get_nowait())
+      except Queue.Empty:
+        pass
+      for item in batch:
+        try:
+          if item is None:
+            return
+          self.__write(*item)
+        except Exception:
+          log.exception("Failed to write trail file!")
+        finally:
+          self.__queue.task_done()
+
+  def __write (self, file_name, data):
+    """
+    Write the data into the given file of the current segment, compress large
+    payloads.
+
+    :param file_name: trail file name
+    :type file_name: str
+    :param data: dumped data
+    :type data: str
+    :return: None
+    """
+    if (0 < self.SEGMENT_FILES <= self.__segment_files or
+            0 < self.SEGMENT_SIZE <= self.__segment_size):
+      log.debug("Trail segment: %s is full! Start new segment..."
+                % self.log_dir)
+      self.__init()
+    file_path = os.path.join(PROJECT_ROOT, self.log_dir, file_name)
     if os.path.exists(file_path):
       log.warning("File path exist! %s" % file_path)
-    log.debug("Logging data to file: %s..." % file_path)
-    with open(file_path, "w") as f:
-      f.write(data)
+    if 0 < self.COMPRESS_THRESHOLD <= len(data):
+      file_path += ".gz"
+      with gzip.open(file_path, "wb") as f:
+        f.write(data)
+      self.compressed += 1
+    else:
+      with open(file_path, "w") as f:
+        f.write(data)
+    self.written += 1
+    self.__segment_files += 1
+    self.__segment_size += os.path.getsize(file_path)
+    log.debug("Logged data to file: %s" % file_path)
+
+  def __run_retention (self):
+    """
+    Enforce the retention limits periodically until the dumper is stopped.
+
+    :return: None
+    """
+    while not self.__stopped.is_set():
+      try:
+        self.enforce_retention()
+      except Exception:
+        log.exception("Failed to enforce trail retention!")
+      self.__stopped.wait(self.RETENTION_INTERVAL)
+
+  @staticmethod
+  def __get_usage (path):
+    """
+    :param path: segment directory
+    :type path: str
+    :return: total size and number of the files in the directory
+    :rtype: tuple
+    """
+    size, files = 0, 0
+    for dir_path, dir_names, file_names in os.walk(path):
+      for name in file_names:
+        try:
+          size += os.path.getsize(os.path.join(dir_path, name))
+          files += 1
+        except OSError:
+          pass
+    return size, files
+
+  def enforce_retention (self):
+    """
+    Rotate out the oldest segments while the trails exceed the size or file
+    limits, rotate out the expired segments and delete the surplus or expired
+    archives. The current segment is never rotated.
+
+    :return: None
+    """
+    root = os.path.join(PROJECT_ROOT, self.DIR)
+    try:
+      # Segment names start with a timestamp, so the oldest comes first
+      names = sorted(f for f in os.listdir(root) if f != ".placeholder")
+    except OSError:
+      # trails folder is missing, nothing to enforce
+      return
+    current = os.path.basename(self.log_dir)
+    now = time.time()
+    segments, archives = [], []
+    for name in names:
+      path = os.path.join(root, name)
+      if name.endswith(self.ARCHIVE_EXT):
+        archives.append(path)
+      elif name != current and os.path.isdir(path):
+        segments.append(path)
+    total_size, total_files = self.__get_usage(os.path.join(root, current))
+    usage = []
+    for path in segments:
+      size, files = self.__get_usage(path)
+      usage.append((path, size, files))
+      total_size += size
+      total_files += files
+    for path, size, files in usage:
+      expired = 0 < self.MAX_AGE < now - os.path.getmtime(path)
+      if (not expired and
+            not 0 < self.MAX_SIZE < total_size and
+            not 0 < self.MAX_FILES < total_files):
+        break
+      self.__rotate(path=path)
+      total_size -= size
+      total_files -= files
+    # Recollect archives as rotation could create new ones
+    if self.ARCHIVE:
+      archives = sorted(os.path.join(root, f) for f in os.listdir(root)
+                        if f.endswith(self.ARCHIVE_EXT))
+    surplus = len(archives) - self.MAX_ARCHIVES if self.MAX_ARCHIVES else 0
+    for i, path in enumerate(archives):
+      if i < surplus or 0 < self.MAX_AGE < now - os.path.getmtime(path):
+        log.debug("Remove trail archive: %s" % path)
+        try:
+          os.remove(path)
+        except OSError as e:
+          log.warning("Failed to remove trail archive: %s" % e)
+
+  def __rotate (self, path):
+    """
+    Remove the given segment, archive it before if it is enabled.
+
+    :param path: segment directory
+    :type path: str
+    :return: None
+    """
+    if self.ARCHIVE:
+      log.debug("Archive trail segment: %s" % path)
+      try:
+        with tarfile.open(path + self.ARCHIVE_EXT, "w:gz") as tar:
+          tar.add(path, arcname=os.path.basename(path))
+      except (IOError, OSError, tarfile.TarError) as e:
+        log.warning("Failed to archive trail segment: %s" % e)
+    log.debug("Remove trail segment: %s" % path)
+    shutil.rmtree(path, ignore_errors=True)
+    self.rotated += 1
+
+  def flush (self):
+    """
+    Block until every enqueued message is written.
+
+    :return: None
+    """
+    self.__queue.join()
+
+  def shutdown (self):
+    """
+    Write the remaining messages and stop the writer and the retention
+    threads. It is called at exit as well.
+
+    :return: None
+    """
+    self.__stopped.set()
+    if self.__writer.is_alive():
+      self.__queue.put(None)
+      self.__writer.join()
+    if self.__retention.is_alive():
+      self.__retention.join()
+    log.debug("Trail writer has been stopped: %s" % self.stats())